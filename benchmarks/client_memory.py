@@ -0,0 +1,157 @@
+"""
+Resident memory of the discord.py state cache under each client profile.
+
+Builds the bot's ConnectionState with the options from cogs.client_profile, feeds it a
+synthetic GUILD_CREATE with N members plus M MESSAGE_CREATE events (no network), and
+reports RSS growth. Each profile runs in its own subprocess so numbers don't bleed.
+
+    python benchmarks/client_memory.py --members 100000 --messages 5000
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+GUILD_ID = 100000000000000001
+CHANNEL_ID = 100000000000000002
+
+
+def _rss_bytes() -> int:
+    """Current RSS from /proc (Linux); peak RSS from getrusage elsewhere."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _user_payload(i: int) -> dict:
+    return {
+        "id": str(200000000000000000 + i),
+        "username": f"member{i}",
+        "discriminator": "0",
+        "global_name": f"Member {i}",
+        "avatar": None,
+    }
+
+
+def _guild_payload(members: int) -> dict:
+    joined = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": str(GUILD_ID),
+        "name": "Benchmark Guild",
+        "member_count": members,
+        "large": members > 250,
+        "unavailable": False,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "roles": [{
+            "id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "channels": [{
+            "id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0,
+            "permission_overwrites": [],
+        }],
+        "members": [
+            {"user": _user_payload(i), "roles": [], "joined_at": joined, "deaf": False, "mute": False, "flags": 0}
+            for i in range(members)
+        ],
+    }
+
+
+def _message_payload(i: int) -> dict:
+    return {
+        "id": str(300000000000000000 + i),
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": _user_payload(i % 1000),
+        "content": "hello from the benchmark " * 4,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def run_child(profile: str, members: int, messages: int) -> dict:
+    import discord
+    from discord.ext import commands
+    from cogs.client_profile import build_client_options
+
+    bot = commands.Bot(command_prefix="!", **build_client_options(profile))
+    state = bot._connection
+    state.dispatch = lambda *args, **kwargs: None  # only the cache is under test
+
+    # Build payloads before the baseline so only cached objects are measured
+    guild_data = _guild_payload(members)
+    message_data = [_message_payload(i) for i in range(messages)]
+    gc.collect()
+    before = _rss_bytes()
+
+    guild = state._add_guild_from_data(guild_data)
+    for data in message_data:
+        state.parse_message_create(data)
+    gc.collect()
+    after = _rss_bytes()  # payloads are still alive, so only the cache growth is counted
+    del guild_data, message_data
+
+    return {
+        "profile": profile,
+        "intents": bot.intents.value,
+        "cached_members": len(guild.members),
+        "cached_messages": len(state._messages) if state._messages is not None else 0,
+        "cached_users": len(state._users),
+        "rss_delta_mb": round((after - before) / (1024 * 1024), 2),
+        "discord_py": discord.__version__,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--child", choices=["default", "lean"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.members, args.messages)))
+        return
+
+    results = []
+    for profile in ("default", "lean"):
+        env = dict(os.environ, MAX_MESSAGES="")
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", profile,
+             "--members", str(args.members), "--messages", str(args.messages)],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"📊 Client memory: {args.members} members, {args.messages} messages (discord.py {results[0]['discord_py']})")
+    print(f"{'profile':<10}{'members':>10}{'messages':>10}{'users':>10}{'RSS Δ MB':>12}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['cached_members']:>10}{r['cached_messages']:>10}{r['cached_users']:>10}{r['rss_delta_mb']:>12}")
+    default, lean = results
+    if default["rss_delta_mb"] > 0:
+        saved = 100 * (1 - lean["rss_delta_mb"] / default["rss_delta_mb"])
+        print(f"✅ lean profile holds {saved:.0f}% less cache memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Per-call cost of the functions that run on every join, click or log line.
+
+Each case calls one function with realistic input (members and guilds are real
+discord.py objects from the simulation package) and reports the best of several
+timed rounds, in microseconds per call.
+
+    python benchmarks/hot_paths.py                    # compare with the baseline
+    python benchmarks/hot_paths.py --save-baseline    # record this machine's baseline
+    python benchmarks/hot_paths.py --threshold 0.3 --only sanitize
+
+The baseline (benchmarks/hot_paths_baseline.json by default) is machine-specific
+and not committed. Cases slower than baseline * (1 + threshold) are flagged and
+the exit status is 1, so the runner can gate a local pre-push check. Timings on
+a busy or shared machine move by 20-50% between runs; re-run a flagged case with
+--only before trusting it, or raise --threshold there.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timezone
+from itertools import cycle
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "hot_paths_baseline.json")
+ROUNDS = 7
+MIN_ROUND_SECONDS = 0.1
+GUILD_ROLES = 60
+MEMBER_ROLES = 5
+RATE_LIMIT_USERS = 1000
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def build_cases() -> List[Case]:
+    from discord.ext import commands
+
+    import discord
+    from simulation import SimulatedGuild
+    from simulation.fakes import BOT_USER_ID, FIRST_USER_ID, MEMBER_ROLE_ID, UNVERIFIED_ROLE_ID, user_payload
+
+    from cogs import security_utils
+    from cogs.bypass_manager import bypass_manager
+    from cogs.client_profile import build_client_options
+    from cogs.member_management import _member_event_embed
+    from cogs.security_utils import check_rate_limit, sanitize_log_message
+    from cogs.verification import encrypt_email
+    from cogs.welcome import _get_paid_role_ids, _sanitize_channel_name
+
+    bot = commands.Bot(command_prefix="!", **build_client_options("default"))
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID, bot=True))
+    sim_guild = SimulatedGuild(state)
+    guild = sim_guild.guild
+    extra_role_ids = [300000000000000000 + i for i in range(GUILD_ROLES)]
+    for position, role_id in enumerate(extra_role_ids, start=10):
+        guild._add_role(discord.Role(guild=guild, state=state, data={
+            "id": str(role_id), "name": f"role-{position}", "permissions": "0", "position": position,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }))
+    member = sim_guild.join(FIRST_USER_ID, [UNVERIFIED_ROLE_ID] + extra_role_ids[:MEMBER_ROLES - 1])
+    roles = member.roles[1:]
+
+    # Bypass roles the member does not have: the check has to look at every role
+    bypass_manager.bypass_roles = set(extra_role_ids[-3:])
+
+    # Rate limit table with recent entries from other users, as during a join wave
+    now = datetime.now(timezone.utc)
+    security_utils.rate_limits["bench"] = {FIRST_USER_ID + i: now for i in range(RATE_LIMIT_USERS)}
+    rate_limit_users = cycle(range(FIRST_USER_ID, FIRST_USER_ID + RATE_LIMIT_USERS))
+
+    plain_log = "Granted 1-hour free access to sim123456 (restored/granted roles)"
+    sensitive_log = (
+        f"Error adding role {MEMBER_ROLE_ID} to user {member.id}: 403 Forbidden "
+        f"(https://discord.com/api/v10/guilds/{guild.id}/members/{member.id}/roles/{MEMBER_ROLE_ID})"
+    )
+    long_log = " ".join([sensitive_log] * 12)
+
+    return [
+        ("sanitize_log_message: plain", lambda: sanitize_log_message(plain_log)),
+        ("sanitize_log_message: IDs + URL", lambda: sanitize_log_message(sensitive_log)),
+        ("sanitize_log_message: 2 KB", lambda: sanitize_log_message(long_log)),
+        (f"check_rate_limit: {RATE_LIMIT_USERS} recent users",
+         lambda: check_rate_limit(next(rate_limit_users), "bench", limit=5, window=60)),
+        ("check_rate_limit: 1 user", lambda: check_rate_limit(FIRST_USER_ID, "bench_single", limit=10 ** 9)),
+        (f"has_bypass_role: {MEMBER_ROLES} roles, no match", lambda: bypass_manager.has_bypass_role(member)),
+        ("encrypt_email", lambda: encrypt_email("jane.doe.builder@example-mail.com")),
+        ("_sanitize_channel_name", lambda: _sanitize_channel_name("verify-Ünïcode Üser 🚀 [Pro] #42")),
+        ("_get_paid_role_ids", lambda: _get_paid_role_ids(guild.id)),
+        ("log_member_event embed", lambda: _member_event_embed(
+            guild, "⏰ 1-Hour Free Access", f"{member.mention} was granted free member access after 1 hour",
+            member, discord.Color.orange())),
+        ("log_member_event embed + roles", lambda: _member_event_embed(
+            guild, "👋 Member Left", f"{member.mention} left the server", member, discord.Color.red(), roles)),
+    ]
+
+
+def measure(func: Callable[[], object]) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < MIN_ROUND_SECONDS:
+        number = max(number, int(number * MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+    rounds = [t / number for t in timer.repeat(repeat=ROUNDS, number=number)]
+    rounds.sort()
+    return {"best_us": round(rounds[0] * 1e6, 3), "median_us": round(rounds[len(rounds) // 2] * 1e6, 3), "loops": number}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> Dict[str, str]:
+    """Case name -> "regression" / "faster" / "ok" / "new" against the baseline's best times."""
+    verdicts = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            verdicts[name] = "new"
+        elif result["best_us"] > before["best_us"] * (1 + threshold):
+            verdicts[name] = "regression"
+        elif result["best_us"] < before["best_us"] * (1 - threshold):
+            verdicts[name] = "faster"
+        else:
+            verdicts[name] = "ok"
+    return verdicts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs the baseline (0.25 = 25%%)")
+    parser.add_argument("--only", default="", help="run only cases whose name contains this text")
+    args = parser.parse_args()
+
+    args.baseline = os.path.abspath(args.baseline)
+    logging.basicConfig(level=logging.ERROR)
+    from simulation import isolate_state
+    isolate_state()
+
+    results = {}
+    for name, func in build_cases():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(func)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    verdicts = compare(results, baseline, args.threshold)
+
+    print(f"📊 Hot path cost per call (best of {ROUNDS}, µs) · baseline: {args.baseline if baseline else 'none'}")
+    print(f"{'case':<42}{'best':>10}{'median':>10}{'baseline':>10}{'change':>9}  ")
+    regressions = 0
+    for name, result in results.items():
+        before = baseline.get(name)
+        change = f"{(result['best_us'] / before['best_us'] - 1) * 100:+.0f}%" if before else ""
+        flag = {"regression": "⚠️ regression", "faster": "faster"}.get(verdicts[name], "")
+        regressions += verdicts[name] == "regression"
+        print(
+            f"{name:<42}{result['best_us']:>10.3f}{result['median_us']:>10.3f}"
+            f"{before['best_us'] if before else '':>10}{change:>9}  {flag}"
+        )
+
+    if args.save_baseline:
+        data = {
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": dict(baseline, **results),
+        }
+        tmp = f"{args.baseline}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
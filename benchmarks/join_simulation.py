@@ -0,0 +1,79 @@
+"""
+Offline load test of the join, Start Verification and 1-hour grant flows.
+
+Runs the real MemberManagement and Welcome cogs against a synthetic guild (see the
+simulation package): N members join, some press Start Verification, then virtual
+time is fast-forwarded past the hour while the per-minute passes run. Every
+Discord request is answered by a recording REST layer with simulated latency.
+Reports throughput, REST calls per member, event loop lag and RSS growth. State
+files go to a temp directory.
+
+    python benchmarks/join_simulation.py --members 1000 --latency-ms 50
+
+Join surge mode and grant catch-up pacing are off unless --surge is given or
+JOIN_SURGE_THRESHOLD / GRANT_CATCHUP_THRESHOLD are set in the environment.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from simulation import Simulation, isolate_state  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated REST round trip")
+    parser.add_argument("--join-rate", type=float, default=0.0, help="joins per second (0 = all at once)")
+    parser.add_argument("--click-ratio", type=float, default=1.0, help="share of members who press Start Verification")
+    parser.add_argument("--whop-ratio", type=float, default=0.2, help="share who join with the member role already added")
+    parser.add_argument("--closed-dm-ratio", type=float, default=0.05, help="share who do not accept DMs")
+    parser.add_argument("--ticket-ratio", type=float, default=0.0, help="share of clickers given a legacy ticket to auto-close")
+    parser.add_argument("--surge", action="store_true", help="keep join surge detection on (default threshold)")
+    parser.add_argument("--skip-strip-checks", action="store_true", help="cancel the delayed re-strip checks (about 30s) instead of waiting")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workdir", default=None, help="where state files are written (default: a temp dir)")
+    args = parser.parse_args()
+
+    defaults = {"GRANT_CATCHUP_THRESHOLD": str(args.members + 1)}
+    if not args.surge:
+        defaults["JOIN_SURGE_THRESHOLD"] = "0"
+    workdir = isolate_state(args.workdir, defaults)
+    logging.basicConfig(level=logging.ERROR)
+
+    sim = Simulation(
+        args.members,
+        latency=args.latency_ms / 1000,
+        join_rate=args.join_rate,
+        click_ratio=args.click_ratio,
+        whop_ratio=args.whop_ratio,
+        closed_dm_ratio=args.closed_dm_ratio,
+        ticket_ratio=args.ticket_ratio,
+        strip_checks=not args.skip_strip_checks,
+        seed=args.seed,
+    )
+    report = asyncio.run(sim.run())
+
+    print(f"📊 Join simulation: {args.members} members, {args.latency_ms:g}ms REST latency (state in {workdir})")
+    print(f"{'phase':<14}{'count':>7}{'seconds':>9}{'per sec':>9}{'REST':>7}{'REST/mbr':>10}{'ixn':>6}{'lag max':>9}{'lag p99':>9}")
+    for p in report.phases:
+        print(
+            f"{p.name:<14}{p.count:>7}{p.elapsed:>9.2f}{p.per_second:>9.1f}{p.rest_calls:>7}"
+            f"{p.rest_per_member:>10.2f}{p.interaction_calls:>6}{p.lag_max_ms:>8.1f}ms{p.lag_p99_ms:>7.1f}ms"
+        )
+    print(f"REST calls per member overall: {report.rest_per_member:.2f} · RSS Δ {report.rss_delta_mb} MB")
+    print("Outcome: " + " · ".join(f"{k} {v}" for k, v in report.outcomes.items()))
+    if report.errors:
+        print("Errors returned: " + " · ".join(f"{k} {v}" for k, v in report.errors.items()))
+    print("Routes:")
+    for route, count in report.routes.most_common():
+        print(f"  {count:>7}  {route}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Role grants, /setup_permissions and command sync under Discord-style rate limits.
+
+Each scenario runs in a fresh process: the bot's cogs log in with discord.py's
+real HTTP client against the local fake API (simulation/rest_server.py), which
+answers with X-RateLimit-* headers, 429s and simulated latency.
+
+- grants:            N members reach their hour at the same minute; measures how
+                     long until every role is granted and until the log messages
+                     have drained.
+- setup_permissions: a guild with C channels (in categories of 10) gets the
+                     verification permission layout, backup upload included.
+- sync:              the enabled commands are synced globally and to the guild.
+
+    python benchmarks/rest_throttling.py --members 40 --channels 100
+    python benchmarks/rest_throttling.py --limit member_roles=10/10 --global-limit 20
+
+Bucket names for --limit: member_roles, members, channels, channel_permissions,
+messages, dm_channels, users, application, commands.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("grants", "setup_permissions", "sync")
+
+
+def parse_limits(specs) -> Dict[str, Tuple[int, float]]:
+    """["member_roles=10/10", ...] -> {"member_roles": (10, 10.0)}"""
+    limits = {}
+    for spec in specs or ():
+        name, _, rate = spec.partition("=")
+        count, _, seconds = rate.partition("/")
+        limits[name.strip()] = (int(count), float(seconds or 1))
+    return limits
+
+
+def _traffic(api, before: Counter) -> dict:
+    from simulation.rest import INTERACTION_ROUTE_PREFIXES
+
+    routes = Counter(api.calls)
+    routes.subtract(before)
+    return {
+        "requests": sum(n for r, n in routes.items() if n > 0 and not r.startswith(INTERACTION_ROUTE_PREFIXES)),
+        "rate_limited": dict(api.rate_limited),
+        "routes": {r: n for r, n in routes.most_common() if n > 0},
+    }
+
+
+async def run_grants(sim, api, args) -> dict:
+    from simulation.fakes import BOT_USER_ID, MEMBER_ROLE_ID, UNVERIFIED_ROLE_ID
+    from simulation.harness import TICK_SECONDS
+
+    sim.fill_pending(args.members, spread_seconds=0)
+    before = Counter(api.calls)
+    start = time.perf_counter()
+    await sim.advance(3600 + TICK_SECONDS)
+    granted_s = time.perf_counter() - start
+    await sim.settle()
+    members = [m for m in sim.sim_guild.guild.members if m.id != BOT_USER_ID]
+    granted = sum(1 for m in members if m._roles.has(MEMBER_ROLE_ID) and not m._roles.has(UNVERIFIED_ROLE_ID))
+    return dict(
+        _traffic(api, before),
+        count=granted,
+        of=len(members),
+        work_s=round(granted_s, 2),
+        drained_s=round(time.perf_counter() - start, 2),
+    )
+
+
+async def run_setup_permissions(sim, api, args) -> dict:
+    from commands.setup_permissions import execute_permission_setup
+    from simulation.fakes import FakeInteraction
+
+    sim.sim_guild.add_channels(args.channels)
+    guild = sim.sim_guild.guild
+    admin = sim.sim_guild.join(sim.random.randrange(10 ** 17, 10 ** 18))
+    interaction = FakeInteraction(api, admin, 1)
+    before = Counter(api.calls)
+    start = time.perf_counter()
+    await execute_permission_setup(interaction, guild, admin)
+    work_s = time.perf_counter() - start
+    await sim.settle()
+    # Every channel hidden from @everyone except the welcome channel
+    laid_out = sum(1 for c in guild.channels if c.overwrites_for(guild.default_role).view_channel is not None)
+    return dict(
+        _traffic(api, before),
+        count=laid_out,
+        of=len(guild.channels),
+        work_s=round(work_s, 2),
+        drained_s=round(time.perf_counter() - start, 2),
+    )
+
+
+async def run_sync(sim, api, args) -> dict:
+    bot = sim.bot
+    await bot.load_extension("commands")
+    before = Counter(api.calls)
+    start = time.perf_counter()
+    synced = await bot.tree.sync()
+    bot.tree.copy_global_to(guild=sim.sim_guild.guild)
+    synced_guild = await bot.tree.sync(guild=sim.sim_guild.guild)
+    work_s = time.perf_counter() - start
+    return dict(
+        _traffic(api, before),
+        count=len(synced) + len(synced_guild),
+        of=2 * len(bot.tree.get_commands()),
+        work_s=round(work_s, 2),
+        drained_s=round(work_s, 2),
+    )
+
+
+async def run_child(scenario: str, args) -> dict:
+    from simulation import FakeDiscordAPI, Simulation
+
+    api = FakeDiscordAPI(
+        latency=args.latency_ms / 1000,
+        buckets=parse_limits(args.limit),
+        global_limit=args.global_limit,
+        seed=args.seed,
+    )
+    sim = Simulation(args.members, api=api, seed=args.seed)
+    await sim.setup()
+    try:
+        runner = {"grants": run_grants, "setup_permissions": run_setup_permissions, "sync": run_sync}[scenario]
+        result = await runner(sim, api, args)
+    finally:
+        await sim.close()
+    result["scenario"] = scenario
+    result["errors"] = dict(api.errors)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--members", type=int, default=40, help="members granted at once (grants)")
+    parser.add_argument("--channels", type=int, default=100, help="text channels in the guild (setup_permissions)")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="simulated round trip")
+    parser.add_argument("--limit", action="append", metavar="BUCKET=N/SECONDS", help="override a bucket's limit")
+    parser.add_argument("--global-limit", type=int, default=50, help="requests per second across routes (0 = off)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from simulation import isolate_state
+        isolate_state(defaults={"GRANT_CATCHUP_THRESHOLD": str(args.members + 1), "JOIN_SURGE_THRESHOLD": "0"})
+        logging.basicConfig(level=logging.CRITICAL)
+        print(json.dumps(asyncio.run(run_child(args.child, args))))
+        return
+
+    results = []
+    for scenario in (s.strip() for s in args.scenarios.split(",") if s.strip()):
+        out = subprocess.run(
+            [sys.executable, __file__, *sys.argv[1:], "--child", scenario],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    limits = " ".join(f"{k}={v[0]}/{v[1]:g}s" for k, v in sorted(parse_limits(args.limit).items()))
+    print(f"📊 REST under rate limits: {args.latency_ms:g}ms latency, global {args.global_limit or 'off'}/s {limits}".rstrip())
+    print(f"{'scenario':<19}{'done':>10}{'work s':>9}{'drained s':>11}{'requests':>10}{'req/s':>8}{'429s':>6}")
+    for r in results:
+        done = f"{r['count']}/{r['of']}"
+        rate = r["requests"] / r["drained_s"] if r["drained_s"] else 0.0
+        print(
+            f"{r['scenario']:<19}{done:>10}{r['work_s']:>9}{r['drained_s']:>11}{r['requests']:>10}"
+            f"{rate:>8.1f}{sum(r['rate_limited'].values()):>6}"
+        )
+    for r in results:
+        print(f"{r['scenario']}:")
+        for route, count in r["routes"].items():
+            print(f"  {count:>6}  {route}")
+        for route, count in r["rate_limited"].items():
+            print(f"  {count:>6}  429 {route}")
+        for kind, count in r["errors"].items():
+            print(f"  {count:>6}  error {kind}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+How the per-minute 1-hour access pass scales with the number of pending users.
+
+For each size, a fresh process fills the 1-hour timer with N members (join times
+spread over the last hour) and, on virtual time (cogs/clock.py):
+
+- idle pass: runs check_1_hour_access() while nobody is due, i.e. the cost the
+  bot pays every minute just to look;
+- virtual hour: fast-forwards 60 minutes in one-minute passes, granting everyone
+  as their hour comes up (REST answered instantly by the simulation layer).
+
+    python benchmarks/timer_scaling.py --sizes 1000,10000,50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+IDLE_PASSES = 20
+
+
+async def run_child(size: int) -> dict:
+    from simulation import Simulation
+    from cogs.pending_store import PendingAccessStore
+
+    sim = Simulation(size, latency=0.0)
+    await sim.setup()
+    try:
+        # Everyone joined within the last minute: the pass finds nobody due
+        sim.fill_pending(size, spread_seconds=59)
+        idle = []
+        for _ in range(IDLE_PASSES):
+            start = time.perf_counter()
+            await sim.member_cog.check_1_hour_access()
+            idle.append(time.perf_counter() - start)
+        sim.member_cog.pending_users = PendingAccessStore()
+
+        sim.fill_pending(size, spread_seconds=3600)
+        calls_before = sim.http.rest_calls()
+        start = time.perf_counter()
+        passes = await sim.advance(3600)
+        await sim.settle()
+        hour = time.perf_counter() - start
+        granted = size - sim.member_cog.pending_count()
+    finally:
+        await sim.close()
+    return {
+        "size": size,
+        "idle_ms": round(1000 * sum(idle) / len(idle), 3),
+        "hour_s": round(hour, 2),
+        "passes": passes,
+        "granted": granted,
+        "rest_calls": sim.http.rest_calls() - calls_before,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from simulation import isolate_state
+        isolate_state(defaults={"GRANT_CATCHUP_THRESHOLD": str(args.child + 1), "JOIN_SURGE_THRESHOLD": "0"})
+        print(json.dumps(asyncio.run(run_child(args.child))))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(size)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print("📊 1-hour access pass vs pending users (virtual clock)")
+    print(f"{'pending':>9}{'idle pass ms':>14}{'hour (real s)':>15}{'passes':>8}{'granted':>9}{'REST':>9}")
+    for r in results:
+        print(f"{r['size']:>9}{r['idle_ms']:>14}{r['hour_s']:>15}{r['passes']:>8}{r['granted']:>9}{r['rest_calls']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,13 @@
-
 import logging
 from discord.ext import commands
 
-# Import all cog modules (verification disabled for Vito - no Calendly)
-from . import member_management
-# from . import verification  # Disabled: no verification system for Vito
-from . import welcome
+from .extension_loader import load_package_extensions
+
+# Cog modules are listed in extensions.json and imported only when enabled
+# (verification disabled for Vito - no Calendly)
 
 async def setup(bot: commands.Bot) -> None:
-    """Add all cogs to the bot."""
+    """Add all enabled cogs to the bot."""
     logger = logging.getLogger(__name__)
-    msg = "Loaded cogs.{}"
-    await member_management.setup(bot)
-    logger.debug(msg.format("member_management"))
-    # await verification.setup(bot)  # Disabled for Vito
-    await welcome.setup(bot)
-    logger.debug(msg.format("welcome")) 
\ No newline at end of file
+    loaded = await load_package_extensions(bot, "cogs")
+    logger.debug(f"Loaded {loaded} cog module(s)")
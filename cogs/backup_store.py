@@ -0,0 +1,399 @@
+"""
+Local store for permission backups.
+
+Backups are kept in an SQLite file instead of only as logs-channel attachments,
+so /restore_permissions is a single indexed lookup and old backups never fall
+out of reach. Content is stored once per distinct permission state: the blob is
+gzip'd canonical JSON keyed by its sha256, and each backup row (guild, backup
+id, timestamp, author) points at a blob. The logs-channel upload is a mirror;
+its URL is recorded on the row.
+
+Rows are either "full" (every channel) or "incremental": the channels changed
+since a full base ({channel_id: entry, or None if deleted}), cumulative so any
+incremental restores as base + one blob. Scheduled snapshots (see
+cogs/permission_snapshots.py) are subject to retention; manual ones are kept.
+
+The connection may be used from a worker thread (asyncio.to_thread); writes
+hold the store's lock so two transactions never interleave.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import discord
+
+BACKUP_DB_FILE = "permission_backups.db"
+
+# Encoded backups stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_BYTES = 1 << 20
+_WRITE_CHUNK_BYTES = 64 * 1024
+# Top-level keys whose dicts are encoded one entry at a time
+_STREAMED_KEYS = ("channels", "changes")
+
+KIND_FULL = "full"
+KIND_INCREMENTAL = "incremental"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backups (
+    guild_id INTEGER NOT NULL,
+    backup_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_by INTEGER,
+    channel_count INTEGER NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    mirror_url TEXT,
+    PRIMARY KEY (guild_id, backup_id)
+);
+CREATE INDEX IF NOT EXISTS backups_by_time ON backups (guild_id, created_at);
+"""
+
+# Columns added after the first release of the store
+_MIGRATIONS = {
+    "kind": "ALTER TABLE backups ADD COLUMN kind TEXT NOT NULL DEFAULT 'full'",
+    "base_id": "ALTER TABLE backups ADD COLUMN base_id TEXT",
+    "scheduled": "ALTER TABLE backups ADD COLUMN scheduled INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def backup_id_for(timestamp: datetime) -> str:
+    """Backup IDs are the UTC creation time: YYYYMMDD_HHMMSS (the store adds _2, _3, ...
+    when a guild already has a backup from that second)."""
+    return timestamp.strftime('%Y%m%d_%H%M%S')
+
+
+def serialize_channel(channel: discord.abc.GuildChannel) -> Dict[str, Any]:
+    """One channel's overwrites in backup format."""
+    channel_perms = {}
+    for target, overwrite in channel.overwrites.items():
+        if isinstance(target, discord.Role):
+            target_type = "role"
+            target_id = getattr(target, 'id', None)
+            target_name = getattr(target, 'name', 'Unknown')
+        else:  # User
+            target_type = "user"
+            target_id = getattr(target, 'id', None)
+            target_name = str(target)
+        perms_dict = {}
+        for perm, value in overwrite:
+            if value is not None:
+                perms_dict[perm] = value
+        channel_perms[str(target_id)] = {
+            "type": target_type,
+            "name": target_name,
+            "permissions": perms_dict
+        }
+    return {
+        "name": getattr(channel, 'name', 'Unknown'),
+        "type": str(getattr(channel, 'type', 'Unknown')),
+        "overwrites": channel_perms
+    }
+
+
+class ChannelSnapshot(Mapping):
+    """{channel_id: backup entry} for a guild, serialized from the cache on access.
+
+    encode_backup() walks it one channel at a time, so a snapshot never holds
+    every channel's entry in memory at once.
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self._channels = {str(getattr(channel, 'id', None)): channel for channel in guild.channels}
+
+    def __getitem__(self, channel_id: str) -> Dict[str, Any]:
+        return serialize_channel(self._channels[channel_id])
+
+    def __iter__(self):
+        return iter(self._channels)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+
+def snapshot_guild(guild: discord.Guild, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Full backup of every channel's overwrites (from cache; no API calls). The channels
+    are a read-only ChannelSnapshot, serialized as they are encoded."""
+    return {
+        "guild_id": getattr(guild, 'id', None),
+        "guild_name": getattr(guild, 'name', 'Unknown'),
+        "backup_timestamp": (now or datetime.now(timezone.utc)).isoformat(),
+        "channels": ChannelSnapshot(guild)
+    }
+
+
+class EncodedBackup:
+    """Gzip'd JSON in a spooled buffer (positioned at 0), with the raw size and sha256."""
+    __slots__ = ("file", "size", "compressed_size", "sha256")
+
+    def __init__(self, file: BinaryIO, size: int, compressed_size: int, sha256: str):
+        self.file = file
+        self.size = size
+        self.compressed_size = compressed_size
+        self.sha256 = sha256
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _iter_json(content: Dict[str, Any]):
+    """Canonical JSON of `content` (identical to _dumps) in chunks of one channel each."""
+    yield "{"
+    for i, key in enumerate(sorted(content)):
+        value = content[key]
+        yield ("," if i else "") + _dumps(key) + ":"
+        if key in _STREAMED_KEYS and isinstance(value, Mapping):
+            yield "{"
+            for j, item_key in enumerate(sorted(value)):
+                yield ("," if j else "") + _dumps(item_key) + ":" + _dumps(value[item_key])
+            yield "}"
+        else:
+            yield _dumps(value)
+    yield "}"
+
+
+def encode_backup(content: Dict[str, Any]) -> EncodedBackup:
+    """Serialize in one streaming pass: each channel is encoded, hashed and gzip'd in turn,
+    so the full JSON text is never held in memory. The output is canonical (sorted keys,
+    no whitespace): equal content has an equal sha256.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    pending: List[bytes] = []
+    pending_len = 0
+    with gzip.GzipFile(fileobj=spool, mode="wb", mtime=0) as gz:
+        for chunk in _iter_json(content):
+            data = chunk.encode("utf-8")
+            digest.update(data)
+            size += len(data)
+            pending.append(data)
+            pending_len += len(data)
+            if pending_len >= _WRITE_CHUNK_BYTES:
+                gz.write(b"".join(pending))
+                pending.clear()
+                pending_len = 0
+        gz.write(b"".join(pending))
+    compressed_size = spool.tell()
+    spool.seek(0)
+    return EncodedBackup(spool, size, compressed_size, digest.hexdigest())
+
+
+class BackupRecord:
+    __slots__ = (
+        "guild_id", "backup_id", "created_at", "created_by", "channel_count", "sha256", "size",
+        "mirror_url", "kind", "base_id", "scheduled",
+    )
+
+    def __init__(self, row: sqlite3.Row):
+        self.guild_id = row["guild_id"]
+        self.backup_id = row["backup_id"]
+        created_at = datetime.fromisoformat(row["created_at"])
+        # Legacy backups may carry naive timestamps; they were always UTC
+        self.created_at = created_at if created_at.tzinfo else created_at.replace(tzinfo=timezone.utc)
+        self.created_by = row["created_by"]
+        self.channel_count = row["channel_count"]
+        self.sha256 = row["sha256"]
+        self.size = row["size"]
+        self.mirror_url = row["mirror_url"]
+        self.kind = row["kind"]
+        self.base_id = row["base_id"]
+        self.scheduled = bool(row["scheduled"])
+
+
+class BackupStore:
+    def __init__(self, db_file: str = BACKUP_DB_FILE):
+        self.db_file = db_file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(backups)")}
+                with conn:
+                    for column, statement in _MIGRATIONS.items():
+                        if column not in columns:
+                            conn.execute(statement)
+                self._conn = conn
+        return self._conn
+
+    def _unique_backup_id(self, guild_id: int, created_at: datetime) -> str:
+        """backup_id_for(created_at), with a _2, _3, ... suffix if that second is taken."""
+        backup_id = base = backup_id_for(created_at)
+        n = 1
+        while self.conn.execute(
+            "SELECT 1 FROM backups WHERE guild_id = ? AND backup_id = ?", (guild_id, backup_id)
+        ).fetchone():
+            n += 1
+            backup_id = f"{base}_{n}"
+        return backup_id
+
+    def _insert(self, guild_id: int, backup_id: Optional[str], created_at: datetime, created_by: Optional[int],
+                channel_count: int, content: Dict[str, Any], kind: str, base_id: Optional[str],
+                scheduled: bool) -> BackupRecord:
+        """Store a new row. backup_id None picks a unique ID from created_at; an explicit ID
+        that already exists raises sqlite3.IntegrityError (rows are never replaced)."""
+        encoded = encode_backup(content)
+        digest = encoded.sha256
+        with encoded.file, self._lock, self.conn:
+            backup_id = backup_id or self._unique_backup_id(guild_id, created_at)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, data, size) VALUES (?, ?, ?)",
+                (digest, encoded.file.read(), encoded.size),
+            )
+            self.conn.execute(
+                "INSERT INTO backups "
+                "(guild_id, backup_id, created_at, created_by, channel_count, sha256, kind, base_id, scheduled) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, backup_id, created_at.isoformat(), created_by, channel_count, digest,
+                 kind, base_id, int(scheduled)),
+            )
+        logging.info(f"Stored {kind} permission backup {backup_id} for guild {guild_id} ({encoded.size} bytes, {digest[:12]})")
+        return self.get_record(guild_id, backup_id)
+
+    def save(self, guild_id: int, backup_data: Dict[str, Any], created_by: Optional[int] = None,
+             backup_id: Optional[str] = None, scheduled: bool = False) -> BackupRecord:
+        """Store a full backup (as produced by snapshot_guild); identical content is stored once.
+        Without `backup_id` a unique one is derived from the backup timestamp."""
+        created_at = datetime.fromisoformat(backup_data["backup_timestamp"])
+        # The timestamp lives on the row, so unchanged permissions hash the same
+        content = {k: v for k, v in backup_data.items() if k != "backup_timestamp"}
+        return self._insert(guild_id, backup_id, created_at, created_by, len(content.get("channels", {})),
+                            content, KIND_FULL, None, scheduled)
+
+    def save_incremental(self, guild_id: int, base_id: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                         created_at: Optional[datetime] = None) -> BackupRecord:
+        """Store the channels changed since full backup `base_id` (None = channel deleted)."""
+        created_at = created_at or datetime.now(timezone.utc)
+        base = self.get_record(guild_id, base_id)
+        if base is None or base.kind != KIND_FULL:
+            raise ValueError(f"Base {base_id} of an incremental backup must be a stored full backup")
+        return self._insert(guild_id, None, created_at, None, len(changes),
+                            {"base_id": base_id, "changes": changes}, KIND_INCREMENTAL, base_id, True)
+
+    def open_blob(self, guild_id: int, backup_id: str) -> Optional[io.BytesIO]:
+        """The stored gzip'd JSON of a backup (as written, without the timestamp), for mirroring."""
+        row = self._load_content(guild_id, backup_id)
+        return io.BytesIO(row["data"]) if row else None
+
+    def set_mirror(self, guild_id: int, backup_id: str, url: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE backups SET mirror_url = ? WHERE guild_id = ? AND backup_id = ?", (url, guild_id, backup_id))
+
+    def get_record(self, guild_id: int, backup_id: str) -> Optional[BackupRecord]:
+        row = self.conn.execute(
+            "SELECT b.*, blobs.size FROM backups b JOIN blobs USING (sha256) WHERE b.guild_id = ? AND b.backup_id = ?",
+            (guild_id, backup_id),
+        ).fetchone()
+        return BackupRecord(row) if row else None
+
+    def latest(self, guild_id: int, kind: Optional[str] = None) -> Optional[BackupRecord]:
+        row = self.conn.execute(
+            "SELECT b.*, blobs.size FROM backups b JOIN blobs USING (sha256) "
+            "WHERE b.guild_id = ? AND (? IS NULL OR b.kind = ?) ORDER BY b.created_at DESC LIMIT 1",
+            (guild_id, kind, kind),
+        ).fetchone()
+        return BackupRecord(row) if row else None
+
+    def _load_content(self, guild_id: int, backup_id: str):
+        return self.conn.execute(
+            "SELECT b.created_at, b.kind, blobs.data FROM backups b JOIN blobs USING (sha256) "
+            "WHERE b.guild_id = ? AND b.backup_id = ?",
+            (guild_id, backup_id),
+        ).fetchone()
+
+    def load_changes(self, guild_id: int, backup_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """An incremental's changed channels ({} for full backups or unknown IDs)."""
+        row = self._load_content(guild_id, backup_id)
+        if row is None or row["kind"] != KIND_INCREMENTAL:
+            return {}
+        return json.loads(gzip.decompress(row["data"]).decode("utf-8"))["changes"]
+
+    def load(self, guild_id: int, backup_id: str) -> Optional[Dict[str, Any]]:
+        """The full backup at this point in time (incrementals are applied to their base), or None."""
+        row = self._load_content(guild_id, backup_id)
+        if row is None:
+            return None
+        created_at = row["created_at"]
+        # Follow base links down to a full backup, then apply the changes newest last
+        layers = []
+        seen = {backup_id}
+        current_id = backup_id
+        while row["kind"] == KIND_INCREMENTAL:
+            data = json.loads(gzip.decompress(row["data"]).decode("utf-8"))
+            layers.append(data["changes"])
+            base_id = data["base_id"]
+            if base_id in seen:
+                logging.error(f"Incremental backup {current_id} has a base cycle through {base_id}")
+                return None
+            seen.add(base_id)
+            row = self._load_content(guild_id, base_id)
+            if row is None:
+                logging.error(f"Base {base_id} of incremental backup {current_id} is missing")
+                return None
+            current_id = base_id
+        data = json.loads(gzip.decompress(row["data"]).decode("utf-8"))
+        for changes in reversed(layers):
+            for channel_id, entry in changes.items():
+                if entry is None:
+                    data["channels"].pop(channel_id, None)
+                else:
+                    data["channels"][channel_id] = entry
+        data["backup_timestamp"] = created_at
+        return data
+
+    def list(self, guild_id: int, prefix: str = "", limit: int = 25) -> List[BackupRecord]:
+        """Newest first, optionally filtered by backup ID prefix."""
+        rows = self.conn.execute(
+            "SELECT b.*, blobs.size FROM backups b JOIN blobs USING (sha256) "
+            "WHERE b.guild_id = ? AND substr(b.backup_id, 1, ?) = ? ORDER BY b.created_at DESC LIMIT ?",
+            (guild_id, len(prefix), prefix, limit),
+        ).fetchall()
+        return [BackupRecord(row) for row in rows]
+
+    def count(self, guild_id: int) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM backups WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+
+    def apply_retention(self, guild_id: int, cutoff: datetime) -> int:
+        """Delete scheduled backups older than cutoff, keeping the newest full backup and any
+        base still used by a kept incremental. Unreferenced blobs are removed. Returns rows deleted."""
+        newest_full = self.latest(guild_id, KIND_FULL)
+        with self._lock, self.conn:
+            deleted = self.conn.execute(
+                "DELETE FROM backups WHERE guild_id = ? AND scheduled = 1 AND created_at < ? "
+                "AND backup_id != ? "
+                "AND backup_id NOT IN (SELECT base_id FROM backups WHERE guild_id = ? AND base_id IS NOT NULL AND created_at >= ?)",
+                (guild_id, cutoff.isoformat(), newest_full.backup_id if newest_full else "", guild_id, cutoff.isoformat()),
+            ).rowcount
+            if deleted:
+                self.conn.execute("DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM backups)")
+        return deleted
+
+    def storage_bytes(self, guild_id: int) -> int:
+        """Compressed bytes of the blobs this guild's backups use."""
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(length(data)), 0) FROM blobs WHERE sha256 IN (SELECT sha256 FROM backups WHERE guild_id = ?)",
+            (guild_id,),
+        ).fetchone()
+        return row[0]
+
+
+# Global instance
+backup_store = BackupStore()
@@ -1,76 +1,203 @@
+"""
+Bypass roles: members holding any of them skip the join handling (unverified role,
+member-role strip, 1-hour timer).
+
+The role IDs live in bypass_roles.json. The file is checked for changes every
+BYPASS_WATCH_SECONDS (default 30, 0 disables) and reloaded without a restart.
+
+has_bypass_role() runs several times per join, so the answer comes from an index:
+per guild, the IDs of members holding a bypass role. It is built from the member
+cache the first time a guild is checked, then kept current from member join,
+update and leave events; a role deletion or a change to the role list rebuilds it.
+Guilds without a complete member cache (the lean client profile) are not indexed
+and are checked from the member's own roles instead.
+"""
 import json
 import os
 import logging
-from typing import Set, List, Optional
+from typing import Dict, Iterable, Set, List, Optional, Tuple
 import discord
 
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not a number, using %s", name, default)
+        return default
+
+
+BYPASS_WATCH_SECONDS = _env_number("BYPASS_WATCH_SECONDS", 30)
+
+
 class BypassManager:
     def __init__(self):
-        self.bypass_file = "bypass_roles.json"
         # Always use absolute path in project root
         self.bypass_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bypass_roles.json'))
-        self.bypass_roles: Set[int] = set()
+        self._bypass_roles: Set[int] = set()
+        # guild_id -> ids of members holding any bypass role (indexed guilds only)
+        self._holders: Dict[int, Set[int]] = {}
+        # (mtime, size) of bypass_roles.json when last read or written
+        self._file_stamp: Optional[Tuple[float, int]] = None
+        self.rebuilds = 0
+        self.reloads = 0
         self.load_bypass_roles()
-    
-    def load_bypass_roles(self):
-        """Load bypass roles from JSON file"""
+
+    @property
+    def bypass_roles(self) -> Set[int]:
+        return self._bypass_roles
+
+    @bypass_roles.setter
+    def bypass_roles(self, role_ids: Iterable[int]) -> None:
+        self._bypass_roles = set(role_ids)
+        self.invalidate()
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            st = os.stat(self.bypass_file)
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size)
+
+    def load_bypass_roles(self) -> bool:
+        """Load bypass roles from JSON file. Returns False (keeping the current roles) on a read error."""
         try:
             logging.info(f"[BypassManager] Loading bypass roles from: {self.bypass_file}")
             if os.path.exists(self.bypass_file):
+                stamp = self._stat()
                 with open(self.bypass_file, 'r') as f:
                     data = json.load(f)
-                    self.bypass_roles = set(data.get('bypass_roles', []))
-                    logging.info(f"Loaded {len(self.bypass_roles)} bypass roles from {self.bypass_file}")
+                self.bypass_roles = {int(r) for r in data.get('bypass_roles', [])}
+                self._file_stamp = stamp
+                logging.info(f"Loaded {len(self.bypass_roles)} bypass roles from {self.bypass_file}")
             else:
                 # Create empty file if it doesn't exist
                 self.save_bypass_roles()
                 logging.info(f"Created new bypass roles file: {self.bypass_file}")
+            return True
         except Exception as e:
+            # A half-written or broken edit must not wipe the roles in use
             logging.error(f"Error loading bypass roles from {self.bypass_file}: {e}")
-            self.bypass_roles = set()
-    
+            return False
+
     def save_bypass_roles(self):
         """Save bypass roles to JSON file"""
         try:
             data = {
-                "bypass_roles": list(self.bypass_roles),
+                "bypass_roles": sorted(self.bypass_roles),
                 "last_updated": str(discord.utils.utcnow()),
                 "description": "Roles that bypass verification requirements"
             }
-            with open(self.bypass_file, 'w') as f:
+            tmp = f"{self.bypass_file}.tmp"
+            with open(tmp, 'w') as f:
                 json.dump(data, f, indent=2)
+            os.replace(tmp, self.bypass_file)
+            self._file_stamp = self._stat()
             logging.info(f"Saved {len(self.bypass_roles)} bypass roles to {self.bypass_file}")
         except Exception as e:
             logging.error(f"Error saving bypass roles to {self.bypass_file}: {e}")
-    
+
+    async def reload_if_changed(self) -> bool:
+        """Reload bypass_roles.json if it was edited since it was last read or written."""
+        stamp = self._stat()
+        if stamp is None or stamp == self._file_stamp:
+            return False
+        before = set(self.bypass_roles)
+        if not self.load_bypass_roles():
+            self._file_stamp = stamp  # report a broken edit once, not every check
+            return False
+        self.reloads += 1
+        logging.info("bypass_roles.json changed: %s -> %s bypass role(s)", len(before), len(self.bypass_roles))
+        return True
+
     def add_bypass_role(self, role_id: int) -> bool:
         """Add a role to bypass list"""
         if role_id not in self.bypass_roles:
-            self.bypass_roles.add(role_id)
+            self.bypass_roles = self.bypass_roles | {role_id}
             self.save_bypass_roles()
             return True
         return False
-    
+
     def remove_bypass_role(self, role_id: int) -> bool:
         """Remove a role from bypass list"""
         if role_id in self.bypass_roles:
-            self.bypass_roles.remove(role_id)
+            self.bypass_roles = self.bypass_roles - {role_id}
             self.save_bypass_roles()
             return True
         return False
-    
+
+    # --- membership index -----------------------------------------------------
+
+    def _holds_bypass_role(self, member: discord.Member) -> bool:
+        return any(member.get_role(role_id) is not None for role_id in self._bypass_roles)
+
+    def invalidate(self) -> None:
+        """Drop every guild's index; each is rebuilt on its next check."""
+        self._holders.clear()
+
+    def rebuild_index(self, guild: discord.Guild) -> Optional[Set[int]]:
+        """Index `guild` from the member cache. None if the cache is incomplete (not chunked)."""
+        if not guild.chunked:
+            self._holders.pop(guild.id, None)
+            return None
+        holders: Set[int] = set()
+        for role_id in self._bypass_roles:
+            role = guild.get_role(role_id)
+            if role is not None:
+                holders.update(m.id for m in role.members)
+        self._holders[guild.id] = holders
+        self.rebuilds += 1
+        return holders
+
+    def holders(self, guild: discord.Guild) -> Optional[Set[int]]:
+        """IDs of members holding a bypass role (None if the guild can't be indexed)."""
+        holders = self._holders.get(guild.id)
+        if holders is None:
+            holders = self.rebuild_index(guild)
+        return holders
+
+    def track(self, member: discord.Member) -> None:
+        """Update the index from a member object with current roles (event or fresh fetch)."""
+        holders = self._holders.get(member.guild.id)
+        if holders is None:
+            return
+        if self._holds_bypass_role(member):
+            holders.add(member.id)
+        else:
+            holders.discard(member.id)
+
     def has_bypass_role(self, member: discord.Member) -> bool:
         """Check if member has any bypass roles"""
-        if not self.bypass_roles:
+        if not self._bypass_roles:
             return False
-        
-        member_role_ids = {role.id for role in member.roles}
-        return bool(member_role_ids & self.bypass_roles)
-    
+        holders = self.holders(member.guild)
+        if holders is None:
+            return self._holds_bypass_role(member)
+        return member.id in holders
+
+    # Listeners, registered by cogs/member_management.py
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.track(member)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        self.track(after)
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        holders = self._holders.get(member.guild.id)
+        if holders is not None:
+            holders.discard(member.id)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        if role.id in self._bypass_roles and role.guild.id in self._holders:
+            self.rebuild_index(role.guild)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self._holders.pop(guild.id, None)
+
     def get_bypass_roles(self) -> Set[int]:
         """Get all bypass role IDs"""
         return self.bypass_roles.copy()
-    
+
     def get_bypass_role_names(self, guild: discord.Guild) -> List[str]:
         """Get bypass role names for a guild"""
         names = []
@@ -82,5 +209,12 @@ class BypassManager:
                 names.append(f"Unknown Role (ID: {role_id})")
         return names
 
+    def metrics_line(self) -> str:
+        holders = sum(len(h) for h in self._holders.values())
+        return (
+            f"bypass: {len(self._bypass_roles)} role(s) · {holders} holder(s) in {len(self._holders)} indexed guild(s)"
+            f" · {self.rebuilds} rebuild(s) · {self.reloads} file reload(s)"
+        )
+
 # Global instance
-bypass_manager = BypassManager()
\ No newline at end of file
+bypass_manager = BypassManager()
@@ -0,0 +1,109 @@
+"""
+Client profiles: which gateway intents and caches the bot runs with.
+
+CLIENT_PROFILE=default  members + message intents, discord.py default caches.
+CLIENT_PROFILE=lean     only guilds + members intents, no member cache, no message
+                        cache, no chunking at startup. Members are fetched on demand
+                        via get_or_fetch_member(). Meant for very large guilds.
+
+What the lean profile gives up (discord.py only reports cached members):
+- on_member_update never fires, so nothing reacts to role changes: the bypass
+  index is not used (bypass is checked from the member's own roles) and cached
+  /userinfo embeds go stale until their TTL.
+- on_member_remove never fires. Leaves are handled from on_raw_member_remove
+  instead (1-hour timer, grant job, stored roles, ticket, /userinfo cache); the
+  "User Left" log shows the user without their roles.
+- The hourly member-state reconciliation skips unchunked guilds, so state for a
+  leave missed while the bot was offline stays until the grant finds the user
+  gone or a dead letter is replayed.
+
+MAX_MESSAGES overrides the message cache size for either profile (0 disables it).
+DISCORD_API_BASE points REST requests at another server, e.g. the local fake API in
+simulation/rest_server.py (http://127.0.0.1:8765/api/v10). Unset means Discord.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import discord
+
+PROFILE_DEFAULT = "default"
+PROFILE_LEAN = "lean"
+
+
+def get_client_profile() -> str:
+    """Active profile from env CLIENT_PROFILE (default / lean)."""
+    raw = os.getenv("CLIENT_PROFILE", PROFILE_DEFAULT).strip().lower()
+    if raw not in (PROFILE_DEFAULT, PROFILE_LEAN):
+        logging.warning("Unknown CLIENT_PROFILE %r, using %s", raw, PROFILE_DEFAULT)
+        return PROFILE_DEFAULT
+    return raw
+
+
+def _max_messages_override() -> Optional[int]:
+    raw = os.getenv("MAX_MESSAGES", "").strip()
+    if not raw:
+        return None
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logging.warning("MAX_MESSAGES=%r is not an int, ignoring", raw)
+        return None
+
+
+def apply_api_base_override() -> Optional[str]:
+    """Send discord.py's REST requests to DISCORD_API_BASE if set. Returns the base in use."""
+    raw = os.getenv("DISCORD_API_BASE", "").strip().rstrip("/")
+    if raw:
+        if not raw.startswith(("http://", "https://")):
+            logging.warning("DISCORD_API_BASE=%r is not an http(s) URL, ignoring", raw)
+            return None
+        discord.http.Route.BASE = raw
+        logging.warning("REST requests go to %s instead of Discord", raw)
+        return raw
+    return None
+
+
+def build_intents(profile: str) -> discord.Intents:
+    if profile == PROFILE_LEAN:
+        # Join/leave/role events only; interactions (buttons, slash commands, modals)
+        # don't need any intent.
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.members = True
+        return intents
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    intents.guilds = True
+    intents.guild_messages = True
+    return intents
+
+
+def build_client_options(profile: Optional[str] = None) -> Dict[str, Any]:
+    """Keyword arguments for commands.Bot(...) for the given (or active) profile."""
+    profile = profile or get_client_profile()
+    options: Dict[str, Any] = {"intents": build_intents(profile)}
+    if profile == PROFILE_LEAN:
+        options["max_messages"] = None
+        options["member_cache_flags"] = discord.MemberCacheFlags.none()
+        options["chunk_guilds_at_startup"] = False
+    override = _max_messages_override()
+    if override is not None:
+        # discord.py treats <= 0 as "use 1000", so 0 maps to no cache
+        options["max_messages"] = override or None
+    return options
+
+
+async def get_or_fetch_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """guild.get_member, falling back to a REST fetch when the member isn't cached."""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+    except discord.HTTPException as e:
+        logging.warning("Could not fetch member %s in guild %s: %s", user_id, guild.id, e)
+        return None
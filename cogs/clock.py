@@ -0,0 +1,54 @@
+"""
+Clock for the bot's user-facing timers.
+
+The 1-hour access check, grant retry schedule, ticket auto-close, the Start
+Verification cooldown and /check_pending read the time from `clock` instead of
+calling datetime.now() / time.time() themselves. Normally that is the system
+clock. The simulation switches it to virtual time and advances it, so an hour of
+waiting takes milliseconds.
+
+Sleeps (supervisor intervals, catch-up pacing, retry backoff in the DM outbox)
+still use real time; a virtual-time run calls the periodic passes itself.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+class Clock:
+    def __init__(self):
+        self._virtual_now: Optional[datetime] = None
+
+    @property
+    def virtual(self) -> bool:
+        return self._virtual_now is not None
+
+    def now(self) -> datetime:
+        """Current time, timezone-aware UTC."""
+        if self._virtual_now is not None:
+            return self._virtual_now
+        return datetime.now(timezone.utc)
+
+    def time(self) -> float:
+        """Current time as epoch seconds (time.time())."""
+        if self._virtual_now is not None:
+            return self._virtual_now.timestamp()
+        return time.time()
+
+    def start_virtual(self, start: Optional[datetime] = None) -> datetime:
+        """Stop following the system clock; time stands still until advance()."""
+        self._virtual_now = start or datetime.now(timezone.utc)
+        return self._virtual_now
+
+    def advance(self, seconds: float) -> datetime:
+        if self._virtual_now is None:
+            raise RuntimeError("advance() needs virtual time (call start_virtual() first)")
+        self._virtual_now += timedelta(seconds=seconds)
+        return self._virtual_now
+
+    def use_system(self) -> None:
+        self._virtual_now = None
+
+
+# Global instance
+clock = Clock()
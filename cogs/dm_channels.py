@@ -0,0 +1,147 @@
+"""
+DM channel cache.
+
+user.send() has to open a DM channel (a REST call) whenever discord.py has not
+seen one for the user since startup, and users with closed DMs make every send
+fail with Forbidden. This module keeps:
+
+- a persisted map of user ID -> DM channel ID (dm_channels.json), so a send
+  after a restart is one request instead of two;
+- an in-memory TTL cache of users whose DMs are closed (error 50007), so doomed
+  sends are skipped and callers go straight to their fallback.
+
+rest_dispatcher.send_dm() goes through here; callers catch DMClosed next to
+discord.Forbidden.
+
+DM_CLOSED_TTL   seconds a user stays marked as not accepting DMs (default 21600)
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import discord
+
+from .task_supervisor import task_supervisor
+from .user_cache import TTLCache
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not an int, using %s", name, default)
+        return default
+
+
+DM_CHANNELS_FILE = "dm_channels.json"
+DM_CLOSED_TTL = _env_int("DM_CLOSED_TTL", 6 * 3600)
+DM_CLOSED_MAX_USERS = 10000
+# New channel IDs are written at most this often (a surge opens many DMs at once)
+DM_CHANNELS_FLUSH_SECONDS = 30
+# "Cannot send messages to this user"
+DM_CLOSED_ERROR_CODE = 50007
+
+
+class DMClosed(Exception):
+    """The user recently rejected a DM; the send was skipped."""
+
+    def __init__(self, user_id: int):
+        super().__init__(f"User {user_id} does not accept DMs")
+        self.user_id = user_id
+
+
+class DMChannelCache:
+    def __init__(self, channels_file: str = DM_CHANNELS_FILE):
+        self.channels_file = channels_file
+        self.channels: Dict[int, int] = {}
+        self.closed: TTLCache[int, bool] = TTLCache(DM_CLOSED_MAX_USERS, DM_CLOSED_TTL)
+        self.client: Optional[discord.Client] = None
+        self.skipped = 0
+        self.opened = 0
+        self._dirty = False
+        self.load()
+
+    def bind(self, client: discord.Client) -> None:
+        """Needed to send to a stored channel ID without opening the DM again."""
+        self.client = client
+
+    def load(self):
+        """Load the user -> DM channel map from JSON file"""
+        try:
+            if os.path.exists(self.channels_file):
+                with open(self.channels_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.channels = {int(k): int(v) for k, v in data.items()}
+                logging.info(f"Loaded {len(self.channels)} DM channels")
+        except Exception as e:
+            logging.error(f"Error loading DM channels from {self.channels_file}: {e}")
+
+    def save(self):
+        """Save the user -> DM channel map to JSON file (no-op if unchanged)"""
+        if not self._dirty:
+            return
+        try:
+            tmp_path = f"{self.channels_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({str(k): v for k, v in self.channels.items()}, f)
+            os.replace(tmp_path, self.channels_file)
+            self._dirty = False
+        except Exception as e:
+            logging.error(f"Error saving DM channels to {self.channels_file}: {e}")
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        task_supervisor.ensure("dm_channels_flush", self._flush, interval=DM_CHANNELS_FLUSH_SECONDS)
+
+    async def _flush(self) -> None:
+        self.save()
+
+    def is_closed(self, user_id: int) -> bool:
+        return self.closed.get(user_id) is not None
+
+    def _remember(self, user_id: int, channel_id: int) -> None:
+        if self.channels.get(user_id) != channel_id:
+            self.channels[user_id] = channel_id
+            self._mark_dirty()
+
+    def _channel_for(self, user: discord.abc.User) -> Optional[discord.abc.Messageable]:
+        if user.dm_channel is not None:
+            self._remember(user.id, user.dm_channel.id)
+            return user.dm_channel
+        channel_id = self.channels.get(user.id)
+        if channel_id is None or self.client is None:
+            return None
+        return self.client.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+
+    async def send(self, user: discord.abc.User, **kwargs: Any) -> discord.Message:
+        """Send a DM, reusing a known channel. Raises DMClosed if the user recently rejected DMs."""
+        if self.is_closed(user.id):
+            self.skipped += 1
+            raise DMClosed(user.id)
+        channel = self._channel_for(user)
+        try:
+            if channel is None:
+                channel = await user.create_dm()
+                self.opened += 1
+                self._remember(user.id, channel.id)
+            return await channel.send(**kwargs)
+        except discord.Forbidden as e:
+            if e.code == DM_CLOSED_ERROR_CODE:
+                self.closed.put(user.id, True)
+            raise
+        except discord.NotFound:
+            # Stored channel no longer valid; open a fresh one next time
+            if self.channels.pop(user.id, None) is not None:
+                self._mark_dirty()
+            raise
+
+    def metrics_line(self) -> str:
+        return (
+            f"dm channels: {len(self.channels)} known · opened {self.opened} · "
+            f"closed {len(self.closed)} · skipped {self.skipped}"
+        )
+
+
+# Global instance
+dm_channels = DMChannelCache()
@@ -0,0 +1,169 @@
+"""
+Background DM delivery.
+
+Event handlers call dm_outbox.enqueue() and return at once; a fixed pool of
+workers sends the DMs through rest_dispatcher.send_dm(). That keeps a join
+burst to DM_OUTBOX_WORKERS concurrent DMs and keeps slow DMs out of
+interaction responses.
+
+- 429s and 5xx are retried with exponential backoff plus jitter, up to
+  DM_MAX_ATTEMPTS; Forbidden/NotFound/DMClosed are final.
+- Each (user, template) is sent at most once per DM_DEDUPE_SECONDS; enqueue()
+  returns False for a duplicate so the caller can show the content inline.
+- on_result(sent) lets a caller log the outcome once delivery is settled.
+
+DM_OUTBOX_WORKERS   concurrent DM sends (default: the dispatcher's DM lane cap)
+DM_DEDUPE_SECONDS   window in which a template is sent once per user (default 86400)
+"""
+import asyncio
+import logging
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from .dm_channels import dm_channels, DMClosed
+from .rest_dispatcher import LANE_CAPS, LANE_DM, send_dm
+from .task_supervisor import task_supervisor
+from .user_cache import TTLCache
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not an int, using %s", name, default)
+        return default
+
+
+DM_OUTBOX_WORKERS = max(1, _env_int("DM_OUTBOX_WORKERS", LANE_CAPS[LANE_DM]))
+DM_DEDUPE_SECONDS = _env_int("DM_DEDUPE_SECONDS", 24 * 3600)
+DM_DEDUPE_MAX_ENTRIES = 50000
+DM_MAX_ATTEMPTS = 4
+DM_RETRY_BASE_SECONDS = 2.0
+DM_RETRY_MAX_SECONDS = 60.0
+
+ResultCallback = Callable[[bool], Awaitable[Any]]
+
+
+def _retryable(error: Exception) -> bool:
+    return isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500)
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter on top: base * 2^(n-1) + U(0, base * 2^(n-1))."""
+    delay = min(DM_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), DM_RETRY_MAX_SECONDS)
+    return delay + random.uniform(0, delay)
+
+
+class _DMJob:
+    __slots__ = ("user", "template", "kwargs", "on_result", "attempts")
+
+    def __init__(self, user: discord.abc.User, template: str, kwargs: Dict[str, Any], on_result: Optional[ResultCallback]):
+        self.user = user
+        self.template = template
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.attempts = 0
+
+
+class DMOutbox:
+    def __init__(self, workers: int = DM_OUTBOX_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        # (user_id, template) -> True while queued or sent within the dedupe window
+        self._recent: TTLCache = TTLCache(DM_DEDUPE_MAX_ENTRIES, DM_DEDUPE_SECONDS)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.deduped = 0
+        self.skipped = 0
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        for i in range(self.workers):
+            task_supervisor.ensure(f"dm_outbox_{i}", self._worker)
+        return self._queue
+
+    def enqueue(
+        self,
+        user: discord.abc.User,
+        template: str,
+        *,
+        on_result: Optional[ResultCallback] = None,
+        **kwargs: Any,
+    ) -> bool:
+        """Queue a DM. Returns False (nothing queued) if the user already got `template`
+        within the dedupe window or is known not to accept DMs."""
+        key = (user.id, template)
+        if self._recent.get(key) is not None:
+            self.deduped += 1
+            return False
+        if dm_channels.is_closed(user.id):
+            self.skipped += 1
+            return False
+        self._recent.put(key, True)
+        self._ensure_workers().put_nowait(_DMJob(user, template, kwargs, on_result))
+        return True
+
+    def _requeue(self, job: _DMJob) -> None:
+        if self._queue is not None:
+            self._queue.put_nowait(job)
+
+    async def _worker(self) -> None:
+        queue = self._ensure_workers()
+        while True:
+            job = await queue.get()
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                logging.error(f"DM outbox failed on {job.template} for user {job.user.id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, job: _DMJob) -> None:
+        job.attempts += 1
+        try:
+            await send_dm(job.user, **job.kwargs)
+        except Exception as e:
+            if _retryable(e) and job.attempts < DM_MAX_ATTEMPTS:
+                self.retried += 1
+                delay = _retry_delay(job.attempts)
+                logging.info(f"Retrying {job.template} DM to user {job.user.id} in {delay:.1f}s ({e})")
+                asyncio.get_running_loop().call_later(delay, self._requeue, job)
+                return
+            # Let a later event try again (DMs reopened, outage over)
+            self._recent.pop((job.user.id, job.template))
+            if isinstance(e, DMClosed):
+                self.skipped += 1
+            else:
+                self.failed += 1
+                if not isinstance(e, discord.Forbidden):
+                    logging.warning(f"Could not send {job.template} DM to user {job.user.id}: {e}")
+            await self._report(job, False)
+            return
+        self.sent += 1
+        await self._report(job, True)
+
+    async def _report(self, job: _DMJob, sent: bool) -> None:
+        if job.on_result is None:
+            return
+        try:
+            await job.on_result(sent)
+        except Exception as e:
+            logging.error(f"DM outbox result callback failed for {job.template}: {e}")
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics_lines(self) -> List[str]:
+        return [
+            f"queued {self.queue_depth()} · workers {self.workers} · sent {self.sent} · failed {self.failed}",
+            f"retried {self.retried} · deduped {self.deduped} · skipped (DMs closed) {self.skipped}",
+        ]
+
+
+# Global instance
+dm_outbox = DMOutbox()
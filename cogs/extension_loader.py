@@ -0,0 +1,118 @@
+"""
+Manifest-driven extension loader.
+
+extensions.json lists every cog/command module per package with an enabled flag.
+Only enabled modules are imported, so disabled subsystems (verification, Calendly,
+permission backup/restore) cost nothing at startup. Import and setup time per
+extension is recorded in `extension_timings` and shown in /debug.
+"""
+import importlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+from discord.ext import commands
+
+EXTENSIONS_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'extensions.json'))
+
+# Used when extensions.json is missing or unreadable (matches the shipped manifest)
+DEFAULT_MANIFEST: Dict[str, Dict[str, bool]] = {
+    "cogs": {
+        "member_management": True,
+        "verification": False,
+        "welcome": True,
+        "permission_snapshots": True,
+    },
+    "commands": {
+        "help_admin": True,
+        "force_verify": True,
+        "test_member_join": True,
+        "setup_permissions": True,
+        "restore_permissions": True,
+        "refresh_welcome": True,
+        "userinfo": True,
+        "debug_logs": True,
+        "check_pending": True,
+        "guild_config": True,
+        "dead_letters": True,
+        "bypass_roles": True,
+        "reload_cogs": False,
+    },
+}
+
+# "package.module" -> {"import_ms": float, "setup_ms": float, "status": str}
+extension_timings: Dict[str, Dict[str, object]] = {}
+
+
+def load_manifest() -> Dict[str, Dict[str, bool]]:
+    """Load extensions.json; fall back to DEFAULT_MANIFEST on error."""
+    try:
+        if os.path.exists(EXTENSIONS_FILE):
+            with open(EXTENSIONS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {pkg: {k: bool(v) for k, v in mods.items()} for pkg, mods in data.items() if isinstance(mods, dict)}
+    except Exception as e:
+        logging.error(f"Error loading extension manifest {EXTENSIONS_FILE}: {e}")
+    return {pkg: dict(mods) for pkg, mods in DEFAULT_MANIFEST.items()}
+
+
+def enabled_extensions(package: str) -> List[str]:
+    """Module names enabled for a package, in manifest order."""
+    return [name for name, enabled in load_manifest().get(package, {}).items() if enabled]
+
+
+def is_extension_enabled(package: str, name: str) -> bool:
+    return bool(load_manifest().get(package, {}).get(name, False))
+
+
+async def load_package_extensions(bot: commands.Bot, package: str) -> int:
+    """Import and set up every enabled module of `package`. Returns the number loaded.
+
+    A failing module is logged and skipped so the rest of the package still loads.
+    """
+    logger = logging.getLogger(package)
+    loaded = 0
+    for name in enabled_extensions(package):
+        qualified = f"{package}.{name}"
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(qualified)
+            imported = time.perf_counter()
+            await module.setup(bot)
+            done = time.perf_counter()
+        except Exception as e:
+            extension_timings[qualified] = {
+                "import_ms": (time.perf_counter() - start) * 1000,
+                "setup_ms": 0.0,
+                "status": "failed",
+            }
+            logger.error(f"Failed to load {qualified}: {e}")
+            continue
+        extension_timings[qualified] = {
+            "import_ms": (imported - start) * 1000,
+            "setup_ms": (done - imported) * 1000,
+            "status": "loaded",
+        }
+        loaded += 1
+        logger.debug(f"Loaded {qualified} (import {(imported - start) * 1000:.1f}ms, setup {(done - imported) * 1000:.1f}ms)")
+    return loaded
+
+
+def format_timings(limit: int = 10) -> str:
+    """Slowest extensions first, one line each, for /debug."""
+    if not extension_timings:
+        return "No extensions loaded"
+    rows = sorted(
+        extension_timings.items(),
+        key=lambda kv: float(kv[1]["import_ms"]) + float(kv[1]["setup_ms"]),
+        reverse=True,
+    )
+    lines = []
+    for qualified, t in rows[:limit]:
+        icon = "✅" if t["status"] == "loaded" else "❌"
+        lines.append(f"{icon} {qualified}: {float(t['import_ms']):.1f}ms import / {float(t['setup_ms']):.1f}ms setup")
+    if len(rows) > limit:
+        lines.append(f"…and {len(rows) - limit} more")
+    return "\n".join(lines)
@@ -0,0 +1,224 @@
+"""
+Durable queue for 1-hour access grants.
+
+Users whose hour is up move from pending_users.json into grant_jobs.json and
+stay there until the grant succeeds. Failed attempts (Forbidden, Discord 5xx,
+member fetch errors) are retried with exponential backoff; after
+GRANT_MAX_ATTEMPTS the job moves to a dead-letter list that admins can inspect
+with /dead_letters and replay with /replay_dead_letters. Failures that no retry
+can fix (a configured role no longer exists) are dead-lettered at once.
+
+After downtime, a pass that finds more than GRANT_CATCHUP_THRESHOLD due grants
+in a guild hands them to a paced catch-up run (oldest join first) instead of
+granting them back-to-back:
+
+GRANT_CATCHUP_THRESHOLD  due grants in one pass that start catch-up (default 25)
+GRANT_CATCHUP_RATE       catch-up grants per second per guild (default 1)
+GRANT_CATCHUP_WORKERS    concurrent catch-up grants per guild (default 2)
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from .clock import clock
+
+GRANT_JOBS_FILE = "grant_jobs.json"
+
+GRANT_MAX_ATTEMPTS = 6
+GRANT_BACKOFF_BASE_SECONDS = 60
+GRANT_BACKOFF_MAX_SECONDS = 6 * 3600
+
+JobKey = Tuple[int, int]  # (guild_id, user_id)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not a number, using %s", name, default)
+        return default
+
+
+GRANT_CATCHUP_THRESHOLD = int(_env_number("GRANT_CATCHUP_THRESHOLD", 25))
+GRANT_CATCHUP_RATE = _env_number("GRANT_CATCHUP_RATE", 1.0) or 1.0
+GRANT_CATCHUP_WORKERS = max(1, int(_env_number("GRANT_CATCHUP_WORKERS", 2)))
+GRANT_CATCHUP_REPORT_SECONDS = 60
+
+
+class GrantFailed(Exception):
+    """A grant attempt failed. Retried with backoff unless `retryable` is False."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = GRANT_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=min(seconds, GRANT_BACKOFF_MAX_SECONDS))
+
+
+class GrantJobQueue:
+    def __init__(self, jobs_file: str = GRANT_JOBS_FILE):
+        self.jobs_file = jobs_file
+        # Jobs and dead letters are plain dicts so they round-trip through JSON unchanged
+        self.jobs: Dict[JobKey, Dict[str, Any]] = {}
+        self.dead_letters: Dict[JobKey, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        """Load jobs and dead letters from JSON file"""
+        try:
+            if os.path.exists(self.jobs_file):
+                with open(self.jobs_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.jobs = {(j["guild_id"], j["user_id"]): j for j in data.get("jobs", [])}
+                self.dead_letters = {(j["guild_id"], j["user_id"]): j for j in data.get("dead_letters", [])}
+                logging.info(f"Loaded {len(self.jobs)} grant jobs and {len(self.dead_letters)} dead letters")
+        except Exception as e:
+            logging.error(f"Error loading grant jobs from {self.jobs_file}: {e}")
+
+    def save(self):
+        """Save jobs and dead letters to JSON file"""
+        try:
+            data = {"jobs": list(self.jobs.values()), "dead_letters": list(self.dead_letters.values())}
+            tmp_path = f"{self.jobs_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.jobs_file)
+        except Exception as e:
+            logging.error(f"Error saving grant jobs to {self.jobs_file}: {e}")
+
+    def enqueue(self, guild_id: int, user_id: int, joined_at: Optional[datetime] = None) -> bool:
+        """Add a grant job (no-op if one is already queued). Returns True if added."""
+        key = (guild_id, user_id)
+        if key in self.jobs:
+            return False
+        now = clock.now()
+        self.jobs[key] = {
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "joined_at": (joined_at or now).isoformat(),
+            "attempts": 0,
+            "next_attempt": now.isoformat(),
+            "last_error": None,
+        }
+        return True
+
+    def due(self, guild_id: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Jobs for a guild whose next attempt is due, oldest join first."""
+        now = now or clock.now()
+        jobs = [
+            job for (gid, _), job in self.jobs.items()
+            if gid == guild_id and datetime.fromisoformat(job["next_attempt"]) <= now
+        ]
+        return sorted(jobs, key=lambda j: j["joined_at"])
+
+    def complete(self, guild_id: int, user_id: int):
+        self.jobs.pop((guild_id, user_id), None)
+
+    def forget(self, guild_id: int, user_id: int) -> bool:
+        """Drop a user's job and dead letter (they left the guild). Returns True if anything was removed."""
+        removed = self.jobs.pop((guild_id, user_id), None) is not None
+        return self.dead_letters.pop((guild_id, user_id), None) is not None or removed
+
+    def record_failure(self, guild_id: int, user_id: int, error: str, now: Optional[datetime] = None,
+                       retryable: bool = True) -> bool:
+        """Count a failed attempt. Returns True if the job was moved to the dead-letter list
+        (out of attempts, or the failure is not retryable)."""
+        job = self.jobs.get((guild_id, user_id))
+        if job is None:
+            return False
+        now = now or clock.now()
+        job["attempts"] += 1
+        job["last_error"] = error[:300]
+        if job["attempts"] >= GRANT_MAX_ATTEMPTS or not retryable:
+            job["dead_at"] = now.isoformat()
+            self.dead_letters[(guild_id, user_id)] = self.jobs.pop((guild_id, user_id))
+            return True
+        job["next_attempt"] = (now + _backoff(job["attempts"])).isoformat()
+        return False
+
+    def dead_letters_for(self, guild_id: int) -> List[Dict[str, Any]]:
+        return sorted(
+            (job for (gid, _), job in self.dead_letters.items() if gid == guild_id),
+            key=lambda j: j.get("dead_at", ""),
+        )
+
+    def guild_ids(self) -> Set[int]:
+        return {gid for gid, _ in self.jobs}
+
+    def pending_jobs_for(self, guild_id: int) -> List[Dict[str, Any]]:
+        return [job for (gid, _), job in self.jobs.items() if gid == guild_id]
+
+    def replay(self, guild_id: int, user_ids: Optional[List[int]] = None) -> int:
+        """Move dead letters back into the queue with a fresh retry budget."""
+        now = clock.now().isoformat()
+        replayed = 0
+        for key in list(self.dead_letters):
+            gid, uid = key
+            if gid != guild_id or (user_ids is not None and uid not in user_ids):
+                continue
+            job = self.dead_letters.pop(key)
+            job.pop("dead_at", None)
+            job["attempts"] = 0
+            job["next_attempt"] = now
+            self.jobs[key] = job
+            replayed += 1
+        return replayed
+
+
+class GrantCatchUp:
+    """A paced run over one guild's overdue grants (oldest join first)."""
+
+    def __init__(self, guild_id: int, jobs: List[Dict[str, Any]], rate: float = GRANT_CATCHUP_RATE):
+        self.guild_id = guild_id
+        self.rate = rate
+        self.queue: Deque[int] = deque(job["user_id"] for job in sorted(jobs, key=lambda j: j["joined_at"]))
+        # Queued or in flight; the regular pass leaves these users alone
+        self.user_ids: Set[int] = set(self.queue)
+        self.total = len(self.queue)
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self._next_slot = self.started
+
+    def next_user(self) -> Optional[int]:
+        return self.queue.popleft() if self.queue else None
+
+    def finish(self, user_id: int, ok: bool) -> None:
+        self.user_ids.discard(user_id)
+        self.done += 1
+        if not ok:
+            self.failed += 1
+
+    async def pace(self) -> None:
+        """Wait for this worker's turn: grants start at most `rate` per second across workers."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def eta_seconds(self) -> float:
+        remaining = self.total - self.done
+        elapsed = time.monotonic() - self.started
+        observed = self.done / elapsed if self.done and elapsed > 0 else self.rate
+        return remaining / min(observed, self.rate)
+
+    def report_due(self, interval: float = GRANT_CATCHUP_REPORT_SECONDS) -> bool:
+        now = time.monotonic()
+        if now - self.last_report < interval:
+            return False
+        self.last_report = now
+        return True
+
+
+# Global instance
+grant_queue = GrantJobQueue()
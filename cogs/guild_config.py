@@ -0,0 +1,176 @@
+"""
+Per-guild settings so one process can serve several communities.
+
+Settings are stored in guild_configs.json as overrides per guild. Anything not
+overridden falls back to the process-wide env var (UNVERIFIED_ROLE_ID,
+MEMBER_ROLE_ID, WELCOME_CHANNEL_ID, LOGS_CHANNEL_ID, CALL_BOOKING_LINK,
+PAID_ROLE_IDS), so a single-guild .env setup keeps working unchanged.
+
+Resolved configs are cached in memory; handlers call guild_configs.get(guild.id)
+once per event and pass the result down. Edits invalidate that guild's entry.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+import discord
+
+GUILD_CONFIG_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'guild_configs.json'))
+
+DEFAULT_CALL_BOOKING_LINK = "https://app.iclosed.io/e/barracudagrowth/vito-s-concepts-intiation-call-d"
+
+# setting name -> (env var fallback, kind)
+CONFIG_KEYS: Dict[str, tuple] = {
+    "unverified_role_id": ("UNVERIFIED_ROLE_ID", "id"),
+    "member_role_id": ("MEMBER_ROLE_ID", "id"),
+    "welcome_channel_id": ("WELCOME_CHANNEL_ID", "id"),
+    "logs_channel_id": ("LOGS_CHANNEL_ID", "id"),
+    "booking_link": ("CALL_BOOKING_LINK", "str"),
+    "paid_role_ids": ("PAID_ROLE_IDS", "id_list"),
+}
+
+
+def _parse_id(raw: Any) -> int:
+    try:
+        return int(str(raw).strip()) if raw is not None and str(raw).strip() else 0
+    except ValueError:
+        return 0
+
+
+def _parse_id_list(raw: Any) -> FrozenSet[int]:
+    if isinstance(raw, (list, tuple, set, frozenset)):
+        return frozenset(i for i in (_parse_id(r) for r in raw) if i)
+    ids = set()
+    for part in str(raw or "").replace(" ", "").split(","):
+        if part.isdigit():
+            ids.add(int(part))
+    return frozenset(ids)
+
+
+def _env_default(key: str) -> Any:
+    env_var, kind = CONFIG_KEYS[key]
+    raw = os.getenv(env_var)
+    if kind == "id":
+        return _parse_id(raw)
+    if kind == "id_list":
+        return _parse_id_list(raw)
+    if key == "booking_link":
+        return raw or DEFAULT_CALL_BOOKING_LINK
+    return raw or ""
+
+
+class GuildConfig:
+    """Resolved (override or env) settings for one guild. Treat as read-only."""
+
+    __slots__ = ("guild_id",) + tuple(CONFIG_KEYS)
+
+    def __init__(self, guild_id: int, overrides: Dict[str, Any]):
+        self.guild_id = guild_id
+        for key, (_, kind) in CONFIG_KEYS.items():
+            if key in overrides:
+                value = overrides[key]
+                if kind == "id":
+                    value = _parse_id(value)
+                elif kind == "id_list":
+                    value = _parse_id_list(value)
+            else:
+                value = _env_default(key)
+            setattr(self, key, value)
+
+    def logs_channel(self, guild: discord.Guild) -> Optional[discord.abc.GuildChannel]:
+        return guild.get_channel(self.logs_channel_id) if self.logs_channel_id else None
+
+    def welcome_channel(self, guild: discord.Guild) -> Optional[discord.abc.GuildChannel]:
+        return guild.get_channel(self.welcome_channel_id) if self.welcome_channel_id else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in CONFIG_KEYS}
+
+
+class GuildConfigManager:
+    def __init__(self):
+        self.config_file = GUILD_CONFIG_FILE
+        self.overrides: Dict[int, Dict[str, Any]] = {}
+        self._cache: Dict[int, GuildConfig] = {}
+        self.load()
+
+    def load(self):
+        """Load per-guild overrides from JSON file"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.overrides = {
+                    int(gid): {k: v for k, v in values.items() if k in CONFIG_KEYS}
+                    for gid, values in data.get("guilds", {}).items()
+                }
+                logging.info(f"Loaded config for {len(self.overrides)} guild(s) from {self.config_file}")
+        except Exception as e:
+            logging.error(f"Error loading guild configs from {self.config_file}: {e}")
+            self.overrides = {}
+        self._cache.clear()
+
+    def save(self):
+        """Save per-guild overrides to JSON file"""
+        try:
+            data = {
+                "guilds": {str(gid): values for gid, values in self.overrides.items()},
+                "last_updated": str(discord.utils.utcnow()),
+            }
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            logging.error(f"Error saving guild configs to {self.config_file}: {e}")
+
+    def get(self, guild_id: int) -> GuildConfig:
+        """Resolved config for a guild (cached until the guild's settings change)."""
+        config = self._cache.get(guild_id)
+        if config is None:
+            config = GuildConfig(guild_id, self.overrides.get(guild_id, {}))
+            self._cache[guild_id] = config
+        return config
+
+    def set(self, guild_id: int, key: str, value: Any) -> GuildConfig:
+        if key not in CONFIG_KEYS:
+            raise KeyError(key)
+        kind = CONFIG_KEYS[key][1]
+        if kind == "id":
+            value = _parse_id(value)
+        elif kind == "id_list":
+            value = sorted(_parse_id_list(value))
+        self.overrides.setdefault(guild_id, {})[key] = value
+        self._cache.pop(guild_id, None)
+        self.save()
+        return self.get(guild_id)
+
+    def reset(self, guild_id: int, key: Optional[str] = None) -> GuildConfig:
+        """Drop one override (or all of them) so the env value applies again."""
+        values = self.overrides.get(guild_id)
+        if values is not None:
+            if key is None:
+                values.clear()
+            else:
+                values.pop(key, None)
+            self._cache.pop(guild_id, None)
+            self.save()
+        return self.get(guild_id)
+
+    def managed_guild_ids(self) -> Set[int]:
+        """Env GUILD_ID plus every guild with saved settings."""
+        ids = set(self.overrides)
+        env_guild = _parse_id(os.getenv("GUILD_ID"))
+        if env_guild:
+            ids.add(env_guild)
+        return ids
+
+    def is_managed(self, guild_id: int) -> bool:
+        return guild_id in self.managed_guild_ids()
+
+    def default_guild_id(self) -> int:
+        """Env GUILD_ID; legacy state files without a guild belong to it."""
+        return _parse_id(os.getenv("GUILD_ID"))
+
+
+# Global instance
+guild_configs = GuildConfigManager()
@@ -0,0 +1,96 @@
+"""
+Join-surge detection for raids and big promos.
+
+A sliding window of join timestamps per guild decides when member_management
+switches from the per-member join flow to its batched pipeline (queue + bounded
+workers, deferred DMs, one state write and one summary embed per batch).
+
+JOIN_SURGE_THRESHOLD   joins within the window that start surge mode (default 10, 0 disables)
+JOIN_SURGE_WINDOW      window length in seconds (default 10)
+JOIN_SURGE_WORKERS     concurrent join workers while surging (default 4)
+JOIN_SURGE_FLUSH       seconds between batch flushes (default 5)
+JOIN_SURGE_MAX_DMS     welcome DMs sent after a surge per guild; the rest are skipped (default 100)
+
+Surge mode ends once the window holds fewer than half the threshold.
+"""
+import logging
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+from .clock import clock
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not an int, using %s", name, default)
+        return default
+
+
+class JoinSurgeDetector:
+    def __init__(self, threshold: int, window: float):
+        self.threshold = threshold
+        self.window = window
+        self._joins: Dict[int, Deque[float]] = {}
+        self._surging: Set[int] = set()
+
+    def _prune(self, guild_id: int, now: float) -> Deque[float]:
+        joins = self._joins.setdefault(guild_id, deque())
+        cutoff = now - self.window
+        while joins and joins[0] < cutoff:
+            joins.popleft()
+        return joins
+
+    def record(self, guild_id: int, now: Optional[float] = None) -> bool:
+        """Record one join; returns True if the guild is (now) in surge mode."""
+        if not self.threshold:
+            return False
+        now = clock.time() if now is None else now
+        joins = self._prune(guild_id, now)
+        joins.append(now)
+        if guild_id not in self._surging and len(joins) >= self.threshold:
+            self._surging.add(guild_id)
+            logging.warning("Join surge detected in guild %s: %s joins in %ss", guild_id, len(joins), self.window)
+        return self.is_surging(guild_id, now)
+
+    def is_surging(self, guild_id: int, now: Optional[float] = None) -> bool:
+        if guild_id not in self._surging:
+            return False
+        now = clock.time() if now is None else now
+        joins = self._prune(guild_id, now)
+        if len(joins) < max(1, self.threshold // 2):
+            self._surging.discard(guild_id)
+            logging.info("Join surge over in guild %s", guild_id)
+            return False
+        return True
+
+    def join_rate(self, guild_id: int, now: Optional[float] = None) -> int:
+        """Joins in the current window."""
+        now = clock.time() if now is None else now
+        return len(self._prune(guild_id, now))
+
+
+class SurgeBatch:
+    """Joins processed by the surge workers since the last flush (one guild)."""
+
+    __slots__ = ("joined", "bypass", "failed", "dms_skipped", "started_at")
+
+    def __init__(self):
+        self.joined: List[int] = []
+        self.bypass: List[int] = []
+        self.failed = 0
+        self.dms_skipped = 0
+        self.started_at = clock.time()
+
+
+SURGE_WORKERS = _env_int("JOIN_SURGE_WORKERS", 4) or 1
+SURGE_FLUSH_SECONDS = _env_int("JOIN_SURGE_FLUSH", 5) or 1
+SURGE_MAX_DMS = _env_int("JOIN_SURGE_MAX_DMS", 100)
+
+# Global instance
+join_surge_detector = JoinSurgeDetector(
+    threshold=_env_int("JOIN_SURGE_THRESHOLD", 10),
+    window=_env_int("JOIN_SURGE_WINDOW", 10) or 1,
+)
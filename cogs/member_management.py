@@ -4,14 +4,29 @@ from discord import app_commands
 import logging
 import os
 import asyncio
-from typing import Dict, List, Set, Optional, Any
+import functools
+import time
+from collections import deque
+from typing import Deque, Dict, List, Set, Optional, Any, Tuple
 from datetime import datetime, timezone, timedelta
 from .security_utils import (
     security_check, log_admin_action, safe_int_convert, 
     validate_input, check_rate_limit, safe_audit_log_check,
     SecureLogger, sanitize_log_message
 )
-from .bypass_manager import bypass_manager
+from .bypass_manager import bypass_manager, BYPASS_WATCH_SECONDS
+from .client_profile import get_or_fetch_member
+from .sharding import owned_guilds
+from .guild_config import guild_configs, GuildConfig
+from .task_supervisor import task_supervisor
+from .clock import clock
+from .dm_outbox import dm_outbox
+from .rest_dispatcher import add_roles, remove_roles, queue_log, LANE_ADMIN, LANE_GRANT
+from .grant_queue import (
+    grant_queue, GrantFailed, GrantCatchUp, GRANT_CATCHUP_THRESHOLD, GRANT_CATCHUP_WORKERS,
+)
+from .pending_store import PendingAccessStore, from_epoch
+from .join_surge import join_surge_detector, SurgeBatch, SURGE_WORKERS, SURGE_FLUSH_SECONDS, SURGE_MAX_DMS
 import json
 import io
 import json as pyjson
@@ -40,259 +55,478 @@ def _parse_role_id(env_var: str, default: int = 0) -> int:
         return default
 
 STORED_ROLES_FILE = "stored_roles_on_join.json"
-
-
-def _load_stored_roles() -> Dict[str, List[int]]:
+PENDING_USERS_FILE = "pending_users.json"
+# How often stored per-user state is checked against the member cache
+STATE_RECONCILE_SECONDS = 3600
+
+
+def parse_pending_users(data: Dict[str, Any]) -> Dict[int, Dict[int, datetime]]:
+    """pending_users.json -> {guild_id: {user_id: join_time}}.
+
+    Legacy flat files ({user_id: timestamp}) belong to the env GUILD_ID guild.
+    """
+    pending: Dict[int, Dict[int, datetime]] = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            users = pending.setdefault(int(key), {})
+            for user_id_str, timestamp_str in value.items():
+                users[int(user_id_str)] = datetime.fromisoformat(timestamp_str)
+        else:
+            pending.setdefault(guild_configs.default_guild_id(), {})[int(key)] = datetime.fromisoformat(value)
+    return pending
+
+
+def parse_stored_roles(data: Dict[str, Any]) -> Dict[int, Dict[int, List[int]]]:
+    """stored_roles_on_join.json -> {guild_id: {user_id: [role_id, ...]}}.
+
+    Legacy flat files ({user_id: [role_ids]}) belong to the env GUILD_ID guild.
+    """
+    stored: Dict[int, Dict[int, List[int]]] = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            users = stored.setdefault(int(key), {})
+            for user_id_str, role_ids in value.items():
+                users[int(user_id_str)] = [int(r) for r in role_ids]
+        else:
+            role_ids = value if isinstance(value, list) else [value]
+            stored.setdefault(guild_configs.default_guild_id(), {})[int(key)] = [int(r) for r in role_ids]
+    return stored
+
+
+def _load_stored_roles() -> Dict[int, Dict[int, List[int]]]:
     """Roles we stripped on join (e.g. Whop free member role); restore after 1hr."""
     try:
         if os.path.exists(STORED_ROLES_FILE):
             with open(STORED_ROLES_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return {k: v if isinstance(v, list) else [v] for k, v in data.items()}
+                return parse_stored_roles(json.load(f))
     except Exception as e:
         SecureLogger.error(f"Error loading stored roles: {e}")
     return {}
 
 
-def _save_stored_roles(data: Dict[str, List[int]]) -> None:
+def _save_stored_roles(data: Dict[int, Dict[int, List[int]]]) -> None:
     try:
+        out = {
+            str(guild_id): {str(user_id): role_ids for user_id, role_ids in users.items()}
+            for guild_id, users in data.items() if users
+        }
         with open(STORED_ROLES_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            json.dump(out, f, indent=2)
     except Exception as e:
         SecureLogger.error(f"Error saving stored roles: {e}")
 
 
+def _member_event_embed(guild, title, description, user, color, roles=None) -> discord.Embed:
+    """The logs channel embed for a member event (join, leave, 1-hour access, ...)."""
+    embed = discord.Embed(
+        title=title,
+        description=description,
+        color=color,
+        timestamp=datetime.now(timezone.utc)
+    )
+    embed.set_thumbnail(url=user.display_avatar.url)
+    embed.add_field(name="User", value=f"{user.mention}\n({user.name})", inline=True)
+    embed.add_field(name="User ID", value=user.id, inline=True)
+    embed.add_field(name="Account Created", value=f"<t:{int(user.created_at.timestamp())}:R>", inline=True)
+    if roles:
+        embed.add_field(name="Roles", value=", ".join(role.name for role in roles), inline=False)
+    embed.set_footer(text=f"Guild: {guild.name}")
+    return embed
+
+
 class MemberManagement(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.pending_users: Dict[int, datetime] = {}  # user_id: join_time
-        self.stored_roles: Dict[str, List[int]] = {}  # user_id -> role ids we stripped on join
+        self.pending_users = PendingAccessStore()  # guild_id -> users waiting for 1-hour access
+        self.stored_roles: Dict[int, Dict[int, List[int]]] = {}  # guild_id -> user_id -> role ids we stripped on join
         self.load_pending_users()
         self.stored_roles = _load_stored_roles()
+        # Join-surge pipeline state (see cogs/join_surge.py)
+        self._surge_queue: asyncio.Queue = asyncio.Queue()
+        self._surge_batches: Dict[int, SurgeBatch] = {}
+        self._surge_restrip: Dict[int, List[int]] = {}
+        self._deferred_dms: Dict[int, Deque[int]] = {}
+        # Surge joiners missing from the cache at flush time; re-stripped via REST once the surge ends
+        self._deferred_restrip: Dict[int, Deque[int]] = {}
+        # guild_id -> paced run over grants that were overdue after downtime
+        self._catchups: Dict[int, GrantCatchUp] = {}
+        # (guild_id, user_id) -> delayed strip task started on join
+        self._strip_tasks: Dict[Tuple[int, int], asyncio.Task] = {}
         SecureLogger.info("MemberManagement cog initialized (Vito: 1-hour auto-access, no verification)")
 
     def load_pending_users(self):
         """Load pending users from file"""
         try:
-            if os.path.exists('pending_users.json'):
-                with open('pending_users.json', 'r') as f:
-                    data = json.load(f)
-                    for user_id_str, timestamp_str in data.items():
-                        user_id = int(user_id_str)
-                        join_time = datetime.fromisoformat(timestamp_str)
-                        self.pending_users[user_id] = join_time
-                SecureLogger.info(f"Loaded {len(self.pending_users)} pending users")
+            if os.path.exists(PENDING_USERS_FILE):
+                with open(PENDING_USERS_FILE, 'r') as f:
+                    self.pending_users = PendingAccessStore.from_mapping(parse_pending_users(json.load(f)))
+                SecureLogger.info(f"Loaded {self.pending_count()} pending users")
         except Exception as e:
             SecureLogger.error(f"Error loading pending users: {e}")
 
     def save_pending_users(self):
         """Save pending users to file"""
         try:
-            data = {}
-            for user_id, join_time in self.pending_users.items():
-                data[str(user_id)] = join_time.isoformat()
-            with open('pending_users.json', 'w') as f:
+            data = self.pending_users.to_json()
+            with open(PENDING_USERS_FILE, 'w') as f:
                 json.dump(data, f, indent=2)
         except Exception as e:
             SecureLogger.error(f"Error saving pending users: {e}")
 
+    def pending_count(self) -> int:
+        return self.pending_users.count()
+
+    def discard_pending(self, guild_id: int, user_ids) -> int:
+        """Drop users from a guild's 1-hour timer (verified elsewhere, ticket closed, ...)."""
+        removed = 0
+        for user_id in user_ids:
+            if self.pending_users.remove(guild_id, user_id):
+                removed += 1
+        if removed:
+            self.save_pending_users()
+        return removed
+
     async def check_1_hour_access(self):
-        """Check for users who should get access after 1 hour"""
-        current_time = datetime.now(timezone.utc)
-        users_to_grant_access = []
-        
-        for user_id, join_time in self.pending_users.items():
-            if current_time - join_time >= timedelta(minutes=60):
-                users_to_grant_access.append(user_id)
+        """Queue users whose hour is up as grant jobs, then run every due job"""
+        current_time = clock.now()
+        moved_any = False
+        ran_any = False
         
-        for user_id in users_to_grant_access:
-            await self.grant_1_hour_access(user_id)
-            del self.pending_users[user_id]
+        # Only guilds on this process's shards; other shards handle the rest
+        for guild in owned_guilds(self.bot, self.pending_users.guild_ids() | grant_queue.guild_ids()):
+            user_ids, joined = self.pending_users.pop_due(guild.id, current_time - timedelta(minutes=60))
+            for user_id, join_ts in zip(user_ids, joined):
+                grant_queue.enqueue(guild.id, user_id, from_epoch(join_ts))
+            if user_ids:
+                moved_any = True
+            catchup = self._catchups.get(guild.id)
+            jobs = [j for j in grant_queue.due(guild.id) if catchup is None or j["user_id"] not in catchup.user_ids]
+            if not jobs:
+                continue
+            if catchup is None and len(jobs) > GRANT_CATCHUP_THRESHOLD:
+                # Backlog after downtime: pace it in the background; new joiners keep going through here
+                self._start_catchup(guild, jobs)
+                continue
+            config = guild_configs.get(guild.id)
+            for job in jobs:
+                await self._run_grant_job(job["user_id"], guild, config)
+            ran_any = True
         
-        if users_to_grant_access:
+        # Queue first: a crash in between leaves the user in both files, never in neither
+        if moved_any or ran_any:
+            grant_queue.save()
+        if moved_any:
             self.save_pending_users()
 
-    async def grant_1_hour_access(self, user_id: int):
-        """After 1hr: restore roles we stripped on join (e.g. Whop member role), or grant MEMBER_ROLE_ID; remove unverified."""
+    def _start_catchup(self, guild: discord.Guild, jobs: List[Dict[str, Any]]) -> None:
+        catchup = self._catchups[guild.id] = GrantCatchUp(guild.id, jobs)
+        SecureLogger.info(f"Catching up {catchup.total} overdue grants in guild {guild.id}")
+        for i in range(min(GRANT_CATCHUP_WORKERS, catchup.total)):
+            task_supervisor.ensure(
+                f"grant_catchup_{guild.id}_{i}",
+                functools.partial(self._catchup_worker, guild.id),
+                owner=self,
+            )
+        self._report_catchup(guild, catchup, "started")
+
+    async def _catchup_worker(self, guild_id: int) -> None:
+        catchup = self._catchups.get(guild_id)
+        guild = self.bot.get_guild(guild_id)
+        if catchup is None or guild is None:
+            return
+        config = guild_configs.get(guild_id)
+        while True:
+            user_id = catchup.next_user()
+            if user_id is None:
+                break
+            await catchup.pace()
+            try:
+                ok = await self._run_grant_job(user_id, guild, config)
+            except Exception as e:
+                SecureLogger.error(f"Catch-up grant for user {user_id} crashed: {e}")
+                ok = False
+            catchup.finish(user_id, ok)
+            if catchup.report_due():
+                grant_queue.save()
+                self._report_catchup(guild, catchup, "progress")
+        if catchup.done == catchup.total and self._catchups.get(guild_id) is catchup:
+            del self._catchups[guild_id]
+            grant_queue.save()
+            self._report_catchup(guild, catchup, "finished")
+
+    def _report_catchup(self, guild: discord.Guild, catchup: GrantCatchUp, stage: str) -> None:
+        logs_channel = guild_configs.get(guild.id).logs_channel(guild)
+        elapsed = time.monotonic() - catchup.started
+        SecureLogger.info(
+            f"Grant catch-up {stage} in guild {guild.id}: {catchup.done}/{catchup.total} "
+            f"({catchup.failed} failed), {elapsed:.0f}s elapsed"
+        )
+        if not logs_channel:
+            return
+        if stage == "finished":
+            description = f"Processed **{catchup.total}** overdue grant(s) in {elapsed / 60:.1f} min."
+        else:
+            description = (
+                f"**{catchup.done}/{catchup.total}** overdue grant(s) processed · "
+                f"ETA ~{catchup.eta_seconds() / 60:.1f} min at up to {catchup.rate:g}/s"
+            )
+        embed = discord.Embed(
+            title=f"⏳ Access Grant Catch-up {stage.capitalize()}",
+            description=description,
+            color=discord.Color.green() if stage == "finished" else discord.Color.orange(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        if catchup.failed:
+            embed.add_field(name="Failed (will retry)", value=str(catchup.failed), inline=True)
+        embed.set_footer(text=f"Guild: {guild.name}")
+        queue_log(logs_channel, embed=embed)
+
+    async def _run_grant_job(self, user_id: int, guild: discord.Guild, config: GuildConfig) -> bool:
+        """Run one grant attempt; returns True if it succeeded."""
         try:
-            guild_id = int(os.getenv('GUILD_ID', 0))
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                return
-            member = guild.get_member(user_id)
-            if not member:
+            await self.grant_1_hour_access(user_id, guild, config)
+        except GrantFailed as e:
+            if grant_queue.record_failure(guild.id, user_id, str(e), retryable=e.retryable):
+                SecureLogger.error(f"Grant for user {user_id} moved to dead letters: {e}")
+                logs_channel = config.logs_channel(guild)
+                if logs_channel:
+                    attempts = grant_queue.dead_letters[(guild.id, user_id)]["attempts"]
+                    reason = f"after {attempts} attempts" if e.retryable else "(retrying cannot fix this)"
+                    embed = discord.Embed(
+                        title="❌ 1-Hour Access Failed",
+                        description=f"<@{user_id}> could not be granted access {reason}. Use /dead_letters to review and /replay_dead_letters to retry once the cause is fixed.",
+                        color=discord.Color.red(),
+                        timestamp=datetime.now(timezone.utc)
+                    )
+                    embed.add_field(name="User ID", value=str(user_id), inline=True)
+                    embed.add_field(name="Last Error", value=str(e)[:1000], inline=False)
+                    embed.set_footer(text=f"Guild: {guild.name}")
+                    queue_log(logs_channel, embed=embed)
+            else:
+                logging.warning("Grant for user %s failed, will retry: %s", user_id, e)
+            return False
+        grant_queue.complete(guild.id, user_id)
+        return True
+
+    async def grant_1_hour_access(self, user_id: int, guild: discord.Guild, config: Optional[GuildConfig] = None):
+        """After 1hr: restore roles we stripped on join (e.g. Whop member role), or grant the member role; remove unverified.
+
+        Raises GrantFailed when any step fails so the grant queue retries it. A member
+        who has left the server is not an error (there is nothing to grant).
+        """
+        config = config or guild_configs.get(guild.id)
+        member = guild.get_member(user_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                SecureLogger.info(f"User {user_id} left before 1-hour access; dropping grant")
+                if self._forget_stored_roles(guild.id, user_id):
+                    _save_stored_roles(self.stored_roles)
                 return
+            except discord.HTTPException as e:
+                raise GrantFailed(f"Could not fetch member: {e}") from e
+
+        errors = []
+        permanent = False  # a failure that retrying cannot fix
+        # Restore roles we stripped when they joined (e.g. Whop free member role)
+        role_ids_to_add = list(self.stored_roles.get(guild.id, {}).get(user_id, []))
+        if not role_ids_to_add:
+            if config.member_role_id:
+                role_ids_to_add = [config.member_role_id]
+
+        added_any = False
+        for role_id in role_ids_to_add:
+            role = guild.get_role(role_id)
+            if role is None:
+                errors.append(f"Role {role_id} not found")
+                permanent = True
+            elif role not in member.roles:
+                try:
+                    await add_roles(member, role, reason="1-hour auto-access: restore role")
+                    added_any = True
+                except discord.Forbidden:
+                    logging.warning("Could not restore role %s to %s", role_id, member.name)
+                    errors.append(f"Missing permission to add role {role.name}")
+                except Exception as e:
+                    logging.warning("Error restoring role to %s: %s", member.name, e)
+                    errors.append(f"Could not add role {role.name}: {e}")
 
-            # Restore roles we stripped when they joined (e.g. Whop free member role)
-            role_ids_to_add = list(self.stored_roles.get(str(user_id), []))
-            if not role_ids_to_add:
-                member_role_id = _parse_role_id("MEMBER_ROLE_ID", 0)
-                if member_role_id:
-                    role_ids_to_add = [member_role_id]
-
-            added_any = False
-            for role_id in role_ids_to_add:
-                role = guild.get_role(role_id)
-                if role and role not in member.roles:
-                    try:
-                        await member.add_roles(role, reason="1-hour auto-access: restore role")
-                        added_any = True
-                    except discord.Forbidden:
-                        logging.warning("Could not restore role %s to %s", role_id, member.name)
-                    except Exception as e:
-                        logging.warning("Error restoring role to %s: %s", member.name, e)
-
-            unverified_role_id = _parse_role_id("UNVERIFIED_ROLE_ID", 0)
-            if unverified_role_id:
-                unverified_role = guild.get_role(unverified_role_id)
-                if unverified_role and unverified_role in member.roles:
-                    try:
-                        await member.remove_roles(unverified_role, reason="1-hour auto-access granted")
-                    except Exception as e:
-                        logging.warning("Could not remove unverified from %s: %s", member.name, e)
-
-            if str(user_id) in self.stored_roles:
-                del self.stored_roles[str(user_id)]
-                _save_stored_roles(self.stored_roles)
+        if config.unverified_role_id:
+            unverified_role = guild.get_role(config.unverified_role_id)
+            if unverified_role and unverified_role in member.roles:
+                try:
+                    await remove_roles(member, unverified_role, reason="1-hour auto-access granted")
+                except Exception as e:
+                    logging.warning("Could not remove unverified from %s: %s", member.name, e)
+                    errors.append(f"Could not remove {unverified_role.name}: {e}")
 
-            if added_any or role_ids_to_add:
-                await self.log_member_event(
-                    guild,
-                    "⏰ 1-Hour Free Access",
-                    f"{member.mention} was granted free member access after 1 hour",
-                    member,
-                    discord.Color.orange()
-                )
-                SecureLogger.info(f"Granted 1-hour free access to {member.name} (restored/granted roles)")
-        except Exception as e:
-            SecureLogger.error(f"Error granting 1-hour access to user {user_id}: {e}")
+        if errors:
+            raise GrantFailed("; ".join(errors), retryable=not permanent)
+
+        if self._forget_stored_roles(guild.id, user_id):
+            _save_stored_roles(self.stored_roles)
+
+        if added_any or role_ids_to_add:
+            await self.log_member_event(
+                guild,
+                "⏰ 1-Hour Free Access",
+                f"{member.mention} was granted free member access after 1 hour",
+                member,
+                discord.Color.orange(),
+                config=config
+            )
+            SecureLogger.info(f"Granted 1-hour free access to {member.name} (restored/granted roles)")
+
+    async def cog_load(self) -> None:
+        # Singleton job: survives reconnects (on_ready re-fires) without duplicating
+        task_supervisor.ensure(
+            "periodic_1_hour_check",
+            self.check_1_hour_access,
+            interval=60,
+            owner=self,
+            start_after=self.bot.wait_until_ready,
+        )
+
+        task_supervisor.ensure(
+            "member_state_reconcile",
+            self.reconcile_member_state,
+            interval=STATE_RECONCILE_SECONDS,
+            owner=self,
+            start_after=self.bot.wait_until_ready,
+        )
+
+        if BYPASS_WATCH_SECONDS > 0:
+            # Picks up hand edits to bypass_roles.json without a restart
+            task_supervisor.ensure(
+                "bypass_roles_watch",
+                bypass_manager.reload_if_changed,
+                interval=BYPASS_WATCH_SECONDS,
+                owner=self,
+            )
+
+    async def cog_unload(self) -> None:
+        task_supervisor.cancel_owner(self)
+        for task in self._strip_tasks.values():
+            task.cancel()
+
+    def purge_member(self, guild: discord.Guild, user_id: int) -> List[str]:
+        """Forget everything held for a user who left `guild`: 1-hour timer, grant job and
+        dead letter, stripped roles (this guild's only), surge re-strip/DM entries and the
+        delayed strip task. Callers save. Returns the kinds of state that were removed."""
+        removed = []
+        if self.pending_users.remove(guild.id, user_id):
+            removed.append("pending")
+        if grant_queue.forget(guild.id, user_id):
+            removed.append("grant")
+        if self._forget_stored_roles(guild.id, user_id):
+            removed.append("stored_roles")
+        for queue in (
+            self._surge_restrip.get(guild.id), self._deferred_dms.get(guild.id), self._deferred_restrip.get(guild.id)
+        ):
+            if queue and user_id in queue:
+                while user_id in queue:
+                    queue.remove(user_id)
+                removed.append("surge")
+        task = self._strip_tasks.pop((guild.id, user_id), None)
+        if task is not None and not task.done():
+            task.cancel()
+            removed.append("strip_task")
+        return removed
+
+    def _forget_stored_roles(self, guild_id: int, user_id: int) -> bool:
+        users = self.stored_roles.get(guild_id)
+        if not users or users.pop(user_id, None) is None:
+            return False
+        if not users:
+            del self.stored_roles[guild_id]
+        return True
+
+    def _save_member_state(self, kinds) -> None:
+        if "pending" in kinds:
+            self.save_pending_users()
+        if "grant" in kinds:
+            grant_queue.save()
+        if "stored_roles" in kinds:
+            _save_stored_roles(self.stored_roles)
+
+    async def reconcile_member_state(self) -> None:
+        """Purge state for users no longer in their guild (missed leave events, downtime).
+
+        Needs a complete member cache: guilds that are not chunked (e.g. the lean
+        client profile) are skipped, since a cache miss there says nothing.
+        """
+        guild_ids = self.pending_users.guild_ids() | grant_queue.guild_ids() | {gid for gid, _ in grant_queue.dead_letters}
+        guild_ids |= set(self.stored_roles)
+        kinds = set()
+        purged = 0
+        for guild in owned_guilds(self.bot, guild_ids):
+            if not guild.chunked:
+                continue
+            user_ids = set(self.pending_users.user_ids(guild.id))
+            user_ids |= {uid for gid, uid in list(grant_queue.jobs) + list(grant_queue.dead_letters) if gid == guild.id}
+            user_ids |= set(self.stored_roles.get(guild.id, {}))
+            for user_id in user_ids:
+                if guild.get_member(user_id) is not None:
+                    continue
+                removed = self.purge_member(guild, user_id)
+                if removed:
+                    kinds.update(removed)
+                    purged += 1
+        if purged:
+            self._save_member_state(kinds)
+            SecureLogger.info(f"Reconciliation purged state for {purged} departed member(s)")
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         """Called when the cog is ready."""
         SecureLogger.info("MemberManagement cog is ready!")
-        # Start the 1-hour check task
-        self.bot.loop.create_task(self.periodic_1_hour_check())
-
-    async def periodic_1_hour_check(self):
-        """Periodically check for users who should get 1-hour free access"""
-        while True:
-            try:
-                await self.check_1_hour_access()
-                await asyncio.sleep(60)  # Check every minute
-            except Exception as e:
-                SecureLogger.error(f"Error in periodic 1-hour check: {e}")
-                await asyncio.sleep(60)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
         """Handle new member joins: add unverified role first, then welcome DM with Go to Server button (no booking link in DM)."""
         try:
+            if not guild_configs.is_managed(member.guild.id):
+                return
+            # Raids / promos: hand the join to the batched pipeline instead
+            if join_surge_detector.record(member.guild.id):
+                self._enqueue_surge_join(member)
+                return
+            config = guild_configs.get(member.guild.id)
             SecureLogger.info(f"Member {member.name} joined server {member.guild.name}")
 
             # Ensure we have a full member object (avoids cache issues)
             try:
                 member = await member.fetch()
+                bypass_manager.track(member)
             except Exception:
                 pass  # use existing member if fetch fails
 
             # Capture roles at join (before we strip any) for the join log (exclude @everyone)
             roles_at_join = [r for r in member.roles if r != member.guild.default_role]
 
-            unverified_role_id = _parse_role_id("UNVERIFIED_ROLE_ID", 0)
-            if not unverified_role_id:
-                logging.warning("UNVERIFIED_ROLE_ID is not set or invalid in .env — new members will not get the unverified role")
-            else:
-                unverified_role = member.guild.get_role(unverified_role_id)
-                if not unverified_role:
-                    logging.warning(
-                        "Unverified role not found in guild (id=%s). Check UNVERIFIED_ROLE_ID in .env and that the role exists.",
-                        unverified_role_id,
-                    )
-                elif unverified_role in member.roles:
-                    pass  # already has it
-                else:
-                    try:
-                        await member.add_roles(unverified_role, reason="User joined, pending verification")
-                        logging.info("Added Unverified role to %s (id=%s)", member.name, member.id)
-                    except discord.Forbidden:
-                        logging.warning(
-                            "Cannot add Unverified role to %s: bot lacks permission or bot role is below Unverified in Server Settings → Roles. Move the bot role above Unverified.",
-                            member.name,
-                        )
-                    except Exception as e:
-                        logging.warning("Could not add Unverified role to %s: %s", member.name, e)
+            await self._add_unverified_role(member, config)
 
             # Strip member/free role if Whop (or another bot) added it on join; store it and restore after 1hr
             # Run immediately and again after short delay (in case Whop adds role right after join)
-            async def strip_member_role_if_present(m: discord.Member) -> None:
-                if bypass_manager.has_bypass_role(m):
-                    return
-                member_role_id = _parse_role_id("MEMBER_ROLE_ID", 0)
-                if not member_role_id:
-                    return
-                member_role = m.guild.get_role(member_role_id)
-                if not member_role or member_role not in m.roles:
-                    return
-                try:
-                    await m.remove_roles(member_role, reason="Unverified: strip until 1hr; will restore")
-                    self.stored_roles[str(m.id)] = self.stored_roles.get(str(m.id), [])
-                    if member_role_id not in self.stored_roles[str(m.id)]:
-                        self.stored_roles[str(m.id)].append(member_role_id)
-                    _save_stored_roles(self.stored_roles)
-                    logging.info("Stripped member role from %s (id=%s); will restore after 1hr", m.name, m.id)
-                except discord.Forbidden:
-                    logging.warning(
-                        "Cannot remove member role from %s: bot role may be below Member. Move bot role above Member.",
-                        m.name,
-                    )
-                except Exception as e:
-                    logging.warning("Could not strip member role from %s: %s", m.name, e)
-
             if not bypass_manager.has_bypass_role(member):
-                await strip_member_role_if_present(member)
+                await self._strip_member_role_if_present(member, config)
                 # If Whop re-adds the role, strip again (run at 5s, 10s, 15s)
                 async def delayed_strip_loop() -> None:
                     for delay in (5, 10, 15):
                         await asyncio.sleep(delay)
                         try:
                             m = await member.guild.fetch_member(member.id)
-                            await strip_member_role_if_present(m)
+                            bypass_manager.track(m)
+                            await self._strip_member_role_if_present(m, config)
                         except Exception:
                             pass
-                self.bot.loop.create_task(delayed_strip_loop())
+                key = (member.guild.id, member.id)
+                task = self.bot.loop.create_task(delayed_strip_loop())
+                self._strip_tasks[key] = task
+                task.add_done_callback(lambda t, key=key: self._strip_tasks.pop(key, None) if self._strip_tasks.get(key) is t else None)
 
-            try:
-                embed = discord.Embed(
-                    title="👋 Welcome to Vito",
-                    description=(
-                        "You made it this far.\n"
-                        "Access isn't automatic and that's on purpose.\n\n"
-                        "This server is locked until you verify.\n"
-                        "One step. Thats it\n\n"
-                        "Hit verify.\n\n"
-                        "Welcome to Vito."
-                    ),
-                    color=0xF00000
-                )
-                embed.set_footer(text="Welcome to Vito")
-                welcome_channel_id = os.getenv("WELCOME_CHANNEL_ID")
-                if welcome_channel_id:
-                    welcome_channel = member.guild.get_channel(int(welcome_channel_id))
-                    if welcome_channel:
-                        view = discord.ui.View()
-                        view.add_item(discord.ui.Button(
-                            label="Go to Server",
-                            style=discord.ButtonStyle.link,
-                            url=welcome_channel.jump_url,
-                        ))
-                        await member.send(embed=embed, view=view)
-                    else:
-                        await member.send(embed=embed)
-                else:
-                    await member.send(embed=embed)
-            except Exception as e:
-                logging.warning(f"Could not send welcome DM to {member.name}: {e}")
+            await self._send_welcome_dm(member, config)
 
             if bypass_manager.has_bypass_role(member):
                 bypass_role_names = bypass_manager.get_bypass_role_names(member.guild)
@@ -301,12 +535,13 @@ class MemberManagement(commands.Cog):
                     "🎯 Bypass",
                     f"{member.mention} joined with bypass roles: {', '.join(bypass_role_names)}",
                     member,
-                    discord.Color.gold()
+                    discord.Color.gold(),
+                    config=config
                 )
                 logging.info(f"User {member.name} has bypass roles: {bypass_role_names}")
                 return
             
-            self.pending_users[member.id] = datetime.now(timezone.utc)
+            self.pending_users.add(member.guild.id, member.id, clock.now())
             self.save_pending_users()
             
             await self.log_member_event(
@@ -316,57 +551,298 @@ class MemberManagement(commands.Cog):
                 member,
                 discord.Color.blue(),
                 roles=roles_at_join,
+                config=config,
             )
             
         except Exception as e:
             logging.error(f"Error in on_member_join for {member.name}: {e}")
 
+    async def _add_unverified_role(self, member: discord.Member, config: GuildConfig) -> None:
+        unverified_role_id = config.unverified_role_id
+        if not unverified_role_id:
+            logging.warning("Unverified role is not configured (UNVERIFIED_ROLE_ID / /set_role) — new members will not get the unverified role")
+            return
+        unverified_role = member.guild.get_role(unverified_role_id)
+        if not unverified_role:
+            logging.warning(
+                "Unverified role not found in guild (id=%s). Check UNVERIFIED_ROLE_ID in .env and that the role exists.",
+                unverified_role_id,
+            )
+        elif unverified_role in member.roles:
+            pass  # already has it
+        else:
+            try:
+                await add_roles(member, unverified_role, reason="User joined, pending verification")
+                logging.info("Added Unverified role to %s (id=%s)", member.name, member.id)
+            except discord.Forbidden:
+                logging.warning(
+                    "Cannot add Unverified role to %s: bot lacks permission or bot role is below Unverified in Server Settings → Roles. Move the bot role above Unverified.",
+                    member.name,
+                )
+            except Exception as e:
+                logging.warning("Could not add Unverified role to %s: %s", member.name, e)
+
+    async def _strip_member_role_if_present(self, m: discord.Member, config: GuildConfig, save: bool = True,
+                                            lane: str = LANE_GRANT) -> bool:
+        """Remove the member role and remember it for the 1-hour restore. Returns True if stripped."""
+        if bypass_manager.has_bypass_role(m):
+            return False
+        member_role_id = config.member_role_id
+        if not member_role_id:
+            return False
+        member_role = m.guild.get_role(member_role_id)
+        if not member_role or member_role not in m.roles:
+            return False
+        try:
+            await remove_roles(m, member_role, reason="Unverified: strip until 1hr; will restore", lane=lane)
+            stored = self.stored_roles.setdefault(m.guild.id, {}).setdefault(m.id, [])
+            if member_role_id not in stored:
+                stored.append(member_role_id)
+            if save:
+                _save_stored_roles(self.stored_roles)
+            logging.info("Stripped member role from %s (id=%s); will restore after 1hr", m.name, m.id)
+            return True
+        except discord.Forbidden:
+            logging.warning(
+                "Cannot remove member role from %s: bot role may be below Member. Move bot role above Member.",
+                m.name,
+            )
+        except Exception as e:
+            logging.warning("Could not strip member role from %s: %s", m.name, e)
+        return False
+
+    async def _send_welcome_dm(self, member: discord.Member, config: GuildConfig) -> None:
+        """Queue the welcome DM (sent by dm_outbox; at most once per user per guild per day)."""
+        try:
+            embed = discord.Embed(
+                title="👋 Welcome to Vito",
+                description=(
+                    "You made it this far.\n"
+                    "Access isn't automatic and that's on purpose.\n\n"
+                    "This server is locked until you verify.\n"
+                    "One step. Thats it\n\n"
+                    "Hit verify.\n\n"
+                    "Welcome to Vito."
+                ),
+                color=0xF00000
+            )
+            embed.set_footer(text="Welcome to Vito")
+            if config.welcome_channel_id:
+                welcome_channel = config.welcome_channel(member.guild)
+                if welcome_channel:
+                    view = discord.ui.View()
+                    view.add_item(discord.ui.Button(
+                        label="Go to Server",
+                        style=discord.ButtonStyle.link,
+                        url=welcome_channel.jump_url,
+                    ))
+                    dm_outbox.enqueue(member, f"welcome:{member.guild.id}", embed=embed, view=view)
+                else:
+                    dm_outbox.enqueue(member, f"welcome:{member.guild.id}", embed=embed)
+            else:
+                dm_outbox.enqueue(member, f"welcome:{member.guild.id}", embed=embed)
+        except Exception as e:
+            logging.warning(f"Could not queue welcome DM to {member.name}: {e}")
+
+    # --- Join-surge pipeline -------------------------------------------------
+    # While a guild is surging, joins skip the per-member fetch/DM/save/log and go
+    # through a queue drained by a few workers. Pending users and stored roles are
+    # written once per flush, one summary embed replaces the per-join logs, and
+    # welcome DMs are sent (up to JOIN_SURGE_MAX_DMS) after the surge ends.
+
+    def _enqueue_surge_join(self, member: discord.Member) -> None:
+        self._surge_queue.put_nowait(member)
+        for i in range(SURGE_WORKERS):
+            task_supervisor.ensure(f"join_surge_worker_{i}", self._surge_worker, owner=self)
+        task_supervisor.ensure("join_surge_flush", self._flush_surge_batches, interval=SURGE_FLUSH_SECONDS, owner=self)
+
+    async def _surge_worker(self) -> None:
+        while True:
+            member = await self._surge_queue.get()
+            try:
+                await self._process_surge_join(member)
+            except Exception as e:
+                self._surge_batches.setdefault(member.guild.id, SurgeBatch()).failed += 1
+                SecureLogger.error(f"Error processing surge join for user {member.id}: {e}")
+            finally:
+                self._surge_queue.task_done()
+
+    async def _process_surge_join(self, member: discord.Member) -> None:
+        config = guild_configs.get(member.guild.id)
+        batch = self._surge_batches.setdefault(member.guild.id, SurgeBatch())
+        await self._add_unverified_role(member, config)
+        if bypass_manager.has_bypass_role(member):
+            batch.bypass.append(member.id)
+            return
+        await self._strip_member_role_if_present(member, config, save=False)
+        self.pending_users.add(member.guild.id, member.id, clock.now())
+        batch.joined.append(member.id)
+        # Re-check once on the next flush in case Whop re-adds the member role
+        self._surge_restrip.setdefault(member.guild.id, []).append(member.id)
+        deferred = self._deferred_dms.setdefault(member.guild.id, deque())
+        if len(deferred) < SURGE_MAX_DMS:
+            deferred.append(member.id)
+        else:
+            batch.dms_skipped += 1
+
+    async def _flush_surge_batches(self) -> None:
+        """Supervised every JOIN_SURGE_FLUSH seconds while the pipeline is in use."""
+        restrip, self._surge_restrip = self._surge_restrip, {}
+        for guild_id, user_ids in restrip.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            config = guild_configs.get(guild_id)
+            for user_id in user_ids:
+                m = guild.get_member(user_id)  # cache only; no REST during a surge
+                if m is not None:
+                    await self._strip_member_role_if_present(m, config, save=False)
+                else:
+                    self._deferred_restrip.setdefault(guild_id, deque()).append(user_id)
+
+        batches, self._surge_batches = self._surge_batches, {}
+        if batches or restrip:
+            self.save_pending_users()
+            _save_stored_roles(self.stored_roles)
+        for guild_id, batch in batches.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                await self._log_surge_summary(guild, batch)
+
+        for guild_id, user_ids in list(self._deferred_dms.items()):
+            if user_ids and not join_surge_detector.is_surging(guild_id):
+                task_supervisor.ensure(
+                    f"join_surge_dms_{guild_id}",
+                    functools.partial(self._send_deferred_dms, guild_id),
+                    owner=self,
+                )
+        for guild_id, user_ids in list(self._deferred_restrip.items()):
+            if user_ids and not join_surge_detector.is_surging(guild_id):
+                task_supervisor.ensure(
+                    f"join_surge_restrip_{guild_id}",
+                    functools.partial(self._restrip_uncached, guild_id),
+                    owner=self,
+                )
+
+    async def _send_deferred_dms(self, guild_id: int) -> None:
+        guild = self.bot.get_guild(guild_id)
+        queue = self._deferred_dms.get(guild_id, deque())
+        if guild is None:
+            queue.clear()
+            return
+        config = guild_configs.get(guild_id)
+        sent = 0
+        while queue:
+            member = await get_or_fetch_member(guild, queue.popleft())
+            if member is not None:
+                await self._send_welcome_dm(member, config)
+                sent += 1
+                await asyncio.sleep(1)  # stay well inside the DM rate limit
+        SecureLogger.info(f"Queued {sent} deferred welcome DMs in guild {guild_id}")
+
+    async def _restrip_uncached(self, guild_id: int) -> None:
+        """Re-check surge joiners that weren't cached at flush time (fetched, admin lane)."""
+        guild = self.bot.get_guild(guild_id)
+        queue = self._deferred_restrip.get(guild_id, deque())
+        if guild is None:
+            queue.clear()
+            return
+        config = guild_configs.get(guild_id)
+        checked = stripped = 0
+        while queue:
+            member = await get_or_fetch_member(guild, queue.popleft())
+            if member is None:
+                continue
+            checked += 1
+            if await self._strip_member_role_if_present(member, config, save=False, lane=LANE_ADMIN):
+                stripped += 1
+        if stripped:
+            _save_stored_roles(self.stored_roles)
+        SecureLogger.info(f"Re-checked {checked} uncached surge joiners in guild {guild_id}, stripped {stripped}")
+
+    async def _log_surge_summary(self, guild: discord.Guild, batch: SurgeBatch) -> None:
+        config = guild_configs.get(guild.id)
+        logs_channel = config.logs_channel(guild)
+        count = len(batch.joined) + len(batch.bypass)
+        SecureLogger.info(f"Join surge batch in guild {guild.id}: {count} joins, {batch.failed} failed")
+        if not logs_channel:
+            return
+        embed = discord.Embed(
+            title=f"👥 {count} members joined",
+            description=(
+                "Join surge mode is active: joins are processed in batches and welcome DMs are sent once it ends."
+                if join_surge_detector.is_surging(guild.id) else
+                "Join surge batch processed."
+            ),
+            color=discord.Color.blue(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        embed.add_field(name="Added to 1-hour timer", value=str(len(batch.joined)), inline=True)
+        embed.add_field(name="Bypass", value=str(len(batch.bypass)), inline=True)
+        embed.add_field(name="Joins in window", value=str(join_surge_detector.join_rate(guild.id)), inline=True)
+        if batch.failed:
+            embed.add_field(name="Failed", value=str(batch.failed), inline=True)
+        if batch.dms_skipped:
+            embed.add_field(name="Welcome DMs skipped", value=str(batch.dms_skipped), inline=True)
+        mentions = [f"<@{uid}>" for uid in (batch.joined + batch.bypass)[:30]]
+        if mentions:
+            more = f" …and {count - len(mentions)} more" if count > len(mentions) else ""
+            embed.add_field(name="Members", value=" ".join(mentions) + more, inline=False)
+        embed.set_footer(text=f"Guild: {guild.name}")
+        queue_log(logs_channel, embed=embed)
+
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member) -> None:
-        """Handle member leaves - log the event."""
+        """Handle member leaves - purge their state and log the event."""
+        if member.guild:
+            await self._handle_leave(member.guild, member)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        """Leaves of uncached members (lean client profile): on_member_remove only fires for cached ones."""
+        if isinstance(payload.user, discord.Member):
+            return  # cached: on_member_remove handled it
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is not None:
+            await self._handle_leave(guild, payload.user)
+
+    async def _handle_leave(self, guild: discord.Guild, user: discord.abc.User) -> None:
         try:
-            guild_id = member.guild.id if getattr(member, 'guild', None) is not None else 'unknown'
-            logging.info(f"[MemberManagement] Member {member.name} ({member.id}) left server {guild_id}")
-            
-            if member.guild:
+            logging.info(f"[MemberManagement] Member {user.name} ({user.id}) left server {guild.id}")
+            removed = self.purge_member(guild, user.id)
+            self._save_member_state(removed)
+
+            if guild_configs.is_managed(guild.id):
                 await self.log_member_event(
-                    member.guild,
+                    guild,
                     "👋 User Left",
-                    f"{member.mention} left the server.",
-                    member,
+                    f"{user.mention} left the server.",
+                    user,
                     discord.Color.orange(),
                     None
                 )
         except Exception as e:
-            logging.error(f"Error in on_member_remove for {member.name}: {e}")
+            logging.error(f"Error in on_member_remove for {user.name}: {e}")
 
-    async def log_member_event(self, guild, title, description, user, color, roles=None):
-        """Log member events to the logs channel"""
-        logs_channel_id = os.getenv('LOGS_CHANNEL_ID')
-        if logs_channel_id:
-            logs_channel = guild.get_channel(int(logs_channel_id))
+    async def log_member_event(self, guild, title, description, user, color, roles=None, config: Optional[GuildConfig] = None):
+        """Log member events to the guild's logs channel"""
+        config = config or guild_configs.get(guild.id)
+        if config.logs_channel_id:
+            logs_channel = config.logs_channel(guild)
             if logs_channel:
-                embed = discord.Embed(
-                    title=title,
-                    description=description,
-                    color=color,
-                    timestamp=datetime.now(timezone.utc)
-                )
-                embed.set_thumbnail(url=user.display_avatar.url)
-                embed.add_field(name="User", value=f"{user.mention}\n({user.name})", inline=True)
-                embed.add_field(name="User ID", value=user.id, inline=True)
-                embed.add_field(name="Account Created", value=f"<t:{int(user.created_at.timestamp())}:R>", inline=True)
-                
-                if roles:
-                    roles_text = ", ".join([role.name for role in roles]) if roles else "None"
-                    embed.add_field(name="Roles", value=roles_text, inline=False)
-                
-                embed.set_footer(text=f"Guild: {guild.name}")
-                
-                try:
-                    await logs_channel.send(embed=embed)
-                except Exception as e:
-                    logging.error(f"Failed to send log message: {e}")
+                queue_log(logs_channel, embed=_member_event_embed(guild, title, description, user, color, roles))
+
+# Keep the bypass role index current (see cogs/bypass_manager.py)
+BYPASS_EVENTS = ("on_member_join", "on_member_update", "on_member_remove", "on_guild_role_delete", "on_guild_remove")
+
 
 async def setup(bot):
-    await bot.add_cog(MemberManagement(bot))
\ No newline at end of file
+    await bot.add_cog(MemberManagement(bot))
+    for event in BYPASS_EVENTS:
+        bot.add_listener(getattr(bypass_manager, event), event)
+
+
+async def teardown(bot):
+    # Not a cog, so unloading the extension would leave these behind and a reload would stack them
+    for event in BYPASS_EVENTS:
+        bot.remove_listener(getattr(bypass_manager, event), event)
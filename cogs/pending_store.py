@@ -0,0 +1,214 @@
+"""
+Compact store for users waiting on 1-hour access.
+
+Each guild keeps two sorted pairs of parallel array('q') columns with epoch-second
+join times (no per-entry objects):
+
+- by time:  (joined, user_id), ordered by join time, so "who is due" is a bisect
+  and popping due users removes a prefix;
+- by user:  (user_id, joined), ordered by user ID, so lookups and removals by
+  user are a bisect.
+
+Finding a position is O(log n); inserting or deleting shifts the array tail with
+a memmove. pop_due() cuts the due prefix off the time columns and returns it (the
+two returned arrays are its only allocations). It leaves the popped users in the
+by-user columns: every entry there with a join time at or before the highest
+cutoff popped so far is dead. Lookups skip dead entries, and the by-user columns
+are compacted in place once dead entries outnumber live ones, so each popped
+entry is moved at most a couple of times. The price is memory: until a
+compaction the by-user columns can hold up to twice the live entries.
+benchmarks/pending_memory.py compares this with the old
+{guild_id: {user_id: datetime}} dict.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Mapping, Optional, Set, Tuple
+
+# Below every epoch second: nothing popped yet
+_NOTHING_POPPED = -(2 ** 63)
+
+
+def to_epoch(moment: datetime) -> int:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+class PendingColumns:
+    """One guild's pending users."""
+    __slots__ = ("times", "time_users", "users", "user_times", "popped_through", "dead")
+
+    def __init__(self):
+        self.times = array("q")       # sorted join times
+        self.time_users = array("q")  # user at the same index
+        self.users = array("q")       # sorted user IDs (live and dead)
+        self.user_times = array("q")  # join time at the same index
+        # by-user entries with a join time <= popped_through were popped (dead)
+        self.popped_through = _NOTHING_POPPED
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _slot(self, user_id: int) -> int:
+        """Index of user_id in the by-user columns, live or dead (-1 if absent)."""
+        i = bisect_left(self.users, user_id)
+        return i if i < len(self.users) and self.users[i] == user_id else -1
+
+    def _user_index(self, user_id: int) -> int:
+        i = self._slot(user_id)
+        return i if i >= 0 and self.user_times[i] > self.popped_through else -1
+
+    def compact(self) -> None:
+        """Drop dead entries from the by-user columns, in place."""
+        if self.dead:
+            users, user_times, floor = self.users, self.user_times, self.popped_through
+            w = 0
+            for r in range(len(users)):
+                joined = user_times[r]
+                if joined > floor:
+                    users[w] = users[r]
+                    user_times[w] = joined
+                    w += 1
+            del users[w:]
+            del user_times[w:]
+        self.dead = 0
+        self.popped_through = _NOTHING_POPPED
+
+    def _time_index(self, joined: int, user_id: int) -> int:
+        i = bisect_left(self.times, joined)
+        while self.time_users[i] != user_id:  # equal join times are few
+            i += 1
+        return i
+
+    def get(self, user_id: int) -> Optional[int]:
+        i = self._user_index(user_id)
+        return self.user_times[i] if i >= 0 else None
+
+    def add(self, user_id: int, joined: int) -> None:
+        """Insert or update a user's join time."""
+        if joined <= self.popped_through:
+            self.compact()  # the entry would read as dead
+        self.remove(user_id)
+        i = self._slot(user_id)
+        if i >= 0:
+            # A dead entry for this user: reuse its slot
+            self.user_times[i] = joined
+            self.dead -= 1
+        else:
+            i = bisect_left(self.users, user_id)
+            self.users.insert(i, user_id)
+            self.user_times.insert(i, joined)
+        j = bisect_right(self.times, joined)
+        self.times.insert(j, joined)
+        self.time_users.insert(j, user_id)
+
+    def remove(self, user_id: int) -> bool:
+        i = self._user_index(user_id)
+        if i < 0:
+            return False
+        j = self._time_index(self.user_times[i], user_id)
+        del self.users[i]
+        del self.user_times[i]
+        del self.times[j]
+        del self.time_users[j]
+        return True
+
+    def due_count(self, cutoff: int) -> int:
+        """Users who joined at or before `cutoff` (the front of the time columns)."""
+        return bisect_right(self.times, cutoff)
+
+    def pop_due(self, cutoff: int) -> Tuple[array, array]:
+        """Remove and return (user_ids, join_times) of everyone who joined at or before cutoff."""
+        k = self.due_count(cutoff)
+        if not k:
+            return array("q"), array("q")
+        users, times = self.time_users[:k], self.times[:k]
+        del self.time_users[:k]
+        del self.times[:k]
+        # Everyone at or before cutoff is gone from the time columns: their by-user entries are dead
+        self.popped_through = max(self.popped_through, cutoff)
+        self.dead += k
+        if self.dead > len(self.times):
+            self.compact()
+        return users, times
+
+
+class PendingAccessStore:
+    """{guild_id: PendingColumns}, with datetimes at the edges."""
+
+    def __init__(self):
+        self._guilds: Dict[int, PendingColumns] = {}
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[int, Mapping[int, datetime]]) -> "PendingAccessStore":
+        store = cls()
+        for guild_id, users in data.items():
+            columns = store._guilds[guild_id] = PendingColumns()
+            by_time = sorted((to_epoch(t), uid) for uid, t in users.items())
+            columns.times = array("q", (t for t, _ in by_time))
+            columns.time_users = array("q", (u for _, u in by_time))
+            by_user = sorted((uid, to_epoch(t)) for uid, t in users.items())
+            columns.users = array("q", (u for u, _ in by_user))
+            columns.user_times = array("q", (t for _, t in by_user))
+        return store
+
+    def guild_ids(self) -> Set[int]:
+        return {gid for gid, columns in self._guilds.items() if len(columns)}
+
+    def count(self, guild_id: Optional[int] = None) -> int:
+        if guild_id is not None:
+            columns = self._guilds.get(guild_id)
+            return len(columns) if columns is not None else 0
+        return sum(len(c) for c in self._guilds.values())
+
+    def add(self, guild_id: int, user_id: int, joined_at: datetime) -> None:
+        self._guilds.setdefault(guild_id, PendingColumns()).add(user_id, to_epoch(joined_at))
+
+    def remove(self, guild_id: int, user_id: int) -> bool:
+        columns = self._guilds.get(guild_id)
+        return columns is not None and columns.remove(user_id)
+
+    def get(self, guild_id: int, user_id: int) -> Optional[datetime]:
+        columns = self._guilds.get(guild_id)
+        joined = columns.get(user_id) if columns is not None else None
+        return from_epoch(joined) if joined is not None else None
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        columns = self._guilds.get(key[0])
+        return columns is not None and columns._user_index(key[1]) >= 0
+
+    def pop_due(self, guild_id: int, cutoff: datetime) -> Tuple[array, array]:
+        """(user_ids, join epoch seconds) of users who joined at or before cutoff, oldest first."""
+        columns = self._guilds.get(guild_id)
+        if columns is None:
+            return array("q"), array("q")
+        return columns.pop_due(to_epoch(cutoff))
+
+    def user_ids(self, guild_id: int) -> array:
+        """Sorted user IDs (the live column; copy before mutating the store)."""
+        columns = self._guilds.get(guild_id)
+        if columns is None:
+            return array("q")
+        columns.compact()
+        return columns.users
+
+    def items(self, guild_id: int) -> Iterator[Tuple[int, datetime]]:
+        """(user_id, join time), oldest join first."""
+        columns = self._guilds.get(guild_id)
+        if columns is None:
+            return
+        for user_id, joined in zip(columns.time_users, columns.times):
+            yield user_id, from_epoch(joined)
+
+    def to_json(self) -> Dict[str, Dict[str, str]]:
+        """pending_users.json format: {guild_id: {user_id: iso join time}}."""
+        return {
+            str(guild_id): {str(uid): t.isoformat() for uid, t in self.items(guild_id)}
+            for guild_id in self.guild_ids()
+        }
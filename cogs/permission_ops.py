@@ -0,0 +1,85 @@
+"""
+Helpers for bulk channel-permission work (/setup_permissions, /restore_permissions).
+
+- overwrites_equal(): compare overwrites by their effective allow/deny bits so
+  unchanged channels can be skipped.
+- run_bounded(): apply a coroutine to many items with a fixed number of workers.
+  Requests still go through rest_dispatcher (admin lane), which keeps them
+  behind access grants and within per-route limits.
+- ProgressReporter: throttled progress edits of an interaction's original response.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import discord
+
+from .rest_dispatcher import LANE_ADMIN, LANE_CAPS
+
+T = TypeVar("T")
+
+# More workers than the dispatcher's admin-lane cap would only wait in its queue
+PERMISSION_EDIT_CONCURRENCY = LANE_CAPS[LANE_ADMIN]
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+def overwrites_equal(a: Optional[discord.PermissionOverwrite], b: Optional[discord.PermissionOverwrite]) -> bool:
+    """True if both overwrites allow and deny the same permissions (None == empty)."""
+    a_pair = a.pair() if a is not None else (discord.Permissions.none(), discord.Permissions.none())
+    b_pair = b.pair() if b is not None else (discord.Permissions.none(), discord.Permissions.none())
+    return a_pair[0].value == b_pair[0].value and a_pair[1].value == b_pair[1].value
+
+
+async def run_bounded(
+    items: Sequence[T],
+    func: Callable[[T], Awaitable[object]],
+    *,
+    concurrency: int = PERMISSION_EDIT_CONCURRENCY,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+) -> List[Tuple[T, Exception]]:
+    """Await func(item) for every item, at most `concurrency` at a time.
+
+    Returns (item, exception) for every failure; on_progress(done, failed) runs after each item.
+    """
+    errors: List[Tuple[T, Exception]] = []
+    done = 0
+    iterator: Iterable[T] = iter(items)
+
+    async def worker() -> None:
+        nonlocal done
+        for item in iterator:  # shared iterator: each item is taken by exactly one worker
+            try:
+                await func(item)
+            except Exception as e:
+                errors.append((item, e))
+            done += 1
+            if on_progress is not None:
+                await on_progress(done, len(errors))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    await asyncio.gather(*workers)
+    return errors
+
+
+class ProgressReporter:
+    """Edits the original interaction response at most once per `interval` seconds."""
+
+    def __init__(self, interaction: discord.Interaction, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.interaction = interaction
+        self.interval = interval
+        self._last = 0.0
+        self.started = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    async def update(self, content: str, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        try:
+            await self.interaction.edit_original_response(content=content)
+        except discord.HTTPException as e:
+            logging.warning("Could not update progress message: %s", e)
@@ -0,0 +1,176 @@
+"""
+Scheduled permission snapshots.
+
+Channel overwrite changes arrive as gateway events (on_guild_channel_update /
+create / delete), so the cog only marks channels dirty; a supervised job then
+stores what changed since the latest restore point. Everything is read from the
+cache: snapshots make no API calls.
+
+Each snapshot is an incremental row in backup_store holding every channel changed
+since its full base, so any snapshot restores as base + one blob. A new full
+base is written when the changes grow past SNAPSHOT_COMPACT_RATIO of the
+channels or the base is older than SNAPSHOT_BASE_MAX_DAYS. Nothing is written
+when nothing changed.
+
+The first pass after startup diffs every channel against the latest restore
+point, which picks up changes made while the bot was offline. Only managed
+guilds are snapshotted. The cache is read on the event loop; encoding and the
+SQLite write run in a worker thread so a long pass doesn't block the gateway.
+
+SNAPSHOT_INTERVAL_MINUTES  minutes between passes (default 60, 0 disables)
+SNAPSHOT_RETENTION_DAYS    scheduled snapshots older than this are deleted (default 30);
+                           manual backups from /setup_permissions are kept
+SNAPSHOT_BASE_MAX_DAYS     maximum age of a full base before compaction (default 7)
+SNAPSHOT_COMPACT_RATIO     changed-channel fraction that triggers compaction (default 0.25)
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+import discord
+from discord.ext import commands
+
+from .guild_config import guild_configs
+from .backup_store import backup_store, serialize_channel, snapshot_guild, KIND_INCREMENTAL
+from .sharding import owned_guilds
+from .task_supervisor import task_supervisor
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not a number, using %s", name, default)
+        return default
+
+
+SNAPSHOT_INTERVAL_MINUTES = _env_number("SNAPSHOT_INTERVAL_MINUTES", 60)
+SNAPSHOT_RETENTION_DAYS = _env_number("SNAPSHOT_RETENTION_DAYS", 30)
+SNAPSHOT_BASE_MAX_DAYS = _env_number("SNAPSHOT_BASE_MAX_DAYS", 7)
+SNAPSHOT_COMPACT_RATIO = _env_number("SNAPSHOT_COMPACT_RATIO", 0.25)
+
+
+def _effective(entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """What a restore would apply: target names are informational only."""
+    if entry is None:
+        return None
+    return {tid: (o["type"], o["permissions"]) for tid, o in entry.get("overwrites", {}).items()}
+
+
+class PermissionSnapshots(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._dirty: Dict[int, Set[int]] = {}
+        # Guilds diffed in full since startup; later passes only look at dirty channels
+        self._reconciled: Set[int] = set()
+
+    async def cog_load(self) -> None:
+        if not SNAPSHOT_INTERVAL_MINUTES:
+            logging.info("Scheduled permission snapshots disabled (SNAPSHOT_INTERVAL_MINUTES=0)")
+            return
+        task_supervisor.ensure(
+            "permission_snapshots",
+            self.snapshot_pass,
+            interval=SNAPSHOT_INTERVAL_MINUTES * 60,
+            owner=self,
+            start_after=self.bot.wait_until_ready,
+        )
+
+    async def cog_unload(self) -> None:
+        task_supervisor.cancel_owner(self)
+
+    def _mark_dirty(self, channel: discord.abc.GuildChannel) -> None:
+        self._dirty.setdefault(channel.guild.id, set()).add(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+        if before.overwrites != after.overwrites or before.name != after.name:
+            self._mark_dirty(after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel) -> None:
+        self._mark_dirty(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        self._mark_dirty(channel)
+
+    async def snapshot_pass(self) -> None:
+        for guild in owned_guilds(self.bot, guild_configs.managed_guild_ids()):
+            try:
+                await self.snapshot(guild)
+            except Exception as e:
+                logging.error(f"Permission snapshot failed for guild {guild.id}: {e}")
+
+    @staticmethod
+    def _full_snapshot(guild: discord.Guild, now: datetime) -> Dict[str, Any]:
+        # Serialize every channel here, on the loop; the worker thread only encodes plain dicts
+        backup_data = snapshot_guild(guild, now)
+        backup_data["channels"] = dict(backup_data["channels"])
+        return backup_data
+
+    async def snapshot(self, guild: discord.Guild, now: Optional[datetime] = None) -> Optional[str]:
+        """Store what changed since the latest restore point. Returns the new backup ID, or None."""
+        now = now or datetime.now(timezone.utc)
+        dirty = self._dirty.pop(guild.id, set())
+        latest = backup_store.latest(guild.id)
+        restore_point = backup_store.load(guild.id, latest.backup_id) if latest else None
+        if latest is None or restore_point is None:
+            record = await asyncio.to_thread(backup_store.save, guild.id, self._full_snapshot(guild, now), scheduled=True)
+            self._reconciled.add(guild.id)
+            return record.backup_id
+
+        if guild.id in self._reconciled:
+            candidates = dirty
+        else:
+            candidates = {c.id for c in guild.channels} | {int(cid) for cid in restore_point["channels"]}
+            self._reconciled.add(guild.id)
+
+        changes: Dict[str, Optional[Dict[str, Any]]] = {}
+        for channel_id in candidates:
+            channel = guild.get_channel(channel_id)
+            entry = serialize_channel(channel) if channel is not None else None
+            previous = restore_point["channels"].get(str(channel_id))
+            if _effective(entry) != _effective(previous) or (
+                entry is not None and previous is not None and entry["name"] != previous["name"]
+            ):
+                changes[str(channel_id)] = entry
+        if changes:
+            backup_id = await self._write(guild, latest, changes, now)
+        else:
+            backup_id = None
+
+        if SNAPSHOT_RETENTION_DAYS:
+            removed = backup_store.apply_retention(guild.id, now - timedelta(days=SNAPSHOT_RETENTION_DAYS))
+            if removed:
+                logging.info(f"Removed {removed} expired permission snapshot(s) for guild {guild.id}")
+        return backup_id
+
+    async def _write(self, guild: discord.Guild, latest, changes: Dict[str, Optional[Dict[str, Any]]], now: datetime) -> str:
+        if latest.kind == KIND_INCREMENTAL:
+            base = backup_store.get_record(guild.id, latest.base_id)
+            cumulative = backup_store.load_changes(guild.id, latest.backup_id)
+        else:
+            base = latest
+            cumulative = {}
+        cumulative.update(changes)
+
+        too_old = base is None or now - base.created_at > timedelta(days=SNAPSHOT_BASE_MAX_DAYS)
+        too_big = len(cumulative) > SNAPSHOT_COMPACT_RATIO * max(1, len(guild.channels))
+        if too_old or too_big:
+            record = await asyncio.to_thread(backup_store.save, guild.id, self._full_snapshot(guild, now), scheduled=True)
+        else:
+            record = await asyncio.to_thread(
+                backup_store.save_incremental, guild.id, base.backup_id, cumulative, created_at=now
+            )
+        logging.info(
+            f"Permission snapshot {record.backup_id} ({record.kind}) for guild {guild.id}: "
+            f"{len(changes)} channel(s) changed"
+        )
+        return record.backup_id
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PermissionSnapshots(bot))
@@ -0,0 +1,180 @@
+"""
+Category-aware permission templates.
+
+A PermissionTemplate says which overwrite each target (role/member) should have,
+with optional per-channel overrides (e.g. the welcome channel). plan_template()
+turns it into the smallest set of API calls:
+
+- categories whose overwrites differ get one edit each, done first;
+- children that were synced to their category, and whose category state is all
+  they need, are re-synced with one edit that copies the category's new
+  overwrites (so they stay synced);
+- other children are edited only if a template target actually differs: one
+  set_permissions call when a single target changes, otherwise one full edit;
+- channels that already match cost nothing.
+
+Discord does not push category overwrite changes to synced children over the
+API, so each synced child that needs a change still needs its own call.
+
+PermissionPlan.summary() is the dry-run report: "X API calls vs. Y naive".
+"""
+import time
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import discord
+
+from .permission_ops import overwrites_equal, run_bounded, PERMISSION_EDIT_CONCURRENCY
+from .rest_dispatcher import edit_channel, set_permissions
+
+Target = Union[discord.Role, discord.Member, discord.Object]
+Overwrites = Dict[Target, discord.PermissionOverwrite]
+
+ACTION_CATEGORY = "category"  # edit a category's overwrites
+ACTION_SYNC = "sync"          # copy the category's new overwrites onto a synced child
+ACTION_SET = "set"            # one target differs: set_permissions
+ACTION_EDIT = "edit"          # several targets differ: one full overwrite edit
+
+
+def overwrite_maps_equal(a: Mapping[Target, discord.PermissionOverwrite], b: Mapping[Target, discord.PermissionOverwrite]) -> bool:
+    """True if two overwrite maps grant the same permissions (empty overwrites ignored)."""
+    a_ids = {t.id: o for t, o in a.items() if not o.is_empty()}
+    b_ids = {t.id: o for t, o in b.items() if not o.is_empty()}
+    if a_ids.keys() != b_ids.keys():
+        return False
+    return all(overwrites_equal(a_ids[k], b_ids[k]) for k in a_ids)
+
+
+class PermissionTemplate:
+    def __init__(self, default: Overwrites, overrides: Optional[Dict[int, Overwrites]] = None):
+        self.default = default
+        self.overrides = overrides or {}
+
+    def targets_for(self, channel: discord.abc.GuildChannel) -> Overwrites:
+        targets = dict(self.default)
+        targets.update(self.overrides.get(channel.id, {}))
+        return targets
+
+    def desired_overwrites(self, channel: discord.abc.GuildChannel) -> Overwrites:
+        """Channel's current overwrites with the template's targets replaced."""
+        desired = dict(channel.overwrites)
+        desired.update(self.targets_for(channel))
+        return desired
+
+
+class PlannedEdit:
+    __slots__ = ("channel", "action", "overwrites", "target", "overwrite")
+
+    def __init__(self, channel, action: str, overwrites: Overwrites, target: Optional[Target] = None,
+                 overwrite: Optional[discord.PermissionOverwrite] = None):
+        self.channel = channel
+        self.action = action
+        self.overwrites = overwrites  # full desired overwrites (edit/sync/category)
+        self.target = target          # single target (set)
+        self.overwrite = overwrite
+
+
+class PermissionPlan:
+    def __init__(self, total_channels: int):
+        self.total_channels = total_channels
+        self.category_edits: List[PlannedEdit] = []
+        self.channel_edits: List[PlannedEdit] = []
+        self.unchanged = 0
+        self.plan_ms = 0.0
+
+    @property
+    def api_calls(self) -> int:
+        return len(self.category_edits) + len(self.channel_edits)
+
+    @property
+    def naive_calls(self) -> int:
+        """One edit per channel, which is what a non-diffing setup does."""
+        return self.total_channels
+
+    def count(self, action: str) -> int:
+        return sum(1 for e in self.category_edits + self.channel_edits if e.action == action)
+
+    def summary(self) -> str:
+        return (
+            f"{self.api_calls} API calls vs. {self.naive_calls} naive\n"
+            f"• Categories edited: {len(self.category_edits)}\n"
+            f"• Synced children re-synced: {self.count(ACTION_SYNC)}\n"
+            f"• Diverged channels edited: {self.count(ACTION_SET) + self.count(ACTION_EDIT)}\n"
+            f"• Already correct: {self.unchanged}\n"
+            f"• Planned in {self.plan_ms:.1f}ms"
+        )
+
+
+def _differing_targets(channel, targets: Overwrites) -> List[Target]:
+    current = channel.overwrites
+    return [t for t, o in targets.items() if not overwrites_equal(current.get(t), o)]
+
+
+def plan_template(guild: discord.Guild, template: PermissionTemplate) -> PermissionPlan:
+    start = time.perf_counter()
+    plan = PermissionPlan(len(guild.channels))
+
+    # Category state after the plan runs
+    category_state: Dict[int, Overwrites] = {}
+    for category in guild.categories:
+        desired = template.desired_overwrites(category)
+        category_state[category.id] = desired
+        if _differing_targets(category, template.targets_for(category)):
+            plan.category_edits.append(PlannedEdit(category, ACTION_CATEGORY, desired))
+        else:
+            plan.unchanged += 1
+
+    for channel in guild.channels:
+        if isinstance(channel, discord.CategoryChannel):
+            continue
+        targets = template.targets_for(channel)
+        differing = _differing_targets(channel, targets)
+        if not differing:
+            plan.unchanged += 1
+            continue
+        desired = template.desired_overwrites(channel)
+        parent = channel.category
+        if (
+            parent is not None
+            and channel.permissions_synced
+            and overwrite_maps_equal(desired, category_state.get(parent.id, {}))
+        ):
+            plan.channel_edits.append(PlannedEdit(channel, ACTION_SYNC, category_state[parent.id]))
+        elif len(differing) == 1:
+            target = differing[0]
+            plan.channel_edits.append(PlannedEdit(channel, ACTION_SET, desired, target, targets[target]))
+        else:
+            plan.channel_edits.append(PlannedEdit(channel, ACTION_EDIT, desired))
+
+    plan.plan_ms = (time.perf_counter() - start) * 1000
+    return plan
+
+
+async def _apply_edit(edit: PlannedEdit, reason: str) -> None:
+    if edit.action == ACTION_SET:
+        await set_permissions(edit.channel, edit.target, edit.overwrite, reason=reason)
+    else:
+        # Sync copies the planned category state rather than calling sync_permissions,
+        # which would read the category from a cache that may not be updated yet
+        await edit_channel(edit.channel, overwrites=edit.overwrites, reason=reason)
+
+
+async def execute_plan(
+    plan: PermissionPlan,
+    reason: str,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    concurrency: int = PERMISSION_EDIT_CONCURRENCY,
+) -> List[Tuple[PlannedEdit, Exception]]:
+    """Apply categories first, then children. Returns (edit, exception) for failures."""
+    async def apply(edit: PlannedEdit) -> None:
+        await _apply_edit(edit, reason)
+
+    failures = await run_bounded(plan.category_edits, apply, concurrency=concurrency, on_progress=on_progress)
+    offset = len(plan.category_edits)
+    failed_before = len(failures)
+
+    async def child_progress(done: int, failed: int) -> None:
+        if on_progress is not None:
+            await on_progress(offset + done, failed_before + failed)
+
+    failures += await run_bounded(plan.channel_edits, apply, concurrency=concurrency, on_progress=child_progress)
+    return failures
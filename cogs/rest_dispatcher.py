@@ -0,0 +1,224 @@
+"""
+Priority dispatcher for Discord REST mutations.
+
+Every role edit, DM, channel edit and log message goes through `rest_dispatcher`
+so that, when we are rate limited, the operations users are waiting on run first:
+
+    grant  > dm > admin > log
+
+A scheduler hands out a fixed number of in-flight slots, always to the highest
+lane with work queued. Lower lanes are capped below the total so a backlog of
+logs or channel edits can never take every slot, and each route (member roles
+per guild, DMs, one channel) has its own concurrency limit. discord.py's own
+rate limiter still handles the actual buckets and 429s.
+
+Interaction responses/followups are not routed here: they use the interaction
+token's own limits and must answer within 3 seconds.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+import discord
+
+from .task_supervisor import task_supervisor
+from .dm_channels import dm_channels, DMClosed
+
+T = TypeVar("T")
+
+LANE_GRANT = "grant"
+LANE_DM = "dm"
+LANE_ADMIN = "admin"
+LANE_LOG = "log"
+LANES = (LANE_GRANT, LANE_DM, LANE_ADMIN, LANE_LOG)  # highest priority first
+
+MAX_IN_FLIGHT = 8
+# Lanes not listed may use every slot
+LANE_CAPS: Dict[str, int] = {LANE_DM: 3, LANE_ADMIN: 3, LANE_LOG: 2}
+# Route kind (text before ':') -> concurrent requests on one route
+ROUTE_LIMITS: Dict[str, int] = {"member_roles": 4, "dm": 2, "channel": 1, "message": 1}
+DEFAULT_ROUTE_LIMIT = 2
+
+
+class _Job:
+    __slots__ = ("lane", "route", "factory", "future", "queued_at")
+
+    def __init__(self, lane: str, route: str, factory: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.lane = lane
+        self.route = route
+        self.factory = factory
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class LaneStats:
+    __slots__ = ("completed", "failed", "in_flight", "max_depth", "total_wait_ms", "max_wait_ms")
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_depth = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+
+class RestDispatcher:
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.queues: Dict[str, Deque[_Job]] = {lane: deque() for lane in LANES}
+        self.stats: Dict[str, LaneStats] = {lane: LaneStats() for lane in LANES}
+        self._route_sems: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _ensure_scheduler(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        task_supervisor.ensure("rest_dispatcher", self._schedule)
+
+    def _route_sem(self, route: str) -> asyncio.Semaphore:
+        sem = self._route_sems.get(route)
+        if sem is None:
+            limit = ROUTE_LIMITS.get(route.split(":", 1)[0], DEFAULT_ROUTE_LIMIT)
+            sem = self._route_sems[route] = asyncio.Semaphore(limit)
+        return sem
+
+    def submit_nowait(self, lane: str, route: str, factory: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Queue a request; returns a future for its result. `factory` must create a fresh coroutine."""
+        if lane not in self.queues:
+            raise ValueError(f"Unknown lane: {lane}")
+        self._ensure_scheduler()
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues[lane]
+        queue.append(_Job(lane, route, factory, future))
+        stats = self.stats[lane]
+        stats.max_depth = max(stats.max_depth, len(queue))
+        self._wakeup.set()
+        return future
+
+    async def submit(self, lane: str, route: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Queue a request and wait for it. Exceptions from discord.py propagate to the caller."""
+        return await self.submit_nowait(lane, route, factory)
+
+    def _next_job(self) -> Optional[_Job]:
+        for lane in LANES:
+            queue = self.queues[lane]
+            if not queue:
+                continue
+            cap = LANE_CAPS.get(lane)
+            if cap is not None and self.stats[lane].in_flight >= cap:
+                continue
+            return queue.popleft()
+        return None
+
+    async def _schedule(self) -> None:
+        while True:
+            job = self._next_job() if self._in_flight < self.max_in_flight else None
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if job.future.cancelled():
+                continue
+            self._in_flight += 1
+            self.stats[job.lane].in_flight += 1
+            asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        stats = self.stats[job.lane]
+        waited_ms = (time.perf_counter() - job.queued_at) * 1000
+        stats.total_wait_ms += waited_ms
+        stats.max_wait_ms = max(stats.max_wait_ms, waited_ms)
+        try:
+            async with self._route_sem(job.route):
+                result = await job.factory()
+        except Exception as e:
+            stats.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            stats.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            stats.in_flight -= 1
+            self._in_flight -= 1
+            self._wakeup.set()
+
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def metrics_lines(self) -> List[str]:
+        lines = []
+        for lane in LANES:
+            s = self.stats[lane]
+            done = s.completed + s.failed
+            avg = s.total_wait_ms / done if done else 0.0
+            lines.append(
+                f"{lane}: queued {len(self.queues[lane])} (max {s.max_depth}) · in flight {s.in_flight} · "
+                f"done {s.completed} · failed {s.failed} · wait avg {avg:.0f}ms / max {s.max_wait_ms:.0f}ms"
+            )
+        return lines
+
+
+# Global instance
+rest_dispatcher = RestDispatcher()
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logging.error(f"Queued log message failed: {future.exception()}")
+
+
+async def add_roles(member: discord.Member, *roles: discord.abc.Snowflake, reason: Optional[str] = None, lane: str = LANE_GRANT) -> None:
+    await rest_dispatcher.submit(lane, f"member_roles:{member.guild.id}", lambda: member.add_roles(*roles, reason=reason))
+
+
+async def remove_roles(member: discord.Member, *roles: discord.abc.Snowflake, reason: Optional[str] = None, lane: str = LANE_GRANT) -> None:
+    await rest_dispatcher.submit(lane, f"member_roles:{member.guild.id}", lambda: member.remove_roles(*roles, reason=reason))
+
+
+async def send_dm(user: discord.abc.User, **kwargs: Any) -> discord.Message:
+    """DM a user via a known channel when possible. Raises DMClosed, without queueing,
+    if the user recently rejected a DM."""
+    if dm_channels.is_closed(user.id):
+        dm_channels.skipped += 1
+        raise DMClosed(user.id)
+    return await rest_dispatcher.submit(LANE_DM, "dm", lambda: dm_channels.send(user, **kwargs))
+
+
+async def send_message(channel: discord.abc.Messageable, lane: str = LANE_LOG, **kwargs: Any) -> discord.Message:
+    return await rest_dispatcher.submit(lane, f"message:{channel.id}", lambda: channel.send(**kwargs))
+
+
+def queue_log(channel: discord.abc.Messageable, **kwargs: Any) -> "asyncio.Future[discord.Message]":
+    """Fire-and-forget log message; failures are logged, the caller does not wait."""
+    future = rest_dispatcher.submit_nowait(LANE_LOG, f"message:{channel.id}", lambda: channel.send(**kwargs))
+    future.add_done_callback(_log_failure)
+    return future
+
+
+async def edit_message(message: discord.Message, lane: str = LANE_ADMIN, **kwargs: Any) -> discord.Message:
+    return await rest_dispatcher.submit(lane, f"message:{message.channel.id}", lambda: message.edit(**kwargs))
+
+
+async def edit_channel(channel: discord.abc.GuildChannel, lane: str = LANE_ADMIN, **kwargs: Any) -> Any:
+    return await rest_dispatcher.submit(lane, f"channel:{channel.id}", lambda: channel.edit(**kwargs))
+
+
+async def delete_channel(channel: discord.abc.GuildChannel, reason: Optional[str] = None, lane: str = LANE_ADMIN) -> None:
+    await rest_dispatcher.submit(lane, f"channel:{channel.id}", lambda: channel.delete(reason=reason))
+
+
+async def set_permissions(
+    channel: discord.abc.GuildChannel,
+    target: discord.abc.Snowflake,
+    overwrite: Optional[discord.PermissionOverwrite],
+    reason: Optional[str] = None,
+    lane: str = LANE_ADMIN,
+) -> None:
+    """Set (or, with None, delete) one overwrite without resending the channel's others."""
+    await rest_dispatcher.submit(lane, f"channel:{channel.id}", lambda: channel.set_permissions(target, overwrite=overwrite, reason=reason))
@@ -9,6 +9,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional, Union, Dict, Set
 from functools import wraps
 import json
+from .guild_config import guild_configs
 
 # Rate limiting storage
 rate_limits: Dict[str, Dict[int, datetime]] = {
@@ -93,8 +94,10 @@ def check_rate_limit(user_id: int, action: str, limit: int = 5, window: int = 60
 async def log_admin_action(guild: Optional[discord.Guild], title: str, description: str, admin_user: Optional[discord.Member], 
                           color=discord.Color.purple(), additional_fields: Optional[Dict[str, str]] = None):
     """Centralized admin action logging with security"""
-    logs_channel_id = safe_int_convert(os.getenv('LOGS_CHANNEL_ID') or '', default=None)
-    if not logs_channel_id or not guild:
+    if not guild:
+        return
+    logs_channel_id = guild_configs.get(guild.id).logs_channel_id
+    if not logs_channel_id:
         return
     try:
         logs_channel = guild.get_channel(logs_channel_id)
@@ -119,7 +122,8 @@ async def log_admin_action(guild: Optional[discord.Guild], title: str, descripti
             for field_name, field_value in additional_fields.items():
                 embed.add_field(name=field_name, value=sanitize_log_message(str(field_value)), inline=False)
         embed.set_footer(text=f"Security Level: Production | Guild: {guild.name}")
-        await logs_channel.send(embed=embed)
+        from .rest_dispatcher import queue_log  # local import: rest_dispatcher depends on this module
+        queue_log(logs_channel, embed=embed)
     except Exception as e:
         logging.error(f"Failed to send admin log: {sanitize_log_message(str(e))}")
 
@@ -0,0 +1,129 @@
+"""
+Optional sharding (AutoShardedBot) and shard-aware guild iteration.
+
+SHARDING=auto     run as AutoShardedBot; Discord picks the shard count
+SHARD_COUNT=N     fixed total shard count (implies SHARDING=auto)
+SHARD_IDS=0,1     shards this process runs (needs SHARD_COUNT); lets several
+                  processes split one bot
+
+Background loops call owned_guilds() so each process only touches guilds that
+live on its own shards.
+"""
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import discord
+from discord.ext import commands
+
+
+def _parse_int_list(raw: str) -> List[int]:
+    ids = []
+    for part in raw.replace(" ", "").split(","):
+        if part.isdigit():
+            ids.append(int(part))
+    return ids
+
+
+def sharding_enabled() -> bool:
+    """SHARDING=auto (or a SHARD_COUNT) switches the bot to AutoShardedBot."""
+    mode = os.getenv("SHARDING", "").strip().lower()
+    return mode in ("auto", "on", "true", "1") or bool(os.getenv("SHARD_COUNT", "").strip())
+
+
+def get_shard_options() -> Dict[str, Any]:
+    """Extra AutoShardedBot kwargs (shard_count / shard_ids); empty when Discord decides."""
+    if not sharding_enabled():
+        return {}
+    count_raw = os.getenv("SHARD_COUNT", "").strip()
+    ids_raw = os.getenv("SHARD_IDS", "").strip()
+
+    options: Dict[str, Any] = {}
+    if count_raw:
+        try:
+            options["shard_count"] = max(1, int(count_raw))
+        except ValueError:
+            logging.warning("SHARD_COUNT=%r is not an int, letting Discord decide", count_raw)
+    if ids_raw:
+        shard_ids = _parse_int_list(ids_raw)
+        if "shard_count" not in options:
+            logging.warning("SHARD_IDS is set without SHARD_COUNT; ignoring SHARD_IDS")
+        elif shard_ids:
+            options["shard_ids"] = [i for i in shard_ids if i < options["shard_count"]]
+    return options
+
+
+def is_sharded(bot: commands.Bot) -> bool:
+    return isinstance(bot, commands.AutoShardedBot)
+
+
+def shard_for_guild(bot: commands.Bot, guild_id: int) -> int:
+    """Shard id Discord routes this guild to (0 when not sharded)."""
+    shard_count = bot.shard_count or 1
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(bot: commands.Bot, guild_id: int) -> bool:
+    """True if the guild belongs to one of this process's shards and is available."""
+    if not guild_id:
+        return False
+    if is_sharded(bot):
+        shard_ids = getattr(bot, "shard_ids", None)
+        if shard_ids is not None and shard_for_guild(bot, guild_id) not in shard_ids:
+            return False
+    guild = bot.get_guild(guild_id)
+    return guild is not None and not guild.unavailable
+
+
+def owned_guilds(bot: commands.Bot, guild_ids: Optional[Iterable[int]] = None) -> List[discord.Guild]:
+    """Guilds on this process's shards, optionally restricted to `guild_ids`."""
+    if guild_ids is None:
+        candidates = [g.id for g in bot.guilds]
+    else:
+        candidates = [gid for gid in guild_ids if gid]
+    guilds = []
+    for guild_id in candidates:
+        if owns_guild(bot, guild_id):
+            guild = bot.get_guild(guild_id)
+            if guild is not None:
+                guilds.append(guild)
+    return guilds
+
+
+def format_shard_latencies(bot: commands.Bot, max_chars: int = 1024) -> str:
+    """Shard latencies for /debug: a summary line, then one line per shard (unreachable
+    and slowest first), cut to fit `max_chars` (an embed field holds 1024)."""
+    if not is_sharded(bot):
+        return f"Not sharded: {round(bot.latency * 1000)}ms"
+    if not bot.latencies:
+        return "No shards connected"
+    guild_counts: Dict[int, int] = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    measured = []
+    unknown = []
+    for shard_id, latency in bot.latencies:
+        if latency != latency or latency == float("inf"):
+            unknown.append(shard_id)
+        else:
+            measured.append((latency, shard_id))
+    header = f"{len(bot.latencies)} shard(s)"
+    if measured:
+        average = sum(latency for latency, _ in measured) / len(measured)
+        header += f" · avg {round(average * 1000)}ms · max {round(max(measured)[0] * 1000)}ms"
+    if unknown:
+        header += f" · {len(unknown)} n/a"
+    lines = [f"Shard {shard_id}: n/a ({guild_counts.get(shard_id, 0)} guilds)" for shard_id in sorted(unknown)]
+    lines += [
+        f"Shard {shard_id}: {round(latency * 1000)}ms ({guild_counts.get(shard_id, 0)} guilds)"
+        for latency, shard_id in sorted(measured, reverse=True)
+    ]
+    shown = [header]
+    for line in lines:
+        if sum(len(l) + 1 for l in shown) + len(line) + 20 > max_chars:
+            break
+        shown.append(line)
+    hidden = len(lines) - (len(shown) - 1)
+    if hidden:
+        shown.append(f"…and {hidden} more")
+    return "\n".join(shown)[:max_chars]
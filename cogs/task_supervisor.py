@@ -0,0 +1,173 @@
+"""
+Supervisor for named singleton background jobs.
+
+on_ready fires again after every gateway reconnect, so cogs must not create a new
+loop task there. Instead they register jobs here by name: ensure() is idempotent
+(a running job is left alone), crashed jobs are restarted with exponential backoff,
+and cancel_owner() stops a cog's jobs on unload. A job that is being cancelled or
+belongs to a previous owner (a reloaded cog) is replaced rather than kept.
+/debug lists status and run counts.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .security_utils import sanitize_log_message
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+
+
+class SupervisedJob:
+    __slots__ = (
+        "name", "func", "interval", "owner", "start_after", "task",
+        "status", "runs", "failures", "restarts", "last_error", "last_run", "started_at",
+    )
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], interval: Optional[float],
+                 owner: Any, start_after: Optional[Callable[[], Awaitable[Any]]]):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.owner = owner
+        self.start_after = start_after
+        self.task: Optional[asyncio.Task] = None
+        self.status = "pending"
+        self.runs = 0
+        self.failures = 0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.last_run: Optional[float] = None
+        self.started_at = time.time()
+
+    def is_alive(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def is_cancelling(self) -> bool:
+        return self.is_alive() and self.task.cancelling() > 0
+
+
+class TaskSupervisor:
+    def __init__(self):
+        self.jobs: Dict[str, SupervisedJob] = {}
+
+    def ensure(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        interval: Optional[float] = None,
+        owner: Any = None,
+        start_after: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> bool:
+        """Start job `name` unless it is already running. Returns True if a task was created.
+
+        func is awaited once per run; with `interval` it runs forever, sleeping
+        `interval` seconds between runs. start_after (e.g. bot.wait_until_ready)
+        is awaited once before the first run. A live job that is being cancelled
+        or was registered by another owner is cancelled and replaced.
+        """
+        job = self.jobs.get(name)
+        if job is not None and job.is_alive():
+            if job.owner is owner and not job.is_cancelling():
+                return False
+            job.task.cancel()
+        job = SupervisedJob(name, func, interval, owner, start_after)
+        self.jobs[name] = job
+        job.task = asyncio.create_task(self._run(job), name=f"supervisor:{name}")
+        return True
+
+    async def _run(self, job: SupervisedJob) -> None:
+        backoff = BACKOFF_BASE_SECONDS
+        try:
+            if job.start_after is not None:
+                job.status = "waiting"
+                await job.start_after()
+            while True:
+                job.status = "running"
+                try:
+                    await job.func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    job.failures += 1
+                    job.last_error = sanitize_log_message(f"{type(e).__name__}: {e}")[:200]
+                    job.status = "backoff"
+                    logging.error(f"Background job {job.name} crashed ({job.failures}x), restarting in {backoff}s: {job.last_error}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, BACKOFF_MAX_SECONDS)
+                    job.restarts += 1
+                    continue
+                job.runs += 1
+                job.last_run = time.time()
+                backoff = BACKOFF_BASE_SECONDS
+                if job.interval is None:
+                    job.status = "finished"
+                    return
+                job.status = "sleeping"
+                await asyncio.sleep(job.interval)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        finally:
+            # Finished and cancelled jobs leave the registry (unless already replaced)
+            if job.status in ("finished", "cancelled") and self.jobs.get(job.name) is job:
+                del self.jobs[job.name]
+
+    def cancel(self, name: str) -> bool:
+        job = self.jobs.pop(name, None)
+        if job is None or not job.is_alive():
+            return False
+        job.task.cancel()
+        return True
+
+    def cancel_owner(self, owner: Any) -> int:
+        """Cancel and unregister every job registered by `owner` (call from cog_unload).
+
+        The jobs leave the registry at once, so the reloaded cog's ensure() in
+        cog_load starts fresh ones instead of finding the old, dying tasks.
+        """
+        cancelled = 0
+        for name, job in list(self.jobs.items()):
+            if job.owner is owner:
+                del self.jobs[name]
+                if job.is_alive():
+                    job.task.cancel()
+                    cancelled += 1
+        return cancelled
+
+    def status_lines(self) -> List[str]:
+        now = time.time()
+        lines = []
+        for job in sorted(self.jobs.values(), key=lambda j: (not j.failures, j.name)):
+            last = f"{int(now - job.last_run)}s ago" if job.last_run else "never"
+            line = f"{job.name}: {job.status} · runs {job.runs} · last {last}"
+            if job.failures:
+                line += f" · failures {job.failures}"
+            lines.append(line)
+        return lines
+
+    def status_summary(self, max_lines: int = 10, max_chars: int = 1024) -> str:
+        """Job counts per state, then the first `max_lines` jobs (failing ones first),
+        cut to fit `max_chars` (an embed field holds 1024)."""
+        if not self.jobs:
+            return "No jobs registered"
+        states: Dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.status] = states.get(job.status, 0) + 1
+        header = f"{len(self.jobs)} job(s): " + " · ".join(f"{n} {state}" for state, n in sorted(states.items()))
+        lines = self.status_lines()
+        shown = [header]
+        for line in lines[:max_lines]:
+            if sum(len(l) + 1 for l in shown) + len(line) + 20 > max_chars:
+                break
+            shown.append(line)
+        hidden = len(lines) - (len(shown) - 1)
+        if hidden:
+            shown.append(f"…and {hidden} more")
+        return "\n".join(shown)[:max_chars]
+
+
+# Global instance
+task_supervisor = TaskSupervisor()
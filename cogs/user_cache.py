@@ -0,0 +1,147 @@
+"""
+In-memory caches for user lookups.
+
+TTLCache is a small LRU with per-entry expiry and hit/miss counters. user_cache
+holds two of them for /userinfo:
+
+- profiles: fetched discord.User objects (fetch_user is the only way to get
+  public_flags for badges), so repeated lookups skip the REST round-trip;
+- embeds: the rendered /userinfo embed per (guild, member).
+
+Gateway events keep them fresh: on_user_update drops the user's profile and
+embeds, member/role updates drop the affected embeds. The TTLs bound staleness
+for anything the events miss. Hit rates are shown in /debug.
+
+USERINFO_CACHE_SIZE   entries per cache (default 1000)
+USERINFO_PROFILE_TTL  seconds a fetched profile is reused (default 3600)
+USERINFO_EMBED_TTL    seconds a rendered embed is reused (default 300)
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+import discord
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "").strip() or default))
+    except ValueError:
+        logging.warning("%s is not an int, using %s", name, default)
+        return default
+
+
+USERINFO_CACHE_SIZE = _env_int("USERINFO_CACHE_SIZE", 1000)
+USERINFO_PROFILE_TTL = _env_int("USERINFO_PROFILE_TTL", 3600)
+USERINFO_EMBED_TTL = _env_int("USERINFO_EMBED_TTL", 300)
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache whose entries also expire `ttl` seconds after they were stored."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: K, value: V) -> None:
+        if not self.maxsize:
+            return
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        """Drop every key matching predicate; returns how many were dropped."""
+        keys = [k for k in self._data if predicate(k)]
+        for k in keys:
+            del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def metrics_line(self, name: str) -> str:
+        return (
+            f"{name}: {len(self)}/{self.maxsize} · hit {self.hit_rate():.0%} "
+            f"({self.hits}/{self.hits + self.misses}) · evicted {self.evictions}"
+        )
+
+
+class UserCache:
+    def __init__(self):
+        self.profiles: TTLCache[int, discord.User] = TTLCache(USERINFO_CACHE_SIZE, USERINFO_PROFILE_TTL)
+        # (guild_id, member_id) -> rendered /userinfo embed
+        self.embeds: TTLCache[Tuple[int, int], discord.Embed] = TTLCache(USERINFO_CACHE_SIZE, USERINFO_EMBED_TTL)
+
+    async def fetch_user(self, client: discord.Client, user_id: int) -> discord.User:
+        """fetch_user() with the result reused for USERINFO_PROFILE_TTL seconds."""
+        user = self.profiles.get(user_id)
+        if user is None:
+            user = await client.fetch_user(user_id)
+            self.profiles.put(user_id, user)
+        return user
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.profiles.pop(user_id)
+        self.embeds.pop_where(lambda key: key[1] == user_id)
+
+    # Listeners, registered by commands/userinfo.py
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        # Gateway user payloads may omit public_flags, so refetch on next use
+        self.invalidate_user(after.id)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        self.embeds.pop((after.guild.id, after.id))
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.embeds.pop((member.guild.id, member.id))
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        # Uncached members (lean profile) get no on_member_remove
+        self.embeds.pop((payload.guild_id, payload.user.id))
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        self.embeds.pop_where(lambda key: key[0] == after.guild.id)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.embeds.pop_where(lambda key: key[0] == role.guild.id)
+
+    def metrics_lines(self) -> List[str]:
+        return [self.profiles.metrics_line("profiles"), self.embeds.metrics_line("userinfo embeds")]
+
+
+# Global instance
+user_cache = UserCache()
@@ -6,6 +6,9 @@ import os
 import logging
 import asyncio
 from datetime import datetime, timezone
+from cogs.guild_config import guild_configs
+from cogs.rest_dispatcher import add_roles, remove_roles, queue_log
+from cogs.dm_outbox import dm_outbox
 # from datetime import timedelta  # unused
 # from typing import Dict, Set  # unused
 # import json  # unused
@@ -198,13 +201,13 @@ class VerificationView(View):
                 )
                 return
             for r in roles_to_add:
-                await interaction.user.add_roles(r, reason="Verification – roles from VERIFIED_ROLE_IDS")
+                await add_roles(interaction.user, r, reason="Verification – roles from VERIFIED_ROLE_IDS")
             role_names = [r.name for r in roles_to_add]
-            unverified_role_id = int(os.getenv("UNVERIFIED_ROLE_ID", 0))
+            unverified_role_id = guild_configs.get(guild.id).unverified_role_id if guild else 0
             if unverified_role_id and guild:
                 unverified_role = guild.get_role(unverified_role_id)
                 if unverified_role and unverified_role in interaction.user.roles:
-                    await interaction.user.remove_roles(unverified_role, reason="Verification complete")
+                    await remove_roles(interaction.user, unverified_role, reason="Verification complete")
             embed = discord.Embed(
                 title="🎉 Verification Complete!",
                 description=(
@@ -217,30 +220,23 @@ class VerificationView(View):
             )
             embed.set_footer(text="Verification complete!")
             await interaction.followup.send(embed=embed, ephemeral=True)
-            async def send_verified_dm():
-                await asyncio.sleep(2)
-                try:
-                    dm_embed = discord.Embed(
-                        title="🎉 You Are Verified!",
-                        description=(
-                            "Your access has been granted.\n\n"
-                            f"**📧 Email:** `{encrypt_email(email)}`\n"
-                            f"**🔑 Roles:** {', '.join(role_names)}\n\n"
-                            "Welcome to the server!"
-                        ),
-                        color=discord.Color.green()
-                    )
-                    dm_embed.set_footer(text=f"Server: {getattr(guild, 'name', 'Unknown')}")
-                    await interaction.user.send(embed=dm_embed)
-                except Exception as e:
-                    logging.warning(f"Could not send verification DM to {interaction.user.name}: {e}")
-            asyncio.create_task(send_verified_dm())
+            dm_embed = discord.Embed(
+                title="🎉 You Are Verified!",
+                description=(
+                    "Your access has been granted.\n\n"
+                    f"**📧 Email:** `{encrypt_email(email)}`\n"
+                    f"**🔑 Roles:** {', '.join(role_names)}\n\n"
+                    "Welcome to the server!"
+                ),
+                color=discord.Color.green()
+            )
+            dm_embed.set_footer(text=f"Server: {getattr(guild, 'name', 'Unknown')}")
+            dm_outbox.enqueue(interaction.user, f"verified:{guild.id}", embed=dm_embed)
             try:
                 from cogs.member_management import MemberManagement
                 member_cog = interaction.client.get_cog("MemberManagement")
-                if member_cog and hasattr(member_cog, "pending_users") and interaction.user.id in member_cog.pending_users:
-                    del member_cog.pending_users[interaction.user.id]
-                    member_cog.save_pending_users()
+                if member_cog and hasattr(member_cog, "discard_pending"):
+                    member_cog.discard_pending(guild.id, [interaction.user.id])
             except Exception:
                 pass
             await self.log_verification_event(
@@ -286,9 +282,9 @@ class VerificationView(View):
         if not guild:
             return
             
-        logs_channel_id = os.getenv('LOGS_CHANNEL_ID')
+        logs_channel_id = guild_configs.get(guild.id).logs_channel_id
         if logs_channel_id:
-            logs_channel = guild.get_channel(int(logs_channel_id))
+            logs_channel = guild.get_channel(logs_channel_id)
             if logs_channel:
                 embed = discord.Embed(
                     title=title,
@@ -302,10 +298,7 @@ class VerificationView(View):
                 embed.add_field(name="Account Created", value=f"<t:{int(user.created_at.timestamp())}:R>", inline=True)
                 embed.set_footer(text=f"Guild: {guild.name}")
                 
-                try:
-                    await logs_channel.send(embed=embed)
-                except Exception as e:
-                    logging.error(f"Failed to send log message: {e}")
+                queue_log(logs_channel, embed=embed)
 
 class Verification(commands.Cog):
     def __init__(self, bot):
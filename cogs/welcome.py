@@ -5,24 +5,37 @@ Start Verification shows an ephemeral message only (no tickets):
 - Else → "You'll get free member access automatically within 1 hour of joining."
 Member role is granted by member_management cog after 1hr for new joiners.
 """
-import asyncio
 import logging
 import os
 import re
-import time
 import json
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
 import discord
 
-
-async def _log_start_verification(guild: discord.Guild, member: discord.Member, status: str, dm_sent: bool | None = None) -> None:
+from .client_profile import get_or_fetch_member
+from .sharding import owned_guilds
+from .guild_config import guild_configs, GuildConfig, DEFAULT_CALL_BOOKING_LINK
+from .task_supervisor import task_supervisor
+from .clock import clock
+from .dm_channels import dm_channels
+from .dm_outbox import dm_outbox
+from .rest_dispatcher import (
+    LANE_ADMIN, add_roles, remove_roles, send_message, edit_message, delete_channel, queue_log,
+)
+
+
+async def _log_start_verification(
+    guild: discord.Guild,
+    member: discord.Member,
+    status: str,
+    dm_sent: bool | None = None,
+    config: GuildConfig | None = None,
+) -> None:
     """Send a log embed when someone presses Start Verification."""
-    logs_channel_id = os.getenv("LOGS_CHANNEL_ID")
-    if not logs_channel_id:
-        return
-    channel = guild.get_channel(int(logs_channel_id))
+    config = config or guild_configs.get(guild.id)
+    channel = config.logs_channel(guild)
     if not channel or not isinstance(channel, discord.TextChannel):
         return
     embed = discord.Embed(
@@ -38,14 +51,10 @@ async def _log_start_verification(guild: discord.Guild, member: discord.Member,
     if dm_sent is not None:
         embed.add_field(name="Booking link DM", value="✅ Sent" if dm_sent else "❌ Not sent", inline=True)
     embed.set_footer(text=f"Guild: {guild.name}")
-    try:
-        await channel.send(embed=embed)
-    except Exception as e:
-        logging.warning("Failed to send Start Verification log: %s", e)
+    queue_log(channel, embed=embed)
 from discord.ext import commands
 
-# Vito branding - overridable via env
-DEFAULT_CALL_BOOKING_LINK = "https://app.iclosed.io/e/barracudagrowth/vito-s-concepts-intiation-call-d"
+# Vito branding - overridable via env (booking link: per guild, see guild_config)
 DEFAULT_VITO_LOGO = "https://cdn.discordapp.com/attachments/1428075084811206716/1468365777131540522/tmp6by9gc_h.png"
 
 WELCOME_MESSAGE_FILE = "welcome_message.json"
@@ -74,17 +83,9 @@ def _ticket_auto_close_seconds() -> int:
     return 3600  # 1 hour default
 
 
-def _get_paid_role_ids() -> set[int]:
-    """Load comma-separated PAID_ROLE_IDS from env. Any role in this set counts as paid/verified."""
-    raw = os.getenv("PAID_ROLE_IDS", "").strip()
-    if not raw:
-        return set()
-    ids = set()
-    for part in raw.replace(" ", "").split(","):
-        part = part.strip()
-        if part and part.isdigit():
-            ids.add(int(part))
-    return ids
+def _get_paid_role_ids(guild_id: int) -> frozenset[int]:
+    """Paid role IDs for a guild (/paid_roles, else env PAID_ROLE_IDS). Any role in this set counts as paid/verified."""
+    return guild_configs.get(guild_id).paid_role_ids
 
 
 def _sanitize_channel_name(name: str, max_len: int = 100) -> str:
@@ -166,7 +167,7 @@ class StartVerificationView(discord.ui.View):
             return
 
         user_id = interaction.user.id
-        now = time.time()
+        now = clock.time()
         cooldown = _cooldown_seconds()
         if now - self._cooldowns.get(user_id, 0) < cooldown:
             await interaction.response.send_message(
@@ -178,8 +179,9 @@ class StartVerificationView(discord.ui.View):
 
         member = interaction.user
         guild = interaction.guild
-        paid_role_ids = _get_paid_role_ids()
-        member_role_id = int(os.getenv("MEMBER_ROLE_ID", 0))
+        config = guild_configs.get(guild.id)
+        paid_role_ids = config.paid_role_ids
+        member_role_id = config.member_role_id
 
         has_paid = bool(paid_role_ids) and any(r.id in paid_role_ids for r in member.roles)
         has_member = member_role_id and any(r.id == member_role_id for r in member.roles)
@@ -189,77 +191,90 @@ class StartVerificationView(discord.ui.View):
                 "✅ **You're already verified.** You have access to the server.",
                 ephemeral=True,
             )
-            await _log_start_verification(guild, member, "Already verified")
+            await _log_start_verification(guild, member, "Already verified", config=config)
             return
 
-        await interaction.response.defer(ephemeral=True)
-        booking_link = os.getenv("CALL_BOOKING_LINK", DEFAULT_CALL_BOOKING_LINK)
-        dm_sent = False
-        try:
-            dm_embed = discord.Embed(
-                title="📅 Book your onboarding call",
-                description=(
-                    "Book your call using the link below to get the most out of the server.\n\n"
-                    f"👉 [**Book your onboarding call**]({booking_link})"
-                ),
-                color=discord.Color.blue(),
-            )
-            dm_embed.set_footer(text="Vito")
-            await member.send(embed=dm_embed)
-            dm_sent = True
-        except discord.Forbidden:
-            pass
-        except Exception as e:
-            logging.warning("Could not send booking link DM to %s: %s", member.name, e)
+        booking_link = config.booking_link or DEFAULT_CALL_BOOKING_LINK
+        status = "Not verified – booking link / 1hr access"
+        dm_embed = discord.Embed(
+            title="📅 Book your onboarding call",
+            description=(
+                "Book your call using the link below to get the most out of the server.\n\n"
+                f"👉 [**Book your onboarding call**]({booking_link})"
+            ),
+            color=discord.Color.blue(),
+        )
+        dm_embed.set_footer(text="Vito")
 
-        if dm_sent:
-            await interaction.followup.send(
-                "**The booking link has been sent to your DMs.**\n\n"
+        async def dm_settled(sent: bool) -> None:
+            if not sent:
+                await interaction.followup.send(_dm_fallback_message(booking_link), ephemeral=True)
+            await _log_start_verification(guild, member, status, dm_sent=sent, config=config)
+
+        # The DM goes out in the background, so the answer is immediate
+        if dm_outbox.enqueue(member, f"booking_link:{guild.id}", on_result=dm_settled, embed=dm_embed):
+            await interaction.response.send_message(
+                "**The booking link is being sent to your DMs.**\n\n"
                 "Please book your call to get access. ",
                 ephemeral=True,
             )
+        elif dm_channels.is_closed(member.id):
+            await interaction.response.send_message(_dm_fallback_message(booking_link), ephemeral=True)
+            await _log_start_verification(guild, member, status, dm_sent=False, config=config)
         else:
-            await interaction.followup.send(
-                "I couldn't send you a DM. Please allow DMs from this server, or book your call here: "
+            await interaction.response.send_message(
+                "**The booking link was already sent to your DMs.** You can also book your call here: "
                 f"{booking_link}\n\n"
                 "Please book your call to get access. ",
                 ephemeral=True,
             )
-        await _log_start_verification(guild, member, "Not verified – booking link / 1hr access", dm_sent=dm_sent)
+            await _log_start_verification(guild, member, f"{status} (DM already sent)", config=config)
+
+
+def _dm_fallback_message(booking_link: str) -> str:
+    return (
+        "I couldn't send you a DM. Please allow DMs from this server, or book your call here: "
+        f"{booking_link}\n\n"
+        "Please book your call to get access. "
+    )
 
 
 def get_start_verification_view() -> discord.ui.View:
     return StartVerificationView()
 
 
-async def get_or_create_welcome_message(
-    welcome_channel: discord.TextChannel,
-    embed: discord.Embed,
-    view: discord.ui.View | None = None,
-) -> discord.Message:
+def _load_welcome_messages() -> dict:
+    """Welcome message per channel: {channel_id: message_id}. Reads the legacy single-message format too."""
     try:
         with open(WELCOME_MESSAGE_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-            msg_id = data.get("message_id")
-            channel_id = data.get("channel_id")
     except (FileNotFoundError, json.JSONDecodeError):
-        msg_id = None
-        channel_id = None
+        return {}
+    if "channel_id" in data:
+        return {str(data.get("channel_id")): data.get("message_id")}
+    return data
 
-    if channel_id != welcome_channel.id:
-        msg_id = None
+
+async def get_or_create_welcome_message(
+    welcome_channel: discord.TextChannel,
+    embed: discord.Embed,
+    view: discord.ui.View | None = None,
+) -> discord.Message:
+    messages = _load_welcome_messages()
+    msg_id = messages.get(str(welcome_channel.id))
 
     if msg_id:
         try:
             msg = await welcome_channel.fetch_message(msg_id)
-            await msg.edit(embed=embed, view=view)
+            await edit_message(msg, embed=embed, view=view)
             return msg
         except (discord.NotFound, discord.HTTPException):
             pass
 
-    msg = await welcome_channel.send(embed=embed, view=view)
+    msg = await send_message(welcome_channel, lane=LANE_ADMIN, embed=embed, view=view)
+    messages[str(welcome_channel.id)] = msg.id
     with open(WELCOME_MESSAGE_FILE, "w", encoding="utf-8") as f:
-        json.dump({"message_id": msg.id, "channel_id": welcome_channel.id}, f)
+        json.dump(messages, f)
     return msg
 
 
@@ -270,91 +285,153 @@ Book in your onboarding call to verify you’re human and to get a tour + advice
 Click Start Verification below to check your status."""
 
 
+def build_welcome_embed() -> discord.Embed:
+    """Welcome channel embed (same for every guild; logo overridable via VITO_LOGO_URL)."""
+    logo_url = os.getenv("VITO_LOGO_URL", DEFAULT_VITO_LOGO)
+    embed = discord.Embed(
+        title="👋 Welcome to the Server!",
+        description=WELCOME_EMBED_DESCRIPTION,
+        color=0xFFFFFF,
+    )
+    embed.set_footer(text="Welcome to Vito")
+    embed.set_thumbnail(url=logo_url)
+    return embed
+
+
 class Welcome(commands.Cog):
     """Welcome channel + Start Verification (ephemeral status only). Legacy ticket auto-close loop still runs for old tickets."""
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self._welcome_ready: set = set()  # guild ids whose welcome message was checked this run
+        self._view = StartVerificationView()
 
     async def cog_load(self) -> None:
-        self.bot.add_view(StartVerificationView())
+        self.bot.add_view(self._view)
+        task_supervisor.ensure(
+            "ticket_auto_close",
+            self._ticket_auto_close_pass,
+            interval=60,
+            owner=self,
+            start_after=self.bot.wait_until_ready,
+        )
+
+    async def cog_unload(self) -> None:
+        task_supervisor.cancel_owner(self)
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         try:
-            guild_id = os.getenv("GUILD_ID")
-            if not guild_id:
-                logging.error("GUILD_ID is not set")
-                return
-            guild = self.bot.get_guild(int(guild_id))
-            if not guild:
-                logging.error("Guild %s not found", guild_id)
-                return
-
-            welcome_channel_id = os.getenv("WELCOME_CHANNEL_ID")
-            if not welcome_channel_id:
-                logging.error("WELCOME_CHANNEL_ID is not set")
-                return
-            welcome_channel = self.bot.get_channel(int(welcome_channel_id))
-            if not welcome_channel or not isinstance(welcome_channel, discord.TextChannel):
-                logging.error("Welcome channel %s not found", welcome_channel_id)
+            managed = guild_configs.managed_guild_ids()
+            if not managed:
+                logging.error("No guild configured (set GUILD_ID or use /set_welcome_channel)")
                 return
+            # Only guilds on this process's shards
+            for guild in owned_guilds(self.bot, managed):
+                # on_ready re-fires after reconnects; the message only needs checking once
+                if guild.id in self._welcome_ready:
+                    continue
+                await self._setup_welcome_message(guild, guild_configs.get(guild.id))
+                self._welcome_ready.add(guild.id)
+        except Exception as e:
+            logging.exception("Welcome on_ready failed: %s", e)
 
-            logo_url = os.getenv("VITO_LOGO_URL", DEFAULT_VITO_LOGO)
-            embed = discord.Embed(
-                title="👋 Welcome to the Server!",
-                description=WELCOME_EMBED_DESCRIPTION,
-                color=0xFFFFFF,
-            )
-            embed.set_footer(text="Welcome to Vito")
-            embed.set_thumbnail(url=logo_url)
+    async def _setup_welcome_message(self, guild: discord.Guild, config: GuildConfig) -> None:
+        if not config.welcome_channel_id:
+            logging.error("Welcome channel is not set for guild %s", guild.id)
+            return
+        welcome_channel = config.welcome_channel(guild)
+        if not welcome_channel or not isinstance(welcome_channel, discord.TextChannel):
+            logging.error("Welcome channel %s not found in guild %s", config.welcome_channel_id, guild.id)
+            return
+        try:
             view = get_start_verification_view()
-            msg = await get_or_create_welcome_message(welcome_channel, embed, view)
+            msg = await get_or_create_welcome_message(welcome_channel, build_welcome_embed(), view)
             logging.info("Welcome message persistent: %s", msg.jump_url)
-            self.bot.loop.create_task(self._ticket_auto_close_loop())
         except Exception as e:
-            logging.exception("Welcome on_ready failed: %s", e)
+            logging.exception("Welcome setup failed for guild %s: %s", guild.id, e)
 
-    async def _ticket_auto_close_loop(self) -> None:
-        """Every minute: close tickets older than 1hr; grant member role if no paid role."""
-        await self.bot.wait_until_ready()
-        guild_id = os.getenv("GUILD_ID")
-        member_role_id = int(os.getenv("MEMBER_ROLE_ID", 0))
-        unverified_role_id = int(os.getenv("UNVERIFIED_ROLE_ID", 0))
-        if not guild_id or not member_role_id:
-            logging.warning("GUILD_ID or MEMBER_ROLE_ID missing; ticket auto-close may not grant roles")
-        while True:
-            try:
-                await self._close_old_tickets(
-                    int(guild_id) if guild_id else 0,
-                    member_role_id,
-                    unverified_role_id,
-                )
-            except Exception as e:
-                logging.exception("Ticket auto-close error: %s", e)
-            await asyncio.sleep(60)
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        """Drop the departed user's button cooldown and ticket (deleting its channel)."""
+        await self._handle_leave(member.guild, member.id)
 
-    async def _close_old_tickets(
-        self,
-        guild_id: int,
-        member_role_id: int,
-        unverified_role_id: int,
-    ) -> None:
-        guild = self.bot.get_guild(guild_id) if guild_id else None
-        if not guild:
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        """Leaves of uncached members (lean client profile)."""
+        if isinstance(payload.user, discord.Member):
+            return  # cached: on_member_remove handled it
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is not None:
+            await self._handle_leave(guild, payload.user.id)
+
+    async def _handle_leave(self, guild: discord.Guild, user_id: int) -> None:
+        self._view._cooldowns.pop(user_id, None)
+        tickets = _load_tickets()
+        data = tickets.get(str(user_id))
+        if data is None or int(data.get("guild_id", guild_configs.default_guild_id())) != guild.id:
             return
+        await self._drop_ticket(guild, tickets, str(user_id))
+        _save_tickets(tickets)
 
+    async def _drop_ticket(self, guild: discord.Guild, tickets: dict, user_id_str: str) -> None:
+        data = tickets.pop(user_id_str, {})
+        channel = guild.get_channel(int(data.get("channel_id") or 0))
+        if channel and isinstance(channel, discord.TextChannel):
+            try:
+                await delete_channel(channel, reason="Ticket owner left the server")
+            except discord.HTTPException:
+                pass
+
+    def _prune_cooldowns(self) -> None:
+        """Cooldowns only matter for VERIFICATION_COOLDOWN_SECONDS; drop the rest."""
+        cutoff = clock.time() - _cooldown_seconds()
+        cooldowns = self._view._cooldowns
+        for user_id in [uid for uid, pressed in cooldowns.items() if pressed < cutoff]:
+            del cooldowns[user_id]
+
+    async def _reconcile_tickets(self, guild: discord.Guild) -> None:
+        """Drop tickets of users who left while we missed the event (needs a full member cache)."""
+        if not guild.chunked:
+            return
+        tickets = _load_tickets()
+        default_guild_id = guild_configs.default_guild_id()
+        departed = [
+            uid for uid, data in tickets.items()
+            if int(data.get("guild_id", default_guild_id)) == guild.id and guild.get_member(int(uid)) is None
+        ]
+        for uid in departed:
+            await self._drop_ticket(guild, tickets, uid)
+        if departed:
+            _save_tickets(tickets)
+
+    async def _ticket_auto_close_pass(self) -> None:
+        """Run every minute by the supervisor: close tickets older than 1hr; grant member role if no paid role."""
+        self._prune_cooldowns()
+        # Only guilds on this process's shards
+        for guild in owned_guilds(self.bot, guild_configs.managed_guild_ids()):
+            try:
+                await self._reconcile_tickets(guild)
+                await self._close_old_tickets(guild, guild_configs.get(guild.id))
+            except Exception as e:
+                logging.exception("Ticket auto-close error in guild %s: %s", guild.id, e)
+
+    async def _close_old_tickets(self, guild: discord.Guild, config: GuildConfig) -> None:
         tickets = _load_tickets()
         if not tickets:
             return
 
-        now = datetime.now(timezone.utc)
+        now = clock.now()
         cutoff = now - timedelta(seconds=_ticket_auto_close_seconds())
-        paid_role_ids = _get_paid_role_ids()
+        paid_role_ids = config.paid_role_ids
+        default_guild_id = guild_configs.default_guild_id()
         to_remove = []
 
         for user_id_str, data in tickets.items():
             try:
+                # Legacy tickets carry no guild_id and belong to the env GUILD_ID guild
+                if int(data.get("guild_id", default_guild_id)) != guild.id:
+                    continue
                 created_at = datetime.fromisoformat(data["created_at"])
                 if created_at > cutoff:
                     continue
@@ -365,24 +442,24 @@ class Welcome(commands.Cog):
 
                 channel = guild.get_channel(int(channel_id))
                 user_id = int(user_id_str)
-                member = guild.get_member(user_id)
+                member = await get_or_fetch_member(guild, user_id)
 
                 if member:
                     has_paid = bool(paid_role_ids) and any(
                         r.id in paid_role_ids for r in member.roles
                     )
                     if not has_paid:
-                        member_role = guild.get_role(member_role_id)
+                        member_role = guild.get_role(config.member_role_id)
                         if member_role and member_role not in member.roles:
-                            await member.add_roles(member_role, reason="Ticket auto-close: no paid role, grant free member")
-                        if unverified_role_id:
-                            unverified = guild.get_role(unverified_role_id)
+                            await add_roles(member, member_role, reason="Ticket auto-close: no paid role, grant free member")
+                        if config.unverified_role_id:
+                            unverified = guild.get_role(config.unverified_role_id)
                             if unverified and unverified in member.roles:
-                                await member.remove_roles(unverified, reason="Ticket auto-close")
+                                await remove_roles(member, unverified, reason="Ticket auto-close")
 
                 if channel and isinstance(channel, discord.TextChannel):
                     try:
-                        await channel.delete(reason="Ticket auto-close 1hr")
+                        await delete_channel(channel, reason="Ticket auto-close 1hr")
                     except discord.HTTPException:
                         pass
 
@@ -395,10 +472,21 @@ class Welcome(commands.Cog):
             tickets.pop(key, None)
         if to_remove:
             _save_tickets(tickets)
-            pending = _load_pending_users()
-            for key in to_remove:
-                pending.pop(key, None)
-            _save_pending_users(pending)
+            self._discard_pending(guild.id, to_remove)
+
+    def _discard_pending(self, guild_id: int, user_id_strs: list) -> None:
+        """Drop closed-ticket users from the 1-hour timer (via MemberManagement when loaded)."""
+        member_cog = self.bot.get_cog("MemberManagement")
+        if member_cog is not None and hasattr(member_cog, "discard_pending"):
+            member_cog.discard_pending(guild_id, [int(k) for k in user_id_strs])
+            return
+        pending = _load_pending_users()
+        users = pending.get(str(guild_id))
+        for key in user_id_strs:
+            if isinstance(users, dict):
+                users.pop(key, None)
+            pending.pop(key, None)  # legacy flat format
+        _save_pending_users(pending)
 
 
 async def setup(bot: commands.Bot) -> None:
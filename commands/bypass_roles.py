@@ -0,0 +1,108 @@
+"""
+Bypass role commands. Members with a bypass role skip the unverified role, the
+member-role strip and the 1-hour timer. Roles are stored in bypass_roles.json;
+every change rebuilds this server's bypass index straight away.
+/bypass_roles lists them, /bypass_role adds or removes one, /reload_bypass_roles
+rereads the file after a hand edit.
+"""
+import discord
+from discord import app_commands
+from discord.ext import commands
+from cogs.bypass_manager import bypass_manager
+from cogs.guild_config import guild_configs
+from cogs.security_utils import log_admin_action
+
+OWNER_USER_IDS = {890323443252351046, 879714530769391686}
+
+def is_authorized_guild_or_owner(interaction):
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
+        return True
+    if interaction.user.id in OWNER_USER_IDS:
+        return True
+    return False
+
+async def _check_admin(interaction: discord.Interaction) -> bool:
+    if not interaction.guild:
+        await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
+        return False
+    if not is_authorized_guild_or_owner(interaction):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return False
+    if not isinstance(interaction.user, discord.Member) or not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ You need Administrator permissions!", ephemeral=True)
+        return False
+    return True
+
+def build_bypass_embed(guild: discord.Guild) -> discord.Embed:
+    """Bypass roles in this server, with the freshly rebuilt holder count."""
+    holders = bypass_manager.rebuild_index(guild)
+    names = bypass_manager.get_bypass_role_names(guild)
+    embed = discord.Embed(
+        title="🎯 Bypass Roles",
+        description="\n".join(f"• {name}" for name in sorted(names)) or "No bypass roles set.",
+        color=discord.Color.gold()
+    )
+    embed.add_field(
+        name="Members with a bypass role",
+        value=str(len(holders)) if holders is not None else "Unknown (member list not fully cached)",
+        inline=False
+    )
+    embed.set_footer(text=bypass_manager.metrics_line())
+    return embed
+
+@app_commands.command(name="bypass_roles", description="List roles that skip verification")
+@app_commands.default_permissions(administrator=True)
+async def bypass_roles(interaction: discord.Interaction):
+    if not await _check_admin(interaction):
+        return
+    await interaction.response.send_message(embed=build_bypass_embed(interaction.guild), ephemeral=True)
+
+@app_commands.command(name="bypass_role", description="Add or remove a role that skips verification")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(action="Add or remove", role="The bypass role")
+@app_commands.choices(action=[
+    app_commands.Choice(name="Add", value="add"),
+    app_commands.Choice(name="Remove", value="remove"),
+])
+async def bypass_role(interaction: discord.Interaction, action: app_commands.Choice[str], role: discord.Role):
+    if not await _check_admin(interaction):
+        return
+    if action.value == "add":
+        changed = bypass_manager.add_bypass_role(role.id)
+        description = f"Added bypass role {role.mention}." if changed else f"{role.mention} is already a bypass role."
+    else:
+        changed = bypass_manager.remove_bypass_role(role.id)
+        description = f"Removed bypass role {role.mention}." if changed else f"{role.mention} is not a bypass role."
+    await interaction.response.send_message(
+        content=f"{'✅' if changed else 'ℹ️'} {description}",
+        embed=build_bypass_embed(interaction.guild),
+        ephemeral=True
+    )
+    if changed:
+        await log_admin_action(
+            interaction.guild,
+            "Bypass Roles Updated",
+            f"{interaction.user.mention} changed the bypass roles",
+            interaction.user if isinstance(interaction.user, discord.Member) else None,
+            additional_fields={"Change": description}
+        )
+
+@app_commands.command(name="reload_bypass_roles", description="Reload bypass_roles.json")
+@app_commands.default_permissions(administrator=True)
+async def reload_bypass_roles(interaction: discord.Interaction):
+    if not await _check_admin(interaction):
+        return
+    if not bypass_manager.load_bypass_roles():
+        return await interaction.response.send_message(
+            "❌ Could not read bypass_roles.json; the current bypass roles are unchanged. See the bot log.",
+            ephemeral=True
+        )
+    await interaction.response.send_message(
+        content="✅ Reloaded bypass_roles.json.",
+        embed=build_bypass_embed(interaction.guild),
+        ephemeral=True
+    )
+
+async def setup(bot: commands.Bot):
+    for command in (bypass_roles, bypass_role, reload_bypass_roles):
+        bot.tree.add_command(command)
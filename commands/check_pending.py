@@ -3,31 +3,29 @@ from discord import app_commands
 from discord.ext import commands
 import os
 import logging
-from datetime import datetime, timezone, timedelta
+from datetime import timedelta
 import json
+from cogs.client_profile import get_or_fetch_member
+from cogs.guild_config import guild_configs
+from cogs.clock import clock
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
     return False
 
-def load_pending_users():
-    """Load pending users from file"""
+def load_pending_users(guild_id):
+    """Load a guild's pending users from file"""
+    # Imported here so loading this command doesn't pull in member_management
+    from cogs.member_management import parse_pending_users, PENDING_USERS_FILE
     try:
-        if os.path.exists('pending_users.json'):
-            with open('pending_users.json', 'r') as f:
-                data = json.load(f)
-                pending_users = {}
-                for user_id_str, timestamp_str in data.items():
-                    user_id = int(user_id_str)
-                    join_time = datetime.fromisoformat(timestamp_str)
-                    pending_users[user_id] = join_time
-                return pending_users
+        if os.path.exists(PENDING_USERS_FILE):
+            with open(PENDING_USERS_FILE, 'r') as f:
+                return parse_pending_users(json.load(f)).get(guild_id, {})
         return {}
     except Exception as e:
         logging.error(f"Error loading pending users: {e}")
@@ -57,8 +55,8 @@ async def check_pending(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
     
     try:
-        pending_users = load_pending_users()
-        current_time = datetime.now(timezone.utc)
+        pending_users = load_pending_users(interaction.guild.id)
+        current_time = clock.now()
         
         if not pending_users:
             embed = discord.Embed(
@@ -96,7 +94,7 @@ async def check_pending(interaction: discord.Interaction):
         
         # Show first 10 users with details
         for i, (user_id, join_time, time_str, time_remaining) in enumerate(users_with_time[:10]):
-            member = interaction.guild.get_member(user_id)
+            member = await get_or_fetch_member(interaction.guild, user_id)
             member_name = member.name if member else f"User {user_id}"
             member_mention = member.mention if member else f"<@{user_id}>"
             
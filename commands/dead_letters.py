@@ -0,0 +1,117 @@
+"""
+Dead-letter commands for 1-hour access grants that failed every retry.
+/dead_letters lists them (and queued retries); /replay_dead_letters requeues them.
+"""
+import io
+import json
+import discord
+from discord import app_commands
+from discord.ext import commands
+from datetime import datetime
+from typing import Optional
+from cogs.guild_config import guild_configs
+from cogs.grant_queue import grant_queue
+from cogs.security_utils import log_admin_action
+
+OWNER_USER_IDS = {890323443252351046, 879714530769391686}
+
+def is_authorized_guild_or_owner(interaction):
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
+        return True
+    if interaction.user.id in OWNER_USER_IDS:
+        return True
+    return False
+
+async def _check_admin(interaction: discord.Interaction) -> bool:
+    if not interaction.guild:
+        await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
+        return False
+    if not is_authorized_guild_or_owner(interaction):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return False
+    if not isinstance(interaction.user, discord.Member) or not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ You need Administrator permissions!", ephemeral=True)
+        return False
+    return True
+
+# Discord rejects embeds over 25 fields or 6000 characters
+MAX_FIELDS = 25
+MAX_EMBED_CHARS = 5800
+SHOWN_DEAD = 15
+SHOWN_RETRYING = 5
+
+def _timestamp(iso: Optional[str]) -> str:
+    if not iso:
+        return "unknown"
+    return f"<t:{int(datetime.fromisoformat(iso).timestamp())}:R>"
+
+@app_commands.command(name="dead_letters", description="List 1-hour access grants that failed every retry")
+@app_commands.default_permissions(administrator=True)
+async def dead_letters(interaction: discord.Interaction):
+    if not await _check_admin(interaction):
+        return
+    dead = grant_queue.dead_letters_for(interaction.guild.id)
+    retrying = [j for j in grant_queue.pending_jobs_for(interaction.guild.id) if j["attempts"]]
+    embed = discord.Embed(
+        title="📭 Failed Access Grants",
+        description=(
+            f"**{len(dead)}** dead letter(s), **{len(retrying)}** grant(s) retrying.\n"
+            "Use /replay_dead_letters to retry them after fixing the cause (e.g. bot role position)."
+        ),
+        color=discord.Color.red() if dead else discord.Color.green()
+    )
+    fields = [
+        (
+            f"User {job['user_id']}",
+            f"<@{job['user_id']}> · {job['attempts']} attempts · failed {_timestamp(job.get('dead_at'))}\n{(job.get('last_error') or 'unknown error')[:200]}",
+        )
+        for job in dead[:SHOWN_DEAD]
+    ] + [
+        (
+            f"Retrying: user {job['user_id']}",
+            f"{job['attempts']} attempt(s) · next {_timestamp(job['next_attempt'])}\n{(job.get('last_error') or '')[:200]}",
+        )
+        for job in retrying[:SHOWN_RETRYING]
+    ]
+    shown = 0
+    for name, value in fields:
+        # Leave room for the "not shown" field
+        if len(embed.fields) >= MAX_FIELDS - 1 or len(embed) + len(name) + len(value) > MAX_EMBED_CHARS - 100:
+            break
+        embed.add_field(name=name, value=value, inline=False)
+        shown += 1
+    hidden = len(dead) + len(retrying) - shown
+    if hidden:
+        embed.add_field(name="…", value=f"{hidden} more not shown; the attached file lists every entry.", inline=False)
+        report = {"guild_id": interaction.guild.id, "dead_letters": dead, "retrying": retrying}
+        report_file = discord.File(
+            fp=io.BytesIO(json.dumps(report, indent=2).encode('utf-8')),
+            filename=f"dead_letters_{interaction.guild.id}.json"
+        )
+        return await interaction.response.send_message(embed=embed, file=report_file, ephemeral=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@app_commands.command(name="replay_dead_letters", description="Retry failed 1-hour access grants")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(user="Only replay this user (leave empty for all)")
+async def replay_dead_letters(interaction: discord.Interaction, user: Optional[discord.User] = None):
+    if not await _check_admin(interaction):
+        return
+    replayed = grant_queue.replay(interaction.guild.id, [user.id] if user else None)
+    if replayed:
+        grant_queue.save()
+    await interaction.response.send_message(
+        f"🔁 Requeued **{replayed}** grant(s). They will be retried within a minute." if replayed else "✅ No dead letters to replay.",
+        ephemeral=True
+    )
+    if replayed:
+        await log_admin_action(
+            interaction.guild,
+            "Dead Letters Replayed",
+            f"{interaction.user.mention} requeued {replayed} failed access grant(s)",
+            interaction.user if isinstance(interaction.user, discord.Member) else None
+        )
+
+async def setup(bot: commands.Bot):
+    bot.tree.add_command(dead_letters)
+    bot.tree.add_command(replay_dead_letters)
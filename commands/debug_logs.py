@@ -2,14 +2,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import os
+from cogs.guild_config import guild_configs
+from cogs.rest_dispatcher import send_dm
 
 # List of allowed owner user IDs
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
     # Allow if in main server
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     # Allow if user is owner
     if interaction.user.id in OWNER_USER_IDS:
@@ -30,7 +31,8 @@ async def debug_logs(interaction: discord.Interaction, clear_after: bool = False
         )
     try:
         file = discord.File(log_path, filename="bot.log")
-        await interaction.user.send(
+        await send_dm(
+            interaction.user,
             content="Here is the current bot.log file." + (" (Log will be cleared after this)" if clear_after else ""),
             file=file
         )
@@ -3,14 +3,16 @@ from discord import app_commands
 from discord.ext import commands
 import typing
 from typing import Optional
-from cogs.member_management import MemberManagement
+if typing.TYPE_CHECKING:
+    from cogs.member_management import MemberManagement
 import os
+from cogs.client_profile import get_or_fetch_member
+from cogs.guild_config import guild_configs
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -45,12 +47,12 @@ async def force_verify(interaction: discord.Interaction, user: Optional[str] = N
     member_cog = bot.get_cog("MemberManagement")
     if not member_cog:
         return await interaction.followup.send("❌ MemberManagement cog not loaded!", ephemeral=True)
-    mm_cog = typing.cast(MemberManagement, member_cog)
+    mm_cog = typing.cast("MemberManagement", member_cog)
     guild = interaction.guild
     member = None
     if user:
         try:
-            member = guild.get_member(int(user))
+            member = await get_or_fetch_member(guild, int(user))
         except Exception:
             member = None
         if not member:
@@ -109,7 +111,7 @@ async def force_verify_autocomplete(interaction: discord.Interaction, current: s
     member_cog = bot.get_cog("MemberManagement")
     if not member_cog:
         return []
-    mm_cog = typing.cast(MemberManagement, member_cog)
+    mm_cog = typing.cast("MemberManagement", member_cog)
     guild = interaction.guild
     if not guild:
         return []
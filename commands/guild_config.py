@@ -0,0 +1,162 @@
+"""
+Per-guild settings commands: welcome/logs channel, member/unverified roles,
+paid roles and booking link. Stored in guild_configs.json; anything not set
+falls back to the env var.
+"""
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Optional
+from cogs.guild_config import guild_configs, CONFIG_KEYS
+from cogs.security_utils import log_admin_action, validate_input
+
+OWNER_USER_IDS = {890323443252351046, 879714530769391686}
+
+def is_authorized_guild_or_owner(interaction):
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
+        return True
+    if interaction.user.id in OWNER_USER_IDS:
+        return True
+    return False
+
+async def _check_admin(interaction: discord.Interaction) -> bool:
+    """Owners can onboard any guild; admins can edit guilds that are already managed."""
+    if not interaction.guild:
+        await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
+        return False
+    if not is_authorized_guild_or_owner(interaction):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return False
+    if not isinstance(interaction.user, discord.Member) or not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ You need Administrator permissions!", ephemeral=True)
+        return False
+    return True
+
+def _format_value(guild: discord.Guild, key: str, value) -> str:
+    if not value:
+        return "❌ Not set"
+    if key.endswith("_channel_id"):
+        return f"<#{value}>"
+    if key.endswith("_role_id"):
+        return f"<@&{value}>"
+    if key == "paid_role_ids":
+        return ", ".join(f"<@&{rid}>" for rid in sorted(value))
+    return str(value)
+
+def build_config_embed(guild: discord.Guild) -> discord.Embed:
+    config = guild_configs.get(guild.id)
+    overrides = guild_configs.overrides.get(guild.id, {})
+    embed = discord.Embed(
+        title=f"⚙️ Configuration - {guild.name}",
+        description="Values marked *(env)* come from the bot's environment variables.",
+        color=discord.Color.blue()
+    )
+    for key, value in config.as_dict().items():
+        source = "" if key in overrides else " *(env)*"
+        embed.add_field(name=key, value=_format_value(guild, key, value) + source, inline=False)
+    embed.set_footer(text=f"Guild ID: {guild.id}")
+    return embed
+
+async def _apply(interaction: discord.Interaction, key: str, value, description: str):
+    guild_configs.set(interaction.guild.id, key, value)
+    await interaction.response.send_message(
+        content=f"✅ {description}",
+        embed=build_config_embed(interaction.guild),
+        ephemeral=True
+    )
+    await log_admin_action(
+        interaction.guild,
+        "Guild Config Updated",
+        f"{interaction.user.mention} changed `{key}`",
+        interaction.user if isinstance(interaction.user, discord.Member) else None,
+        additional_fields={"Change": description}
+    )
+
+@app_commands.command(name="show_config", description="Show this server's bot configuration")
+@app_commands.default_permissions(administrator=True)
+async def show_config(interaction: discord.Interaction):
+    if not await _check_admin(interaction):
+        return
+    await interaction.response.send_message(embed=build_config_embed(interaction.guild), ephemeral=True)
+
+@app_commands.command(name="set_welcome_channel", description="Set the channel for welcome/verification")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(channel="Channel that holds the welcome message")
+async def set_welcome_channel(interaction: discord.Interaction, channel: discord.TextChannel):
+    if not await _check_admin(interaction):
+        return
+    await _apply(interaction, "welcome_channel_id", channel.id, f"Welcome channel set to {channel.mention}. Run /refresh_welcome to post the message.")
+
+@app_commands.command(name="set_logs_channel", description="Set the channel for logs")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(channel="Channel that receives bot logs")
+async def set_logs_channel(interaction: discord.Interaction, channel: discord.TextChannel):
+    if not await _check_admin(interaction):
+        return
+    await _apply(interaction, "logs_channel_id", channel.id, f"Logs channel set to {channel.mention}.")
+
+@app_commands.command(name="set_role", description="Set the member or unverified role for this server")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(setting="Which role to set", role="The role to use")
+@app_commands.choices(setting=[
+    app_commands.Choice(name="Member role (granted after 1 hour)", value="member_role_id"),
+    app_commands.Choice(name="Unverified role (given on join)", value="unverified_role_id"),
+])
+async def set_role(interaction: discord.Interaction, setting: app_commands.Choice[str], role: discord.Role):
+    if not await _check_admin(interaction):
+        return
+    await _apply(interaction, setting.value, role.id, f"{setting.name} set to {role.mention}.")
+
+@app_commands.command(name="paid_roles", description="Add or remove a paid role (counts as already verified)")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(action="Add or remove", role="The paid role")
+@app_commands.choices(action=[
+    app_commands.Choice(name="Add", value="add"),
+    app_commands.Choice(name="Remove", value="remove"),
+])
+async def paid_roles(interaction: discord.Interaction, action: app_commands.Choice[str], role: discord.Role):
+    if not await _check_admin(interaction):
+        return
+    current = set(guild_configs.get(interaction.guild.id).paid_role_ids)
+    if action.value == "add":
+        current.add(role.id)
+    else:
+        current.discard(role.id)
+    await _apply(interaction, "paid_role_ids", current, f"{'Added' if action.value == 'add' else 'Removed'} paid role {role.mention}.")
+
+@app_commands.command(name="set_booking_link", description="Set the onboarding call booking link")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(url="Booking link sent by Start Verification")
+async def set_booking_link(interaction: discord.Interaction, url: str):
+    if not await _check_admin(interaction):
+        return
+    url = url.strip()
+    if not validate_input(url, 'url'):
+        return await interaction.response.send_message("❌ Please provide a valid http(s) URL.", ephemeral=True)
+    await _apply(interaction, "booking_link", url, "Booking link updated.")
+
+@app_commands.command(name="reset_config", description="Reset a setting (or all) to the environment default")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(setting="Setting to reset (leave empty for all)")
+@app_commands.choices(setting=[app_commands.Choice(name=key, value=key) for key in CONFIG_KEYS])
+async def reset_config(interaction: discord.Interaction, setting: Optional[app_commands.Choice[str]] = None):
+    if not await _check_admin(interaction):
+        return
+    guild_configs.reset(interaction.guild.id, setting.value if setting else None)
+    description = f"Reset {'`' + setting.value + '`' if setting else 'all settings'} to the environment default."
+    await interaction.response.send_message(
+        content=f"✅ {description}",
+        embed=build_config_embed(interaction.guild),
+        ephemeral=True
+    )
+    await log_admin_action(
+        interaction.guild,
+        "Guild Config Updated",
+        f"{interaction.user.mention} reset {'`' + setting.value + '`' if setting else 'all settings'}",
+        interaction.user if isinstance(interaction.user, discord.Member) else None,
+        additional_fields={"Change": description}
+    )
+
+async def setup(bot: commands.Bot):
+    for command in (show_config, set_welcome_channel, set_logs_channel, set_role, paid_roles, set_booking_link, reset_config):
+        bot.tree.add_command(command)
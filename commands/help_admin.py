@@ -2,14 +2,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import typing
-from cogs.member_management import MemberManagement
+if typing.TYPE_CHECKING:
+    from cogs.member_management import MemberManagement
 import os
+from cogs.guild_config import guild_configs
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -39,9 +40,21 @@ async def help_admin(interaction: discord.Interaction):
         ("/cleanup_tracking", "Remove tracking for users who have left the server."),
         ("/reset_tracking", "Clear all tracking data (dangerous, admin only)."),
         ("/refresh_welcome", "Re-post the welcome/verification message."),
-        ("/setup_permissions", "Set up channel permissions for onboarding."),
+        ("/setup_permissions [dry_run]", "Set up channel permissions for onboarding (dry_run shows the plan and API call count)."),
         ("/set_logs_channel <channel>", "Set the channel for logs."),
         ("/set_welcome_channel <channel>", "Set the channel for welcome/verification."),
+        ("/set_role <setting> <role>", "Set this server's member or unverified role."),
+        ("/paid_roles <add|remove> <role>", "Manage roles that count as already verified."),
+        ("/set_booking_link <url>", "Set the onboarding call booking link."),
+        ("/show_config", "Show this server's configuration."),
+        ("/reset_config [setting]", "Reset a setting (or all) to the environment default."),
+        ("/dead_letters", "List 1-hour access grants that failed every retry."),
+        ("/replay_dead_letters [user]", "Retry failed 1-hour access grants."),
+        ("/bypass_roles", "List roles that skip verification and how many members hold them."),
+        ("/bypass_role <add|remove> <role>", "Add or remove a role that skips verification."),
+        ("/reload_bypass_roles", "Reload bypass_roles.json after editing it by hand."),
+        ("/list_backups", "List stored permission backups."),
+        ("/restore_permissions <backup_id> [dry_run]", "Restore channel permissions from a stored backup (dry_run returns the planned changes as a file)."),
         ("/help_admin", "List all admin commands and what they do."),
     ]
     embed = discord.Embed(
@@ -56,7 +69,7 @@ async def help_admin(interaction: discord.Interaction):
     bot = typing.cast(commands.Bot, interaction.client)
     member_cog = bot.get_cog("MemberManagement")
     if member_cog and hasattr(member_cog, "log_member_event"):
-        mm_cog = typing.cast(MemberManagement, member_cog)
+        mm_cog = typing.cast("MemberManagement", member_cog)
         await mm_cog.send_to_logs(
             interaction.guild,
             discord.Embed(title="Admin Command Used", description=f"/help_admin used by {interaction.user.mention}", color=discord.Color.purple())
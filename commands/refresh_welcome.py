@@ -2,24 +2,22 @@
 Refresh welcome message command: re-post welcome embed + Start Verification button.
 """
 import logging
-import os
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from cogs.welcome import (
+    build_welcome_embed,
     get_or_create_welcome_message,
     get_start_verification_view,
-    WELCOME_EMBED_DESCRIPTION,
 )
+from cogs.guild_config import guild_configs
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv("GUILD_ID", 0))
-DEFAULT_VITO_LOGO = "https://cdn.discordapp.com/attachments/1428075084811206716/1468365777131540522/tmp6by9gc_h.png"
 
 
 def is_authorized_guild_or_owner(interaction: discord.Interaction) -> bool:
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -59,33 +57,26 @@ async def refresh_welcome(interaction: discord.Interaction) -> None:
 
     await interaction.response.defer(ephemeral=True)
 
-    welcome_channel_id = os.getenv("WELCOME_CHANNEL_ID")
-    if not welcome_channel_id:
+    config = guild_configs.get(interaction.guild.id)
+    if not config.welcome_channel_id:
         await interaction.followup.send(
-            "WELCOME_CHANNEL_ID is not set.",
+            "Welcome channel is not set. Use /set_welcome_channel or WELCOME_CHANNEL_ID.",
             ephemeral=True,
         )
         return
 
-    welcome_channel = interaction.client.get_channel(int(welcome_channel_id))
+    welcome_channel = config.welcome_channel(interaction.guild)
     if not welcome_channel or not isinstance(
         welcome_channel, discord.TextChannel
     ):
         await interaction.followup.send(
-            "Welcome channel not found. Check .env.",
+            "Welcome channel not found. Check /show_config.",
             ephemeral=True,
         )
         return
 
     try:
-        logo_url = os.getenv("VITO_LOGO_URL", DEFAULT_VITO_LOGO)
-        embed = discord.Embed(
-            title="👋 Welcome to the Server!",
-            description=WELCOME_EMBED_DESCRIPTION,
-            color=0xFFFFFF,
-        )
-        embed.set_footer(text="Welcome to Vito")
-        embed.set_thumbnail(url=logo_url)
+        embed = build_welcome_embed()
         view = get_start_verification_view()
         msg = await get_or_create_welcome_message(
             welcome_channel, embed, view
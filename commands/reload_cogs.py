@@ -4,12 +4,12 @@ from discord.ext import commands
 import logging
 import typing
 import os
+from cogs.guild_config import guild_configs
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
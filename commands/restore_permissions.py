@@ -5,22 +5,153 @@ import os
 import logging
 import json
 import io
+import gzip
 from datetime import datetime
+from cogs.guild_config import guild_configs
+from cogs.permission_ops import overwrites_equal, ProgressReporter
+from cogs.permission_templates import PermissionPlan, PlannedEdit, ACTION_EDIT, ACTION_SET, execute_plan
+from cogs.backup_store import backup_store, KIND_INCREMENTAL
+
+LEGACY_SEARCH_LIMIT = 100
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
     return False
 
+async def import_backup_from_logs(guild: discord.Guild, backup_id: str):
+    """Legacy fallback: find permission_backup_<id>.json(.gz) in recent logs and copy it into the local store.
+
+    Returns (backup_data, None) or (None, error message).
+    """
+    logs_channel_id = guild_configs.get(guild.id).logs_channel_id
+    if not logs_channel_id:
+        return None, f"❌ Backup `{backup_id}` is not in the local store and no logs channel is set to search."
+    logs_channel = guild.get_channel(logs_channel_id)
+    if not isinstance(logs_channel, discord.TextChannel):
+        return None, f"❌ Backup `{backup_id}` is not in the local store and logs channel {logs_channel_id} can't be searched."
+    # Mirrors are gzip'd; backups from before that are plain JSON
+    backup_filenames = (f"permission_backup_{backup_id}.json.gz", f"permission_backup_{backup_id}.json")
+    backup_message = None
+    backup_file = None
+    async for message in logs_channel.history(limit=LEGACY_SEARCH_LIMIT):
+        for attachment in message.attachments:
+            if attachment.filename in backup_filenames:
+                backup_message = message
+                backup_file = attachment
+                break
+        if backup_file:
+            break
+    if not backup_file:
+        return None, f"❌ Backup `{backup_id}` not found. Use /list_backups to see stored backups."
+    try:
+        file_bytes = await backup_file.read()
+        if backup_file.filename.endswith(".gz"):
+            file_bytes = gzip.decompress(file_bytes)
+        backup_data = json.loads(file_bytes.decode('utf-8'))
+    except Exception as e:
+        return None, f"❌ Failed to read or parse the backup file: {e}"
+    # Mirrors of stored blobs carry no timestamp (it lives on the store's row)
+    backup_data.setdefault("backup_timestamp", backup_message.created_at.isoformat())
+    try:
+        backup_store.save(guild.id, backup_data, backup_id=backup_id)
+        backup_store.set_mirror(guild.id, backup_id, backup_message.jump_url)
+    except Exception as e:
+        logging.error(f"Could not import legacy backup {backup_id} into the local store: {e}")
+    return backup_data, None
+
+def _permissions_dict(overwrite):
+    return {perm: value for perm, value in overwrite if value is not None} if overwrite else {}
+
+def plan_restore(guild: discord.Guild, backup_data):
+    """Diff a backup against the live overwrites.
+
+    Returns (plan, changes, missing): a PermissionPlan with one edit per changed
+    channel (categories first), a JSON-friendly list of per-target changes for the
+    dry-run file, and the names of backed-up channels that no longer exist.
+    """
+    channels = backup_data.get("channels", {})
+    plan = PermissionPlan(len(channels))
+    changes = []
+    missing = []
+    for channel_id, channel_info in channels.items():
+        channel = guild.get_channel(int(channel_id))
+        if not channel:
+            missing.append(f"{channel_info.get('name', 'Unknown')} ({channel_id})")
+            continue
+        desired = {}
+        names = {}
+        for target_id, perm_info in channel_info.get("overwrites", {}).items():
+            if perm_info["type"] == "role":
+                target = guild.get_role(int(target_id))
+                if target is None:
+                    continue  # role deleted since the backup
+            else:
+                # No fetch needed: an Object with type=Member is enough for the overwrite payload
+                target = guild.get_member(int(target_id)) or discord.Object(int(target_id), type=discord.Member)
+            desired[target] = discord.PermissionOverwrite(**perm_info["permissions"])
+            names[target.id] = perm_info.get("name")
+        current_by_id = {t.id: (t, o) for t, o in channel.overwrites.items()}
+        desired_by_id = {t.id: (t, o) for t, o in desired.items()}
+        changed = [
+            tid for tid in current_by_id.keys() | desired_by_id.keys()
+            if not overwrites_equal(current_by_id.get(tid, (None, None))[1], desired_by_id.get(tid, (None, None))[1])
+        ]
+        if not changed:
+            plan.unchanged += 1
+            continue
+        edit = PlannedEdit(channel, ACTION_EDIT, desired)
+        if len(changed) == 1:
+            target, _ = desired_by_id.get(changed[0]) or current_by_id[changed[0]]
+            if isinstance(target, (discord.Role, discord.Member)):
+                # One overwrite differs: set (or delete) just that one
+                edit = PlannedEdit(channel, ACTION_SET, desired, target, desired_by_id.get(changed[0], (None, None))[1])
+        if isinstance(channel, discord.CategoryChannel):
+            plan.category_edits.append(edit)
+        else:
+            plan.channel_edits.append(edit)
+        changes.append({
+            "channel_id": channel.id,
+            "channel": channel.name,
+            "action": edit.action,
+            "targets": [
+                {
+                    "id": tid,
+                    "name": names.get(tid) or str(current_by_id.get(tid, (tid,))[0]),
+                    "before": _permissions_dict(current_by_id.get(tid, (None, None))[1]),
+                    "after": _permissions_dict(desired_by_id.get(tid, (None, None))[1]),
+                }
+                for tid in sorted(changed)
+            ],
+        })
+    return plan, changes, missing
+
+def _describe_kind(record) -> str:
+    if record.kind == KIND_INCREMENTAL:
+        return f"snapshot: {record.channel_count} changed since {record.base_id}"
+    return f"full: {record.channel_count} channels"
+
+async def backup_id_autocomplete(interaction: discord.Interaction, current: str):
+    if not interaction.guild:
+        return []
+    return [
+        app_commands.Choice(
+            name=f"{r.backup_id} · {_describe_kind(r)} · {r.created_at.strftime('%Y-%m-%d %H:%M')} UTC"[:100],
+            value=r.backup_id
+        )
+        for r in backup_store.list(interaction.guild.id, prefix=current.strip(), limit=25)
+    ]
+
 @app_commands.command(name="restore_permissions", description="Restore channel permissions from a backup")
 @app_commands.default_permissions(administrator=True)
-@app_commands.describe(backup_id="The backup ID from the logs (format: YYYYMMDD_HHMMSS)")
-async def restore_permissions(interaction: discord.Interaction, backup_id: str):
+@app_commands.describe(backup_id="The backup ID (format: YYYYMMDD_HHMMSS); see /list_backups")
+@app_commands.describe(dry_run="Only list the changes (as a file); change nothing")
+@app_commands.autocomplete(backup_id=backup_id_autocomplete)
+async def restore_permissions(interaction: discord.Interaction, backup_id: str, dry_run: bool = False):
     """Restore channel permissions from a backup"""
     if not is_authorized_guild_or_owner(interaction):
         return await interaction.response.send_message(
@@ -38,79 +169,59 @@ async def restore_permissions(interaction: discord.Interaction, backup_id: str):
             "❌ You need Administrator permissions to use this command!",
             ephemeral=True
         )
-    logs_channel_id = os.getenv('LOGS_CHANNEL_ID')
-    if not logs_channel_id:
-        return await interaction.followup.send(
-            "❌ LOGS_CHANNEL_ID is not set in the environment variables.",
-            ephemeral=True
+    backup_id = backup_id.strip()
+    backup_data = backup_store.load(interaction.guild.id, backup_id)
+    if backup_data is None:
+        # Backups made before the local store existed only live in the logs channel
+        backup_data, error = await import_backup_from_logs(interaction.guild, backup_id)
+        if backup_data is None:
+            return await interaction.followup.send(error, ephemeral=True)
+    # Only channels whose overwrites differ from the backup are touched
+    plan, changes, missing = plan_restore(interaction.guild, backup_data)
+    if dry_run:
+        report = {
+            "backup_id": backup_id,
+            "guild_id": interaction.guild.id,
+            "api_calls": plan.api_calls,
+            "naive_calls": plan.naive_calls,
+            "unchanged_channels": plan.unchanged,
+            "missing_channels": missing,
+            "changes": changes,
+        }
+        report_file = discord.File(
+            fp=io.BytesIO(json.dumps(report, indent=2).encode('utf-8')),
+            filename=f"restore_plan_{backup_id}.json"
         )
-    logs_channel = interaction.guild.get_channel(int(logs_channel_id))
-    if not logs_channel:
-        return await interaction.followup.send(
-            f"❌ Logs channel with ID {logs_channel_id} not found!",
-            ephemeral=True
+        embed = discord.Embed(
+            title="🧪 Permissions Restore - Dry Run",
+            description=f"No changes were made. Restoring `{backup_id}` would need {plan.api_calls} API calls vs. {plan.naive_calls} naive.",
+            color=discord.Color.blue()
         )
-    if not isinstance(logs_channel, discord.TextChannel):
-        return await interaction.followup.send(
-            f"❌ Logs channel must be a text channel to search for backups.",
-            ephemeral=True
-        )
-    # Try to find the backup file in the logs channel
-    backup_filename = f"permission_backup_{backup_id}.json"
-    backup_message = None
-    backup_file = None
-    async for message in logs_channel.history(limit=100):
-        for attachment in message.attachments:
-            if attachment.filename == backup_filename:
-                backup_message = message
-                backup_file = attachment
-                break
-        if backup_file:
-            break
-    if not backup_file:
-        return await interaction.followup.send(
-            f"❌ Could not find backup file `{backup_filename}` in the last 100 messages of the logs channel.",
-            ephemeral=True
-        )
-    # Download and parse the backup file
-    try:
-        file_bytes = await backup_file.read()
-        backup_data = json.loads(file_bytes.decode('utf-8'))
-    except Exception as e:
-        return await interaction.followup.send(
-            f"❌ Failed to read or parse the backup file: {e}",
-            ephemeral=True
+        embed.add_field(name="Channels to change", value=str(plan.api_calls), inline=True)
+        embed.add_field(name="Already matching", value=str(plan.unchanged), inline=True)
+        embed.add_field(name="Missing channels", value=str(len(missing)), inline=True)
+        return await interaction.followup.send(embed=embed, file=report_file, ephemeral=True)
+
+    progress = ProgressReporter(interaction)
+    await progress.update(f"⏳ Restoring `{backup_id}`: {plan.api_calls} channel(s) differ...", force=True)
+
+    async def report_progress(done, failed):
+        await progress.update(
+            f"⏳ Restoring `{backup_id}`... {done}/{plan.api_calls} channels"
+            f"{f' ({failed} failed)' if failed else ''} · {progress.elapsed():.1f}s"
         )
-    # Restore permissions
-    channels_restored = 0
-    errors = 0
-    error_details = []
-    for channel_id, channel_info in backup_data.get("channels", {}).items():
-        channel = interaction.guild.get_channel(int(channel_id))
-        if not channel:
-            error_details.append(f"Channel ID {channel_id} not found.")
-            errors += 1
-            continue
-        overwrites = {}
-        for target_id, perm_info in channel_info.get("overwrites", {}).items():
-            perms = discord.PermissionOverwrite(**perm_info["permissions"])
-            if perm_info["type"] == "role":
-                role = interaction.guild.get_role(int(target_id))
-                if role:
-                    overwrites[role] = perms
-            elif perm_info["type"] == "user":
-                member = interaction.guild.get_member(int(target_id))
-                if member:
-                    overwrites[member] = perms
-        try:
-            await channel.edit(overwrites=overwrites, reason=f"Restoring permissions from backup {backup_id}")
-            channels_restored += 1
-        except Exception as e:
-            error_details.append(f"{channel.name}: {e}")
-            errors += 1
+
+    failures = await execute_plan(plan, f"Restoring permissions from backup {backup_id}", on_progress=report_progress)
+    channels_restored = plan.api_calls - len(failures)
+    error_details = [f"Channel {name} not found." for name in missing]
+    error_details += [f"{getattr(edit.channel, 'name', 'Unknown')}: {e}" for edit, e in failures]
+    errors = len(error_details)
     embed = discord.Embed(
         title="🔄 Permissions Restore Complete",
-        description=f"Restored permissions for {channels_restored} channels.",
+        description=(
+            f"Restored permissions for {channels_restored} channels in {progress.elapsed():.1f}s.\n"
+            f"{plan.unchanged} channel(s) already matched the backup and were skipped."
+        ),
         color=discord.Color.green() if errors == 0 else discord.Color.orange(),
         timestamp=datetime.now()
     )
@@ -128,5 +239,36 @@ async def restore_permissions(interaction: discord.Interaction, backup_id: str):
     embed.set_footer(text=f"Requested by {interaction.user.name}")
     await interaction.followup.send(embed=embed, ephemeral=True)
 
+@app_commands.command(name="list_backups", description="List stored permission backups for this server")
+@app_commands.default_permissions(administrator=True)
+async def list_backups(interaction: discord.Interaction):
+    if not is_authorized_guild_or_owner(interaction):
+        return await interaction.response.send_message(
+            "❌ You are not authorized to use this command.", ephemeral=True
+        )
+    if not interaction.guild:
+        return await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
+    if not isinstance(interaction.user, discord.Member) or not interaction.user.guild_permissions.administrator:
+        return await interaction.response.send_message("❌ You need Administrator permissions to use this command!", ephemeral=True)
+    records = backup_store.list(interaction.guild.id, limit=15)
+    total = backup_store.count(interaction.guild.id)
+    embed = discord.Embed(
+        title="🗄️ Permission Backups",
+        description=f"{total} backup(s) stored. Restore with `/restore_permissions <backup_id>`." if total else "No backups stored yet.",
+        color=discord.Color.blue()
+    )
+    for r in records:
+        by = f"<@{r.created_by}>" if r.created_by else ("schedule" if r.scheduled else "unknown")
+        mirror = f" · [mirror]({r.mirror_url})" if r.mirror_url else ""
+        embed.add_field(
+            name=r.backup_id,
+            value=f"<t:{int(r.created_at.timestamp())}:F> · {_describe_kind(r)} · {r.size / 1024:.1f} KB · by {by}{mirror}",
+            inline=False
+        )
+    if total > len(records):
+        embed.set_footer(text=f"Showing newest {len(records)} of {total}")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot: commands.Bot):
-    bot.tree.add_command(restore_permissions) 
\ No newline at end of file
+    bot.tree.add_command(restore_permissions)
+    bot.tree.add_command(list_backups) 
\ No newline at end of file
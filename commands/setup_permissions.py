@@ -4,15 +4,18 @@ from discord.ext import commands
 import os
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone
-import json
-import io
+from cogs.guild_config import guild_configs
+from cogs.rest_dispatcher import LANE_ADMIN, send_message
+from cogs.permission_ops import ProgressReporter, PERMISSION_EDIT_CONCURRENCY
+from cogs.backup_store import backup_store, snapshot_guild
+from cogs.permission_templates import PermissionTemplate, plan_template, execute_plan
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -20,7 +23,8 @@ def is_authorized_guild_or_owner(interaction):
 
 @app_commands.command(name="setup_permissions", description="⚠️ Dangerous Command Irreversible: Setup channel permissions for verification system")
 @app_commands.default_permissions(administrator=True)
-async def setup_permissions(interaction: discord.Interaction):
+@app_commands.describe(dry_run="Only show the planned changes and API call count; change nothing")
+async def setup_permissions(interaction: discord.Interaction, dry_run: bool = False):
     """Setup channel permissions for verification system with double confirmation and backup"""
     if not is_authorized_guild_or_owner(interaction):
         return await interaction.response.send_message(
@@ -37,6 +41,18 @@ async def setup_permissions(interaction: discord.Interaction):
             "❌ You need Administrator permissions to use this command!",
             ephemeral=True
         )
+    if dry_run:
+        plan = plan_template(interaction.guild, build_verification_template(interaction.guild))
+        dry_run_embed = discord.Embed(
+            title="🧪 Permission Setup - Dry Run",
+            description="No changes were made. This is what `/setup_permissions` would do:",
+            color=discord.Color.blue()
+        )
+        dry_run_embed.add_field(name="📊 Plan", value=plan.summary(), inline=False)
+        preview = [f"• {e.channel.name} ➜ {e.action}" for e in (plan.category_edits + plan.channel_edits)[:20]]
+        if preview:
+            dry_run_embed.add_field(name="📝 First Changes", value="\n".join(preview), inline=False)
+        return await interaction.response.send_message(embed=dry_run_embed, ephemeral=True)
     # First confirmation embed
     first_confirm_embed = discord.Embed(
         title="⚠️ DANGEROUS OPERATION - First Confirmation",
@@ -69,18 +85,17 @@ async def setup_permissions(interaction: discord.Interaction):
                 f"**Total Channels:** {len(getattr(interaction.guild, 'channels', []))}\n"
                 f"**Initiated by:** {interaction.user.mention}\n"
                 f"**Time:** <t:{int(datetime.now(timezone.utc).timestamp())}:F>\n\n"
-                "✅ **I will backup current permissions to logs**\n"
+                "✅ **I will backup current permissions (stored locally and mirrored to logs)**\n"
                 "✅ **I will provide a restore command afterward**\n"
                 "⚠️ **This will affect ALL server channels**\n\n"
-                "**Type 'CONFIRM PERMISSIONS' in the next 30 seconds to proceed**"
+                "**Click below and type 'CONFIRM PERMISSIONS' within 30 seconds to proceed**"
             ),
             color=discord.Color.dark_red()
         )
         second_confirm_embed.set_footer(text="Step 2 of 2 - Type 'CONFIRM PERMISSIONS' to proceed")
         # Preview of channels affected
         try:
-            welcome_channel_id_env = os.getenv('WELCOME_CHANNEL_ID')
-            welcome_channel_id = int(welcome_channel_id_env) if welcome_channel_id_env else None
+            welcome_channel_id = guild_configs.get(interact.guild.id).welcome_channel_id if interact.guild else None
             preview_lines = []
             guild_for_preview = interact.guild
             if guild_for_preview is not None:
@@ -101,29 +116,33 @@ async def setup_permissions(interaction: discord.Interaction):
                         value="\n".join(preview_lines),
                         inline=False
                     )
+            if guild_for_preview is not None:
+                plan = plan_template(guild_for_preview, build_verification_template(guild_for_preview))
+                second_confirm_embed.add_field(name="📊 Plan", value=plan.summary(), inline=False)
         except Exception as e:
             logging.error(f"Error generating permissions preview: {e}")
-        await interact.response.edit_message(embed=second_confirm_embed, view=None)
-        # Wait for the text confirmation from the command initiator
-        def check(msg):
-            return (
-                msg.author.id == interaction.user.id and
-                msg.channel is not None and
-                interaction.channel is not None and
-                msg.channel.id == interaction.channel.id and
-                msg.content.upper() == "CONFIRM PERMISSIONS"
-            )
-        try:
-            confirmation_msg = await interact.client.wait_for('message', check=check, timeout=30.0)
-            await confirmation_msg.delete()
-            await execute_permission_setup(interact, interaction.guild, interaction.user)
-        except asyncio.TimeoutError:
+        # Text confirmation goes through a modal so the bot never needs the
+        # message_content intent (see CLIENT_PROFILE=lean)
+        view2 = discord.ui.View(timeout=30)
+        confirm_btn = discord.ui.Button(label="✍️ Type Confirmation", style=discord.ButtonStyle.danger)
+        async def confirm_callback(confirm_interact: discord.Interaction):
+            if confirm_interact.user.id != interaction.user.id:
+                return await confirm_interact.response.send_message("❌ Only the command user can use this button!", ephemeral=True)
+            await confirm_interact.response.send_modal(ConfirmPermissionsModal(view2, interaction.guild, interaction.user))
+        async def on_confirm_timeout():
             timeout_embed = discord.Embed(
                 title="⏰ Operation Cancelled",
                 description="Permission setup cancelled due to timeout. No changes were made.",
                 color=discord.Color.orange()
             )
-            await interact.edit_original_response(embed=timeout_embed)
+            try:
+                await interact.edit_original_response(embed=timeout_embed, view=None)
+            except discord.HTTPException:
+                pass
+        confirm_btn.callback = confirm_callback # type: ignore
+        view2.on_timeout = on_confirm_timeout # type: ignore
+        view2.add_item(confirm_btn)
+        await interact.response.edit_message(embed=second_confirm_embed, view=view2)
     async def first_cancel_callback(interact: discord.Interaction):
         if interact.user.id != interaction.user.id:
             return await interact.response.send_message("❌ Only the command user can use this button!", ephemeral=True)
@@ -138,56 +157,62 @@ async def setup_permissions(interaction: discord.Interaction):
     view1.add_item(cancel_btn)
     await interaction.response.send_message(embed=first_confirm_embed, view=view1, ephemeral=True)
 
+class ConfirmPermissionsModal(discord.ui.Modal, title="Final Confirmation"):
+    """Second confirmation step: the initiator must type CONFIRM PERMISSIONS."""
+
+    confirmation = discord.ui.TextInput(
+        label="Type CONFIRM PERMISSIONS to proceed",
+        placeholder="CONFIRM PERMISSIONS",
+        required=True,
+        max_length=32
+    )
+
+    def __init__(self, parent_view: discord.ui.View, guild, user):
+        super().__init__(timeout=30)
+        self.parent_view = parent_view
+        self.guild = guild
+        self.user = user
+
+    async def on_submit(self, interaction: discord.Interaction):
+        # The modal has its own timeout: a submit after the confirmation view timed out
+        # (or after another submit) must not run the setup behind an "Operation Cancelled" message
+        if self.parent_view.is_finished():
+            return await interaction.response.send_message(
+                "⏰ This confirmation expired. No changes were made. Run /setup_permissions again.",
+                ephemeral=True
+            )
+        self.parent_view.stop()
+        if self.confirmation.value.strip().upper() != "CONFIRM PERMISSIONS":
+            return await interaction.response.edit_message(
+                content="❌ Confirmation text did not match. No changes were made.",
+                embed=None,
+                view=None
+            )
+        await interaction.response.edit_message(content="⏳ Starting permission setup...", embed=None, view=None)
+        await execute_permission_setup(interaction, self.guild, self.user)
+
 def backup_current_permissions(guild):
-    backup_data = {
-        "guild_id": getattr(guild, 'id', None),
-        "guild_name": getattr(guild, 'name', 'Unknown'),
-        "backup_timestamp": datetime.now(timezone.utc).isoformat(),
-        "channels": {}
-    }
-    for channel in guild.channels:
-        channel_perms = {}
-        for target, overwrite in channel.overwrites.items():
-            if isinstance(target, discord.Role):
-                target_type = "role"
-                target_id = getattr(target, 'id', None)
-                target_name = getattr(target, 'name', 'Unknown')
-            else:  # User
-                target_type = "user"
-                target_id = getattr(target, 'id', None)
-                target_name = str(target)
-            perms_dict = {}
-            for perm, value in overwrite:
-                if value is not None:
-                    perms_dict[perm] = value
-            channel_perms[str(target_id)] = {
-                "type": target_type,
-                "name": target_name,
-                "permissions": perms_dict
-            }
-        backup_data["channels"][str(getattr(channel, 'id', None))] = {
-            "name": getattr(channel, 'name', 'Unknown'),
-            "type": str(getattr(channel, 'type', 'Unknown')),
-            "overwrites": channel_perms
-        }
-    return backup_data
+    return snapshot_guild(guild)
 
-def store_backup_in_logs(guild, backup_data, timestamp, user):
-    logs_channel_id = os.getenv('LOGS_CHANNEL_ID')
+def store_backup_in_logs(guild, backup_record, timestamp, user):
+    logs_channel_id = guild_configs.get(guild.id).logs_channel_id
     if not logs_channel_id:
         logging.warning("No logs channel configured for permission backup")
         return None
-    logs_channel = guild.get_channel(int(logs_channel_id))
+    logs_channel = guild.get_channel(logs_channel_id)
     if not logs_channel:
         logging.warning(f"Logs channel {logs_channel_id} not found")
         return None
     try:
+        # The mirror is the blob the local store already encoded; nothing is serialized twice
+        backup_id = backup_record.backup_id
+        blob = backup_store.open_blob(guild.id, backup_id)
         backup_embed = discord.Embed(
             title="🔒 Permission Backup Created",
             description=(
-                f"**Backup ID:** `{timestamp.strftime('%Y%m%d_%H%M%S')}`\n"
+                f"**Backup ID:** `{backup_id}`\n"
                 f"**Created by:** {user.mention}\n"
-                f"**Channels backed up:** {len(backup_data['channels'])}\n"
+                f"**Channels backed up:** {backup_record.channel_count}\n"
                 f"**Created:** <t:{int(timestamp.timestamp())}:F>"
             ),
             color=discord.Color.blue(),
@@ -198,20 +223,20 @@ def store_backup_in_logs(guild, backup_data, timestamp, user):
             value=(
                 f"• Guild: {getattr(guild, 'name', 'Unknown')}\n"
                 f"• Total Channels: {len(getattr(guild, 'channels', []))}\n"
-                f"• Backup Size: {len(json.dumps(backup_data))} characters"
+                f"• Backup Size: {backup_record.size / 1024:.1f} KB ({len(blob.getbuffer()) / 1024:.1f} KB gzip)\n"
+                f"• SHA-256: `{backup_record.sha256[:16]}`"
             ),
             inline=False
         )
         backup_embed.add_field(
             name="🔄 Restore Instructions",
-            value="Use `/restore_permissions` command with this backup ID to restore permissions",
+            value="Use `/restore_permissions` command with this backup ID to restore permissions (this file is a mirror of the bot's local backup store)",
             inline=False
         )
         backup_embed.set_footer(text="Permission Backup System")
-        backup_json = json.dumps(backup_data, indent=2)
         backup_file = discord.File(
-            fp=io.BytesIO(backup_json.encode('utf-8')),
-            filename=f"permission_backup_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+            fp=blob,
+            filename=f"permission_backup_{backup_id}.json.gz"
         )
         # Must be awaited in the caller
         return backup_embed, backup_file
@@ -219,35 +244,58 @@ def store_backup_in_logs(guild, backup_data, timestamp, user):
         logging.error(f"Failed to store permission backup: {e}")
         return None, None
 
+def build_verification_template(guild):
+    """Every channel hidden from @everyone; the welcome channel visible but read-only."""
+    everyone_role = guild.default_role
+    welcome_channel_id = guild_configs.get(guild.id).welcome_channel_id
+    overrides = {}
+    if welcome_channel_id:
+        overrides[welcome_channel_id] = {everyone_role: discord.PermissionOverwrite(view_channel=True, send_messages=False)}
+    return PermissionTemplate({everyone_role: discord.PermissionOverwrite(view_channel=False)}, overrides)
+
 async def execute_permission_setup(interaction, guild, user):
+    progress = ProgressReporter(interaction)
     await interaction.edit_original_response(
         content="⏳ **Step 1/3:** Backing up current permissions...",
         embed=None,
         view=None
     )
     backup_data = backup_current_permissions(guild)
-    backup_timestamp = datetime.now(timezone.utc)
-    result = store_backup_in_logs(guild, backup_data, backup_timestamp, user)
+    backup_timestamp = datetime.fromisoformat(backup_data["backup_timestamp"])
+    # Local store is the source of truth for /restore_permissions; the logs upload is a mirror
+    try:
+        # The store picks the ID, so a scheduled snapshot in the same second can't collide
+        backup_record = backup_store.save(guild.id, backup_data, created_by=user.id)
+    except Exception as e:
+        logging.error(f"Failed to store permission backup locally: {e}")
+        backup_record = None
+    if backup_record is None:
+        return await interaction.edit_original_response(
+            content="❌ Could not store the permission backup. No changes were made."
+        )
+    backup_id = backup_record.backup_id
+    result = store_backup_in_logs(guild, backup_record, backup_timestamp, user)
     if result is not None:
         backup_embed, backup_file = result
     else:
         backup_embed, backup_file = None, None
     backup_message = None
+    config = guild_configs.get(guild.id)
     if backup_embed is not None and backup_file is not None:
-        logs_channel_id = os.getenv('LOGS_CHANNEL_ID')
-        if logs_channel_id is not None:
-            try:
-                logs_channel = guild.get_channel(int(logs_channel_id))
-            except (TypeError, ValueError):
-                logs_channel = None
-        else:
-            logs_channel = None
+        logs_channel = config.logs_channel(guild)
         if logs_channel:
-            backup_message = await logs_channel.send(embed=backup_embed, file=backup_file)
-            logging.info(f"Permission backup stored in logs: {backup_message.jump_url}")
+            # The backup is already stored; a failed mirror must not stop the setup
+            try:
+                backup_message = await send_message(logs_channel, lane=LANE_ADMIN, embed=backup_embed, file=backup_file)
+                logging.info(f"Permission backup mirrored to logs: {backup_message.jump_url}")
+                backup_store.set_mirror(guild.id, backup_id, backup_message.jump_url)
+            except Exception as e:  # discord.HTTPException (403, 50035) or a dispatcher error
+                logging.error(f"Failed to mirror permission backup {backup_id} to logs: {e}")
+                backup_message = None
+    backup_seconds = progress.elapsed()
     await interaction.edit_original_response(content="⏳ **Step 2/3:** Applying new permissions...")
-    welcome_channel_id = int(os.getenv('WELCOME_CHANNEL_ID', 0))
-    welcome_channel = guild.get_channel(welcome_channel_id) if welcome_channel_id else None
+    welcome_channel_id = config.welcome_channel_id
+    welcome_channel = config.welcome_channel(guild)
     if not welcome_channel:
         logging.error(f"Welcome channel with ID {welcome_channel_id} not found")
         return
@@ -255,23 +303,25 @@ async def execute_permission_setup(interaction, guild, user):
     if not everyone_role:
         logging.error("Default role not found")
         return
-    channels_updated = 0
-    errors = 0
-    error_details = []
-    for channel in guild.channels:
-        try:
-            overwrites = channel.overwrites
-            new_overwrites = overwrites.copy()
-            # Hide all channels from @everyone
-            new_overwrites[everyone_role] = discord.PermissionOverwrite(view_channel=False)
-            # Welcome channel: visible but read-only
-            if channel.id == welcome_channel_id:
-                new_overwrites[everyone_role] = discord.PermissionOverwrite(view_channel=True, send_messages=False)
-            await channel.edit(overwrites=new_overwrites, reason="Setup verification system permissions")
-            channels_updated += 1
-        except Exception as e:
-            errors += 1
-            error_details.append(f"{getattr(channel, 'name', 'Unknown')}: {e}")
+
+    # Categories first, synced children re-synced, other channels only if they differ
+    plan = plan_template(guild, build_verification_template(guild))
+
+    async def report(done, failed):
+        await progress.update(
+            f"⏳ **Step 2/3:** Applying new permissions... {done}/{plan.api_calls} edits"
+            f"{f' ({failed} failed)' if failed else ''} · {progress.elapsed():.1f}s"
+        )
+
+    apply_start = time.perf_counter()
+    failures = await execute_plan(plan, "Setup verification system permissions", on_progress=report)
+    apply_seconds = time.perf_counter() - apply_start
+    errors = len(failures)
+    channels_updated = plan.api_calls - errors
+    for edit, e in failures:
+        logging.error(f"Failed to update permissions for {getattr(edit.channel, 'name', 'Unknown')}: {e}")
+    await progress.update("⏳ **Step 3/3:** Finishing up...", force=True)
+
     completion_embed = discord.Embed(
         title="✅ Permission Setup Complete",
         description="All channel permissions have been updated for the verification system.",
@@ -282,16 +332,27 @@ async def execute_permission_setup(interaction, guild, user):
         value=(
             f"• Welcome Channel: <#{welcome_channel_id}> - Visible, no sending\n"
             f"• Other Channels: Hidden from @everyone\n"
-            f"• Total Channels Modified: {channels_updated}"
+            f"• Total Channels Modified: {channels_updated}\n"
+            f"• Already Correct (skipped): {plan.unchanged}"
+        ),
+        inline=False
+    )
+    completion_embed.add_field(
+        name="⏱️ Timing",
+        value=(
+            f"• Backup: {backup_seconds:.2f}s\n"
+            f"• Plan: {plan.plan_ms:.1f}ms ({plan.api_calls} API calls vs. {plan.naive_calls} naive)\n"
+            f"• Apply: {apply_seconds:.2f}s ({PERMISSION_EDIT_CONCURRENCY} workers)\n"
+            f"• Total: {progress.elapsed():.2f}s"
         ),
         inline=False
     )
     completion_embed.add_field(
         name="🔄 Restore Information",
         value=(
-            f"• Backup stored in logs: {backup_message.jump_url if backup_message else 'Failed to store'}\n"
-            f"• Use `/restore_permissions` to revert changes\n"
-            f"• Backup ID: `{backup_timestamp.strftime('%Y%m%d_%H%M%S')}`"
+            f"• Backup ID: `{backup_id}` (stored locally, {backup_record.channel_count} channels)\n"
+            f"• Mirror in logs: {backup_message.jump_url if backup_message else 'Not mirrored'}\n"
+            f"• Use `/restore_permissions` to revert changes, `/list_backups` to see all backups"
         ),
         inline=False
     )
@@ -3,16 +3,16 @@ from discord import app_commands
 from discord.ext import commands
 import typing
 from datetime import datetime, timezone
-from cogs.member_management import MemberManagement
-from cogs.calendly import check_email_booked
+if typing.TYPE_CHECKING:
+    from cogs.member_management import MemberManagement
 import os
 import random
+from cogs.guild_config import guild_configs
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -56,7 +56,7 @@ async def test_member_join(interaction: discord.Interaction, user: discord.Membe
     if not member_cog:
         return await interaction.followup.send("❌ MemberManagement cog not loaded!", ephemeral=True)
     
-    mm_cog = typing.cast(MemberManagement, member_cog)
+    mm_cog = typing.cast("MemberManagement", member_cog)
     
     # Generate test email if not provided
     if not email:
@@ -4,12 +4,13 @@ from discord.ext import commands
 from typing import Optional
 import discord.abc
 import os
+from cogs.guild_config import guild_configs
+from cogs.user_cache import user_cache
 
 OWNER_USER_IDS = {890323443252351046, 879714530769391686}
-GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 def is_authorized_guild_or_owner(interaction):
-    if interaction.guild and interaction.guild.id == GUILD_ID:
+    if interaction.guild and guild_configs.is_managed(interaction.guild.id):
         return True
     if interaction.user.id in OWNER_USER_IDS:
         return True
@@ -30,34 +31,9 @@ BADGE_EMOJIS = {
 }
 
 
-@app_commands.command(name="userinfo", description="Show detailed info about a user")
-@app_commands.describe(user="The user to show info for (leave blank for yourself)")
-async def userinfo(
-    interaction: discord.Interaction, user: Optional[discord.Member] = None
-):
-    if not is_authorized_guild_or_owner(interaction):
-        return await interaction.response.send_message(
-            "❌ You are not authorized to use this command.", ephemeral=True
-        )
-    guild = interaction.guild
-    if user is None:
-        user = (
-            interaction.user if isinstance(interaction.user, discord.Member) else None
-        )
-    if user is None or not isinstance(user, discord.Member):
-        await interaction.response.send_message(
-            "❌ Could not find member in this server.", ephemeral=True
-        )
-        return
-    member = user
-    # Always fetch the global user object for badges
-    user_obj = await interaction.client.fetch_user(member.id)
+def build_userinfo_embed(member: discord.Member, user_obj: discord.User) -> discord.Embed:
+    """Render /userinfo for a member; user_obj is the fetched user (for public_flags)."""
     display_user = member
-    if display_user is None:
-        await interaction.response.send_message(
-            "❌ Could not find user.", ephemeral=True
-        )
-        return
     embed = discord.Embed(
         title=f"User Information - {display_user}",
         color=(
@@ -163,6 +139,36 @@ async def userinfo(
                 )
         else:
             embed.add_field(name="Roles", value="None", inline=False)
+    return embed
+
+
+@app_commands.command(name="userinfo", description="Show detailed info about a user")
+@app_commands.describe(user="The user to show info for (leave blank for yourself)")
+async def userinfo(
+    interaction: discord.Interaction, user: Optional[discord.Member] = None
+):
+    if not is_authorized_guild_or_owner(interaction):
+        return await interaction.response.send_message(
+            "❌ You are not authorized to use this command.", ephemeral=True
+        )
+    guild = interaction.guild
+    if user is None:
+        user = (
+            interaction.user if isinstance(interaction.user, discord.Member) else None
+        )
+    if user is None or not isinstance(user, discord.Member):
+        await interaction.response.send_message(
+            "❌ Could not find member in this server.", ephemeral=True
+        )
+        return
+    member = user
+    # Rendered embeds and fetched profiles (for badges) are cached; see cogs/user_cache.py
+    cache_key = (guild.id if guild else 0, member.id)
+    embed = user_cache.embeds.get(cache_key)
+    if embed is None:
+        user_obj = await user_cache.fetch_user(interaction.client, member.id)
+        embed = build_userinfo_embed(member, user_obj)
+        user_cache.embeds.put(cache_key, embed)
     # Ephemeral for non-admins, public for admins
     is_admin = False
     if isinstance(interaction.user, discord.Member):
@@ -172,3 +178,8 @@ async def userinfo(
 
 async def setup(bot: commands.Bot):
     bot.tree.add_command(userinfo)
+    for event in ("on_user_update", "on_member_update", "on_member_remove", "on_raw_member_remove",
+                  "on_guild_role_update", "on_guild_role_delete"):
+        # Reloading the commands package calls setup again; don't stack a second set
+        bot.remove_listener(getattr(user_cache, event), event)
+        bot.add_listener(getattr(user_cache, event), event)
@@ -83,19 +83,28 @@ def setup_logging():
 
 setup_logging()
 
-# Set up intents
-intents = discord.Intents.default()
-intents.members = True
-intents.message_content = True
-intents.guilds = True
-intents.guild_messages = True
+# Set up intents and caches (CLIENT_PROFILE=lean for very large guilds)
+from cogs.client_profile import apply_api_base_override, build_client_options, get_client_profile
+apply_api_base_override()
+client_profile = get_client_profile()
+client_options = build_client_options(client_profile)
 
-class AIdapticsWhopGatekeeper(commands.Bot):
+# Optional sharding (SHARDING=auto / SHARD_COUNT / SHARD_IDS)
+from cogs.sharding import sharding_enabled, get_shard_options, format_shard_latencies
+shard_options = get_shard_options()
+BotBase = commands.AutoShardedBot if sharding_enabled() else commands.Bot
+
+class AIdapticsWhopGatekeeper(BotBase):
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents)
+        super().__init__(command_prefix='!', **client_options, **shard_options)
         self.startup_time = datetime.now(timezone.utc)
+        self.client_profile = client_profile
         
     async def setup_hook(self):
+        # Lets DMs go to stored channel IDs without reopening the channel
+        from cogs.dm_channels import dm_channels
+        dm_channels.bind(self)
+        
         print("🔧 Loading cogs...", end=" ")
         try:
             await self.load_extension('cogs')
@@ -129,6 +138,9 @@ class AIdapticsWhopGatekeeper(commands.Bot):
         print(f"\n🤖 {self.user} is now online!")
         print(f"📊 Connected to {len(self.guilds)} guild(s)")
         print(f"👥 Serving {sum(guild.member_count or 0 for guild in self.guilds)} members")
+        print(f"🧠 Client profile: {self.client_profile}")
+        if sharding_enabled():
+            print(f"🧩 Shards: {self.shard_ids or 'all'} of {self.shard_count}")
         
         # Set custom status
         try:
@@ -238,6 +250,10 @@ async def debug(interaction):
     
     embed.add_field(name="Cogs Status", value="\n".join(cogs_status), inline=False)
     
+    # Per-extension import/setup cost (from the extensions.json loader)
+    from cogs.extension_loader import format_timings
+    embed.add_field(name="Extension Load Times", value=format_timings(), inline=False)
+    
     # Check commands
     commands = [cmd.name for cmd in bot.tree.get_commands()]
     embed.add_field(
@@ -246,24 +262,51 @@ async def debug(interaction):
         inline=False
     )
     
-    # Check environment variables (safely)
-    env_vars = []
-    required_vars = ['GUILD_ID', 'WELCOME_CHANNEL_ID', 'LAUNCHPAD_ROLE_ID', 'MEMBER_ROLE_ID', 'LOGS_CHANNEL_ID']
-    for var in required_vars:
-        value = os.getenv(var)
+    # Check this guild's configuration (per-guild settings, falling back to env vars)
+    from cogs.guild_config import guild_configs
+    config = guild_configs.get(interaction.guild.id)
+    config_lines = [f"Managed guild: {'✅ Yes' if guild_configs.is_managed(interaction.guild.id) else '❌ No'}"]
+    for key, value in config.as_dict().items():
         status = "✅ Set" if value else "❌ Missing"
-        env_vars.append(f"{var}: {status}")
+        config_lines.append(f"{key}: {status}")
+    config_lines.append(f"Managed guilds in this process: {len(guild_configs.managed_guild_ids())}")
     
-    embed.add_field(name="Environment Variables", value="\n".join(env_vars), inline=False)
+    embed.add_field(name="Guild Configuration", value="\n".join(config_lines), inline=False)
     
     # Bot stats
     uptime = datetime.now(timezone.utc) - bot.startup_time
     embed.add_field(
         name="Bot Stats", 
-        value=f"Uptime: {str(uptime).split('.')[0]}\nLatency: {round(bot.latency * 1000)}ms", 
+        value=(
+            f"Uptime: {str(uptime).split('.')[0]}\nLatency: {round(bot.latency * 1000)}ms\n"
+            f"Client profile: {bot.client_profile}\nCached members: {sum(len(g.members) for g in bot.guilds)}"
+        ), 
         inline=False
     )
     
+    embed.add_field(name="Shards", value=format_shard_latencies(bot), inline=False)
+    
+    # REST dispatcher lanes (grant > dm > admin > log)
+    from cogs.rest_dispatcher import rest_dispatcher
+    embed.add_field(name="REST Queue", value="\n".join(rest_dispatcher.metrics_lines()), inline=False)
+    
+    from cogs.dm_outbox import dm_outbox
+    embed.add_field(name="DM Outbox", value="\n".join(dm_outbox.metrics_lines()), inline=False)
+    
+    # Supervised background jobs (one task per name, even across reconnects)
+    from cogs.task_supervisor import task_supervisor
+    embed.add_field(name="Background Jobs", value=task_supervisor.status_summary(), inline=False)
+    
+    # /userinfo profile and embed caches
+    from cogs.user_cache import user_cache
+    from cogs.dm_channels import dm_channels
+    from cogs.bypass_manager import bypass_manager
+    embed.add_field(
+        name="Caches",
+        value="\n".join(user_cache.metrics_lines() + [dm_channels.metrics_line(), bypass_manager.metrics_line()]),
+        inline=False,
+    )
+    
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
 if __name__ == "__main__":
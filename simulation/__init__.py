@@ -0,0 +1,13 @@
+"""
+Offline load simulation for the join, Start Verification and 1-hour grant flows.
+
+Runs the real cogs against a synthetic guild and a recording REST layer; no token
+or network needed. See benchmarks/join_simulation.py for the command-line runner.
+rest_server.FakeDiscordAPI serves the same guild over HTTP on localhost with
+Discord-style rate limits (benchmarks/rest_throttling.py).
+"""
+from .fakes import SimulatedGuild, FakeInteraction
+from .rest import RecordingHTTP
+from .rest_server import FakeDiscordAPI
+from .harness import Simulation, SimulationReport, PhaseReport, LoopLagMonitor, isolate_state
+
@@ -0,0 +1,207 @@
+"""
+Synthetic guild, members and interactions for offline simulation.
+
+Guilds, roles, text channels and members are real discord.py objects built from
+gateway-shaped payloads (the same way benchmarks/client_memory.py does), so the
+cogs' isinstance checks, role lookups and member caches behave as in production.
+Only the Interaction is a stand-in: it carries the attributes the button
+callbacks use and sends its responses through the recording REST layer.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import discord
+
+GUILD_ID = 100000000000000001
+BOT_USER_ID = 100000000000000002
+UNVERIFIED_ROLE_ID = 100000000000000011
+MEMBER_ROLE_ID = 100000000000000012
+PAID_ROLE_ID = 100000000000000013
+WELCOME_CHANNEL_ID = 100000000000000021
+LOGS_CHANNEL_ID = 100000000000000022
+FIRST_USER_ID = 200000000000000000
+FIRST_EXTRA_CHANNEL_ID = 100000000000100000
+
+
+def user_payload(user_id: int, bot: bool = False) -> Dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": f"sim{user_id % 1000000}",
+        "discriminator": "0",
+        "global_name": f"Sim {user_id % 1000000}",
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id: int, role_ids: Iterable[int] = (), joined_at: Optional[datetime] = None) -> Dict[str, Any]:
+    return {
+        "user": user_payload(user_id),
+        "roles": [str(r) for r in role_ids],
+        "joined_at": (joined_at or datetime.now(timezone.utc)).isoformat(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def _role_payload(role_id: int, name: str, position: int) -> Dict[str, Any]:
+    return {
+        "id": str(role_id), "name": name, "permissions": "0", "position": position,
+        "color": 0, "hoist": False, "managed": False, "mentionable": False,
+    }
+
+
+def _text_channel_payload(channel_id: int, name: str, position: int, parent_id: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "id": str(channel_id), "type": 0, "name": name, "position": position,
+        "parent_id": str(parent_id) if parent_id else None, "permission_overwrites": [],
+    }
+
+
+def guild_payload(guild_id: int = GUILD_ID) -> Dict[str, Any]:
+    return {
+        "id": str(guild_id),
+        "name": "Simulation Guild",
+        "member_count": 1,
+        "large": False,
+        "unavailable": False,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "roles": [
+            _role_payload(guild_id, "@everyone", 0),
+            _role_payload(UNVERIFIED_ROLE_ID, "Unverified", 1),
+            _role_payload(MEMBER_ROLE_ID, "Member", 2),
+            _role_payload(PAID_ROLE_ID, "Paid", 3),
+        ],
+        "channels": [
+            _text_channel_payload(WELCOME_CHANNEL_ID, "welcome", 0),
+            _text_channel_payload(LOGS_CHANNEL_ID, "logs", 1),
+        ],
+        "members": [member_payload(BOT_USER_ID) | {"user": user_payload(BOT_USER_ID, bot=True)}],
+    }
+
+
+class SimulatedGuild:
+    """A guild in the client's cache plus the member records the REST layer serves."""
+
+    def __init__(self, state: Any, guild_id: int = GUILD_ID):
+        self.state = state
+        self.guild: discord.Guild = state._add_guild_from_data(guild_payload(guild_id))
+        # user_id -> member payload (what GET /guilds/{id}/members/{id} returns)
+        self.members: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def id(self) -> int:
+        return self.guild.id
+
+    def join(self, user_id: int, role_ids: Iterable[int] = ()) -> discord.Member:
+        """Add a member to the cache the way GUILD_MEMBER_ADD does and return it."""
+        data = member_payload(user_id, role_ids)
+        self.members[user_id] = data
+        member = discord.Member(data=data, guild=self.guild, state=self.state)
+        self.guild._add_member(member)
+        self.guild._member_count = (self.guild._member_count or 0) + 1
+        return member
+
+    def leave(self, user_id: int) -> Optional[discord.Member]:
+        self.members.pop(user_id, None)
+        member = self.guild.get_member(user_id)
+        if member is not None:
+            self.guild._remove_member(member)
+            self.guild._member_count = max(0, (self.guild._member_count or 1) - 1)
+        return member
+
+    def add_channels(self, count: int, per_category: int = 10) -> List[discord.abc.GuildChannel]:
+        """Add `count` text channels to the cache, grouped under categories of
+        `per_category` (children synced with their category). Returns the new channels."""
+        ids = iter(range(FIRST_EXTRA_CHANNEL_ID + len(self.guild.channels), FIRST_EXTRA_CHANNEL_ID + 10 ** 6))
+        added: List[discord.abc.GuildChannel] = []
+        category = None
+        for i in range(count):
+            if per_category and i % per_category == 0:
+                category_id = next(ids)
+                category = discord.CategoryChannel(
+                    state=self.state, guild=self.guild,
+                    data={"id": str(category_id), "type": 4, "name": f"category-{i // per_category}", "position": i, "permission_overwrites": []},
+                )
+                self.guild._add_channel(category)
+                added.append(category)
+            channel_id = next(ids)
+            channel = discord.TextChannel(
+                state=self.state, guild=self.guild,
+                data=_text_channel_payload(channel_id, f"channel-{i}", i, category.id if category else None),
+            )
+            self.guild._add_channel(channel)
+            added.append(channel)
+        return added
+
+    def set_role(self, user_id: int, role_id: int, present: bool) -> None:
+        """Apply a role change to the stored record and the cached member (the gateway's
+        GUILD_MEMBER_UPDATE, delivered immediately)."""
+        data = self.members.get(user_id)
+        if data is not None:
+            roles = [r for r in data["roles"] if r != str(role_id)]
+            if present:
+                roles.append(str(role_id))
+            data["roles"] = roles
+        member = self.guild.get_member(user_id)
+        if member is not None:
+            if present and not member._roles.has(role_id):
+                member._roles.add(role_id)
+            elif not present and member._roles.has(role_id):
+                member._roles.remove(role_id)
+
+
+class FakeInteractionResponse:
+    def __init__(self, parent: "FakeInteraction"):
+        self._parent = parent
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content: Optional[str] = None, *, ephemeral: bool = False, **kwargs: Any) -> None:
+        if self._done:
+            raise discord.InteractionResponded(self._parent)  # type: ignore[arg-type]
+        self._done = True
+        await self._parent.http.record("POST", "/interactions/{interaction_id}/{token}/callback")
+        self._parent.messages.append(content or "")
+
+    async def defer(self, *, ephemeral: bool = False, thinking: bool = False) -> None:
+        if self._done:
+            raise discord.InteractionResponded(self._parent)  # type: ignore[arg-type]
+        self._done = True
+        await self._parent.http.record("POST", "/interactions/{interaction_id}/{token}/callback")
+
+
+class FakeFollowup:
+    def __init__(self, parent: "FakeInteraction"):
+        self._parent = parent
+
+    async def send(self, content: Optional[str] = None, *, ephemeral: bool = False, **kwargs: Any) -> None:
+        await self._parent.http.record("POST", "/webhooks/{application_id}/{token}")
+        self._parent.messages.append(content or "")
+
+
+class FakeInteraction:
+    """The parts of discord.Interaction that component callbacks and the permission
+    setup's progress messages use."""
+
+    def __init__(self, http: Any, user: discord.Member, interaction_id: int):
+        self.http = http
+        self.id = interaction_id
+        self.token = f"sim-{interaction_id}"
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.channel = user.guild.get_channel(WELCOME_CHANNEL_ID)
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages: List[str] = []  # everything the user was shown, in order
+
+    async def edit_original_response(self, *, content: Optional[str] = None, **kwargs: Any) -> None:
+        await self.http.record("PATCH", "/webhooks/{application_id}/{token}/messages/@original")
+        if content:
+            self.messages.append(content)
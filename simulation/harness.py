@@ -0,0 +1,402 @@
+"""
+Drive synthetic join, Start Verification and 1-hour grant traffic through the real
+MemberManagement and Welcome cogs, offline.
+
+    workdir = isolate_state()            # before anything imports cogs.*
+    report = await Simulation(members=500).run()
+
+The cogs keep their state in JSON files in the working directory, and several
+global instances (grant queue, DM channel map, ...) read them at import time.
+isolate_state() switches to a scratch directory and points the env settings at
+the simulated guild, so a run never touches the bot's real files.
+
+Phases:
+- joins:  members join (optionally paced) and on_member_join runs for each, as
+          discord.py would dispatch it; some arrive with the member role already
+          added (Whop), some with a paid role.
+- strip checks: the re-strip checks started on join (5s, 10s and 15s apart) run out.
+- clicks: a share of members press Start Verification.
+- grants: virtual time (cogs/clock.py) is fast-forwarded past the hour, running
+          the per-minute passes (1-hour access, ticket auto-close) on the way.
+
+By default the REST side is RecordingHTTP, installed in place of discord.py's
+HTTPClient. Pass `api=FakeDiscordAPI(...)` to log in with the real HTTPClient
+against the local fake API server instead (rate limit buckets, 429s).
+
+Each phase ends when the cogs' queues (join surge, DM outbox, REST dispatcher)
+are drained. The report has per-phase throughput, REST calls per member, event
+loop lag, and the process's RSS growth.
+"""
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+
+from .fakes import (
+    BOT_USER_ID, FIRST_USER_ID, GUILD_ID, LOGS_CHANNEL_ID, MEMBER_ROLE_ID, PAID_ROLE_ID,
+    UNVERIFIED_ROLE_ID, WELCOME_CHANNEL_ID, FakeInteraction, SimulatedGuild, user_payload,
+)
+from .rest import INTERACTION_ROUTE_PREFIXES, RecordingHTTP
+
+if TYPE_CHECKING:
+    from .rest_server import FakeDiscordAPI
+
+LAG_SAMPLE_SECONDS = 0.01
+# The supervised 1-hour access and ticket auto-close passes run every minute
+TICK_SECONDS = 60
+SIM_TOKEN = "sim-token"
+
+
+def isolate_state(workdir: Optional[str] = None, defaults: Optional[Dict[str, str]] = None) -> str:
+    """Switch to a scratch directory and configure the env for the simulated guild.
+
+    `defaults` are applied only where the env does not already set them. Returns
+    the working directory.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="vito-sim-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ.update({
+        "GUILD_ID": str(GUILD_ID),
+        "UNVERIFIED_ROLE_ID": str(UNVERIFIED_ROLE_ID),
+        "MEMBER_ROLE_ID": str(MEMBER_ROLE_ID),
+        "PAID_ROLE_IDS": str(PAID_ROLE_ID),
+        "WELCOME_CHANNEL_ID": str(WELCOME_CHANNEL_ID),
+        "LOGS_CHANNEL_ID": str(LOGS_CHANNEL_ID),
+    })
+    for name in ("SHARDING", "SHARD_COUNT", "SHARD_IDS"):
+        os.environ.pop(name, None)
+    for name, value in (defaults or {}).items():
+        os.environ.setdefault(name, value)
+    return workdir
+
+
+def _rss_bytes() -> int:
+    """Current RSS from /proc (Linux); peak RSS from getrusage elsewhere."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopLagMonitor:
+    """Measures how late a short sleep wakes up, i.e. how long the loop was blocked."""
+
+    def __init__(self, interval: float = LAG_SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="simulation:loop_lag")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def take(self) -> List[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+
+class PhaseReport:
+    __slots__ = ("name", "count", "elapsed", "rest_calls", "interaction_calls", "routes", "lag_max_ms", "lag_p99_ms")
+
+    def __init__(self, name: str, count: int, elapsed: float, routes: Counter, lag: List[float]):
+        self.name = name
+        self.count = count
+        self.elapsed = elapsed
+        self.routes = routes
+        self.rest_calls = sum(n for r, n in routes.items() if not r.startswith(INTERACTION_ROUTE_PREFIXES))
+        self.interaction_calls = sum(routes.values()) - self.rest_calls
+        lag = sorted(lag)
+        self.lag_max_ms = lag[-1] * 1000 if lag else 0.0
+        self.lag_p99_ms = lag[min(len(lag) - 1, int(len(lag) * 0.99))] * 1000 if lag else 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def rest_per_member(self) -> float:
+        return self.rest_calls / self.count if self.count else 0.0
+
+
+class SimulationReport:
+    def __init__(self, members: int):
+        self.members = members
+        self.phases: List[PhaseReport] = []
+        self.outcomes: Dict[str, int] = {}
+        self.errors: Counter = Counter()
+        self.routes: Counter = Counter()
+        self.rss_delta_mb = 0.0
+
+    @property
+    def rest_per_member(self) -> float:
+        return sum(p.rest_calls for p in self.phases) / self.members if self.members else 0.0
+
+
+class Simulation:
+    def __init__(
+        self,
+        members: int = 200,
+        *,
+        latency: float = 0.05,
+        join_rate: float = 0.0,
+        click_ratio: float = 1.0,
+        whop_ratio: float = 0.2,
+        paid_ratio: float = 0.05,
+        closed_dm_ratio: float = 0.05,
+        ticket_ratio: float = 0.0,
+        strip_checks: bool = True,
+        seed: Optional[int] = None,
+        api: Optional["FakeDiscordAPI"] = None,
+    ):
+        self.members = members
+        self.join_rate = join_rate
+        self.click_ratio = click_ratio
+        self.whop_ratio = whop_ratio
+        self.paid_ratio = paid_ratio
+        self.closed_dm_ratio = closed_dm_ratio
+        self.ticket_ratio = ticket_ratio
+        self.strip_checks = strip_checks
+        self.random = random.Random(seed)
+        # What answers REST requests: counts calls by route either way
+        self.api = api
+        self.http: Any = api if api is not None else RecordingHTTP(latency=latency, seed=seed)
+        self._route_base: Optional[str] = None
+        self.lag = LoopLagMonitor()
+        self.bot: Optional[commands.Bot] = None
+        self.sim_guild: Optional[SimulatedGuild] = None
+        self.member_cog: Any = None
+        self.welcome_cog: Any = None
+        self._interaction_ids = iter(range(400000000000000000, 500000000000000000))
+
+    async def setup(self) -> None:
+        # Imported here so isolate_state() runs first
+        from cogs import member_management, welcome
+        from cogs.client_profile import apply_api_base_override, build_client_options
+        from cogs.clock import clock
+        from cogs.dm_channels import dm_channels
+
+        clock.start_virtual()
+        self.bot = commands.Bot(command_prefix="!", **build_client_options("default"))
+        state = self.bot._connection
+        if self.api is not None:
+            self._route_base = discord.http.Route.BASE
+            os.environ["DISCORD_API_BASE"] = self.api.base_url or await self.api.start()
+            apply_api_base_override()
+            await self.bot.login(SIM_TOKEN)
+        else:
+            await self.bot._async_setup_hook()
+            self.http.loop = self.bot.loop
+            self.bot.http = state.http = self.http
+        state.dispatch = lambda *args, **kwargs: None  # listeners are driven directly below
+        state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID, bot=True))
+        self.sim_guild = SimulatedGuild(state)
+        self.http.add_guild(self.sim_guild)
+        dm_channels.bind(self.bot)
+
+        await member_management.setup(self.bot)
+        await welcome.setup(self.bot)
+        self.member_cog = self.bot.get_cog("MemberManagement")
+        self.welcome_cog = self.bot.get_cog("Welcome")
+        self.lag.start()
+
+    async def close(self) -> None:
+        from cogs.clock import clock
+        from cogs.task_supervisor import task_supervisor
+
+        clock.use_system()
+        self.lag.stop()
+        if self.bot is not None:
+            for name in ("MemberManagement", "Welcome"):
+                await self.bot.remove_cog(name)
+        for name in list(task_supervisor.jobs):
+            task_supervisor.cancel(name)
+        if self.api is not None:
+            if self.bot is not None:
+                await self.bot.http.close()
+            await self.api.stop()
+            os.environ.pop("DISCORD_API_BASE", None)
+            discord.http.Route.BASE = self._route_base
+
+    async def settle(self) -> None:
+        """Wait until the cogs' background queues are empty."""
+        from cogs.dm_outbox import dm_outbox
+        from cogs.rest_dispatcher import rest_dispatcher
+
+        cog = self.member_cog
+        await cog._surge_queue.join()
+        if cog._surge_batches or cog._surge_restrip:
+            await cog._flush_surge_batches()
+        while True:
+            if dm_outbox._queue is not None:
+                await dm_outbox._queue.join()
+            if rest_dispatcher.queue_depth() == 0 and not any(s.in_flight for s in rest_dispatcher.stats.values()):
+                if dm_outbox.queue_depth() == 0:
+                    return
+            await asyncio.sleep(0.005)
+
+    async def _phase(self, name: str, count: int, work) -> PhaseReport:
+        before = Counter(self.http.calls)
+        self.lag.take()
+        start = time.perf_counter()
+        await work()
+        await self.settle()
+        elapsed = time.perf_counter() - start
+        routes = Counter(self.http.calls)
+        routes.subtract(before)
+        return PhaseReport(name, count, elapsed, +routes, self.lag.take())
+
+    # --- traffic ---------------------------------------------------------------
+
+    async def _dispatch(self, event: str, *args: Any) -> None:
+        """Run every listener for `event`, concurrently, like Client.dispatch."""
+        listeners = self.bot.extra_events.get(f"on_{event}", [])
+        await asyncio.gather(*(listener(*args) for listener in listeners), return_exceptions=True)
+
+    def _join_roles(self) -> List[int]:
+        roll = self.random.random()
+        if roll < self.whop_ratio:
+            return [MEMBER_ROLE_ID]
+        if roll < self.whop_ratio + self.paid_ratio:
+            return [PAID_ROLE_ID]
+        return []
+
+    async def run_joins(self) -> None:
+        tasks = []
+        for i in range(self.members):
+            user_id = FIRST_USER_ID + i
+            if self.random.random() < self.closed_dm_ratio:
+                self.http.closed_dm_user_ids.add(user_id)
+            member = self.sim_guild.join(user_id, self._join_roles())
+            tasks.append(asyncio.create_task(self._dispatch("member_join", member)))
+            if self.join_rate > 0:
+                await asyncio.sleep(1 / self.join_rate)
+        await asyncio.gather(*tasks)
+
+    async def run_strip_checks(self) -> None:
+        await asyncio.gather(*self.member_cog._strip_tasks.values(), return_exceptions=True)
+
+    def clickers(self) -> List[discord.Member]:
+        members = [m for m in self.sim_guild.guild.members if m.id != BOT_USER_ID]
+        return self.random.sample(members, int(len(members) * self.click_ratio))
+
+    async def run_clicks(self, members: List[discord.Member]) -> None:
+        view = self.welcome_cog._view
+
+        async def click(member: discord.Member) -> None:
+            await view.start_verification.callback(FakeInteraction(self.http, member, next(self._interaction_ids)))
+
+        await asyncio.gather(*(click(m) for m in members))
+
+    def open_tickets(self, members: List[discord.Member]) -> None:
+        """Give members a legacy verification ticket opened now (closed by the auto-close pass)."""
+        from cogs.clock import clock
+        from cogs.welcome import _load_tickets, _save_tickets
+
+        tickets = _load_tickets()
+        for member in members:
+            tickets[str(member.id)] = {
+                "guild_id": member.guild.id,
+                "channel_id": str(next(self._interaction_ids)),  # channel no longer exists
+                "created_at": clock.now().isoformat(),
+            }
+        _save_tickets(tickets)
+
+    def fill_pending(self, count: int, spread_seconds: float = 3600) -> None:
+        """Add `count` members straight to the cache and the 1-hour timer (no join handling),
+        join times spread evenly over the last `spread_seconds`."""
+        from cogs.clock import clock
+
+        now = clock.now()
+        store = self.member_cog.pending_users
+        for i in range(count):
+            user_id = FIRST_USER_ID + i
+            if self.sim_guild.guild.get_member(user_id) is None:
+                self.sim_guild.join(user_id, [UNVERIFIED_ROLE_ID])
+            store.add(self.sim_guild.id, user_id, now - timedelta(seconds=spread_seconds * i / max(count, 1)))
+
+    async def tick(self) -> None:
+        """One run of the per-minute passes."""
+        await self.member_cog.check_1_hour_access()
+        await self.welcome_cog._ticket_auto_close_pass()
+
+    async def advance(self, seconds: float, step: float = TICK_SECONDS) -> int:
+        """Fast-forward virtual time, running the per-minute passes every `step` seconds.
+        Returns the number of passes run."""
+        from cogs.clock import clock
+
+        passes = 0
+        while seconds > 0:
+            clock.advance(min(step, seconds))
+            seconds -= step
+            await self.tick()
+            passes += 1
+        return passes
+
+    async def run_grants(self) -> None:
+        await self.advance(3600 + TICK_SECONDS)
+
+    # --- whole run -------------------------------------------------------------
+
+    def _outcomes(self) -> Dict[str, int]:
+        from cogs.dm_outbox import dm_outbox
+        from cogs.grant_queue import grant_queue
+        from cogs.welcome import _load_tickets
+
+        members = [m for m in self.sim_guild.guild.members if m.id != BOT_USER_ID]
+        return {
+            "member role": sum(1 for m in members if m._roles.has(MEMBER_ROLE_ID)),
+            "still unverified": sum(1 for m in members if m._roles.has(UNVERIFIED_ROLE_ID)),
+            "pending": self.member_cog.pending_count(),
+            "grant jobs left": len(grant_queue.jobs),
+            "deferred welcome DMs": sum(len(q) for q in self.member_cog._deferred_dms.values()),
+            "tickets open": len(_load_tickets()),
+            "DMs sent": dm_outbox.sent,
+            "DMs skipped (closed)": dm_outbox.skipped,
+            "DMs failed": dm_outbox.failed,
+        }
+
+    async def run(self) -> SimulationReport:
+        report = SimulationReport(self.members)
+        rss_before = _rss_bytes()
+        await self.setup()
+        try:
+            report.phases.append(await self._phase("joins", self.members, self.run_joins))
+            if self.strip_checks:
+                report.phases.append(await self._phase("strip checks", self.members, self.run_strip_checks))
+            else:
+                for task in list(self.member_cog._strip_tasks.values()):
+                    task.cancel()
+            clickers = self.clickers()
+            self.open_tickets(self.random.sample(clickers, int(len(clickers) * self.ticket_ratio)))
+            report.phases.append(await self._phase("clicks", len(clickers), lambda: self.run_clicks(clickers)))
+            due = self.member_cog.pending_count()
+            report.phases.append(await self._phase("grants", due, self.run_grants))
+            report.outcomes = self._outcomes()
+        finally:
+            await self.close()
+        report.rss_delta_mb = round((_rss_bytes() - rss_before) / (1024 * 1024), 2)
+        report.errors = Counter(self.http.errors)
+        report.routes = Counter(self.http.calls)
+        return report
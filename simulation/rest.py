@@ -0,0 +1,145 @@
+"""
+Recording stand-in for discord.py's HTTPClient.
+
+Installed as the client's `http` (and its ConnectionState's), so every request the
+cogs make through discord.py models lands here instead of on the network. Each
+call is counted by route template, waits a simulated round trip, and answers from
+the simulated guilds' state. Role edits are applied to the cached member right
+away, standing in for the GUILD_MEMBER_UPDATE the gateway would send.
+
+Only the endpoints the join / verification / grant flows reach are implemented;
+anything else raises AttributeError naming the missing method.
+"""
+import asyncio
+import itertools
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+import discord
+
+from .fakes import BOT_USER_ID, SimulatedGuild, user_payload
+
+# "Cannot send messages to this user"
+DM_CLOSED_ERROR_CODE = 50007
+INTERACTION_ROUTE_PREFIXES = ("POST /interactions/", "POST /webhooks/", "PATCH /webhooks/")
+
+
+class _Response:
+    """Enough of an aiohttp response for discord.HTTPException."""
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+
+def _error(cls: type, status: int, reason: str, code: int = 0, message: str = "") -> discord.HTTPException:
+    return cls(_Response(status, reason), {"code": code, "message": message or reason})
+
+
+class RecordingHTTP:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # set by Client._async_setup_hook
+        self.guilds: Dict[int, SimulatedGuild] = {}
+        self.closed_dm_user_ids: Set[int] = set()
+        self.calls: Counter = Counter()  # "METHOD /route/{template}" -> count
+        self.errors: Counter = Counter()
+        self._random = random.Random(seed)
+        self._ids = itertools.count(300000000000000000)
+        self._dm_channels: Dict[int, int] = {}  # DM channel id -> recipient user id
+
+    def add_guild(self, sim_guild: SimulatedGuild) -> None:
+        self.guilds[sim_guild.id] = sim_guild
+
+    def rest_calls(self) -> int:
+        """Requests to Discord's REST API (interaction callbacks and followups excluded)."""
+        return sum(n for route, n in self.calls.items() if not route.startswith(INTERACTION_ROUTE_PREFIXES))
+
+    def interaction_calls(self) -> int:
+        return sum(n for route, n in self.calls.items() if route.startswith(INTERACTION_ROUTE_PREFIXES))
+
+    async def record(self, method: str, route: str) -> None:
+        self.calls[f"{method} {route}"] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def _guild(self, guild_id: Any) -> SimulatedGuild:
+        sim_guild = self.guilds.get(int(guild_id))
+        if sim_guild is None:
+            raise _error(discord.NotFound, 404, "Not Found", 10004, "Unknown Guild")
+        return sim_guild
+
+    def _message(self, channel_id: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": str(next(self._ids)),
+            "channel_id": str(channel_id),
+            "author": user_payload(BOT_USER_ID, bot=True),
+            "content": payload.get("content") or "",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": payload.get("embeds") or [],
+            "pinned": False,
+            "type": 0,
+        }
+
+    # --- HTTPClient methods reached by the cogs ---------------------------------
+
+    async def add_role(self, guild_id: Any, user_id: Any, role_id: Any, *, reason: Optional[str] = None) -> None:
+        await self.record("PUT", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+        sim_guild = self._guild(guild_id)
+        if int(user_id) not in sim_guild.members:
+            self.errors["unknown_member"] += 1
+            raise _error(discord.NotFound, 404, "Not Found", 10007, "Unknown Member")
+        sim_guild.set_role(int(user_id), int(role_id), True)
+
+    async def remove_role(self, guild_id: Any, user_id: Any, role_id: Any, *, reason: Optional[str] = None) -> None:
+        await self.record("DELETE", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+        sim_guild = self._guild(guild_id)
+        if int(user_id) not in sim_guild.members:
+            self.errors["unknown_member"] += 1
+            raise _error(discord.NotFound, 404, "Not Found", 10007, "Unknown Member")
+        sim_guild.set_role(int(user_id), int(role_id), False)
+
+    async def get_member(self, guild_id: Any, member_id: Any) -> Dict[str, Any]:
+        await self.record("GET", "/guilds/{guild_id}/members/{member_id}")
+        data = self._guild(guild_id).members.get(int(member_id))
+        if data is None:
+            self.errors["unknown_member"] += 1
+            raise _error(discord.NotFound, 404, "Not Found", 10007, "Unknown Member")
+        return dict(data, roles=list(data["roles"]))
+
+    async def start_private_message(self, user_id: Any) -> Dict[str, Any]:
+        await self.record("POST", "/users/@me/channels")
+        channel_id = next(self._ids)
+        self._dm_channels[channel_id] = int(user_id)
+        return {"id": str(channel_id), "type": 1, "last_message_id": None, "recipients": [user_payload(int(user_id))]}
+
+    async def send_message(self, channel_id: Any, *, params: Any) -> Dict[str, Any]:
+        await self.record("POST", "/channels/{channel_id}/messages")
+        recipient = self._dm_channels.get(int(channel_id))
+        if recipient is not None and recipient in self.closed_dm_user_ids:
+            self.errors["dm_closed"] += 1
+            raise _error(discord.Forbidden, 403, "Forbidden", DM_CLOSED_ERROR_CODE, "Cannot send messages to this user")
+        return self._message(channel_id, params.payload or {})
+
+    async def edit_message(self, channel_id: Any, message_id: Any, *, params: Any) -> Dict[str, Any]:
+        await self.record("PATCH", "/channels/{channel_id}/messages/{message_id}")
+        return dict(self._message(channel_id, params.payload or {}), id=str(message_id))
+
+    async def get_message(self, channel_id: Any, message_id: Any) -> Dict[str, Any]:
+        await self.record("GET", "/channels/{channel_id}/messages/{message_id}")
+        return dict(self._message(channel_id, {}), id=str(message_id))
+
+    async def delete_channel(self, channel_id: Any, *, reason: Optional[str] = None) -> None:
+        await self.record("DELETE", "/channels/{channel_id}")
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError(f"RecordingHTTP does not simulate HTTPClient.{name}")
@@ -0,0 +1,459 @@
+"""
+Local stand-in for Discord's REST API, for testing rate-limit handling.
+
+An aiohttp server on localhost that answers the endpoints this bot uses with
+Discord-shaped payloads, per-route rate limit buckets, an optional global limit
+and simulated latency. Unlike RecordingHTTP, requests go through discord.py's real
+HTTPClient, so its bucket tracking, pre-emptive waits and 429 retries are what is
+being measured.
+
+    api = FakeDiscordAPI(buckets={"member_roles": (10, 10.0)}, global_limit=50)
+    base = await api.start()           # http://127.0.0.1:<port>/api/v10
+    os.environ["DISCORD_API_BASE"] = base
+    apply_api_base_override()          # cogs/client_profile.py
+    await bot.login("sim-token")
+
+Rate limits work like Discord's: each route belongs to a bucket, counted per
+major parameter (guild, channel or webhook). Responses carry X-RateLimit-Limit,
+-Remaining, -Reset, -Reset-After and -Bucket; an exhausted bucket answers 429
+with retry_after. The global limit answers 429 with "global": true. Buckets reset
+on a fixed window that starts with the first request in it.
+
+Members and channels come from the SimulatedGuild objects registered with
+add_guild(), shared with the client. Writes are applied to the client's cache the
+way the gateway would report them: role changes to the cached member, channel and
+overwrite edits through ConnectionState.parse_channel_update.
+
+Counters match RecordingHTTP (calls, errors, rest_calls(), interaction_calls(),
+record() for the fake interactions), plus rate_limited: 429s by route.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import discord
+from aiohttp import web
+
+from .fakes import BOT_USER_ID, SimulatedGuild, user_payload
+from .rest import DM_CLOSED_ERROR_CODE, INTERACTION_ROUTE_PREFIXES
+
+API_PREFIX = "/api/v10"
+APPLICATION_ID = BOT_USER_ID
+OWNER_USER_ID = 100000000000000003
+# Route parameters Discord keys buckets on, in order of precedence
+MAJOR_PARAMETERS = ("guild_id", "channel_id", "webhook_id")
+
+# bucket -> (requests, per seconds). Discord does not publish most of these;
+# the values are in the range its headers report and can be overridden.
+DEFAULT_BUCKETS: Dict[str, Tuple[int, float]] = {
+    "member_roles": (10, 10.0),
+    "members": (10, 10.0),
+    "channels": (5, 5.0),
+    "channel_permissions": (5, 5.0),
+    "messages": (5, 5.0),
+    "dm_channels": (10, 10.0),
+    "users": (30, 1.0),
+    "application": (5, 5.0),
+    "commands": (5, 20.0),
+}
+DEFAULT_GLOBAL_LIMIT = 50  # requests per second across all routes, 0 = off
+
+Handler = Callable[[web.Request], Awaitable[Tuple[int, Any]]]
+
+
+class APIError(Exception):
+    """Raised by a handler to answer with a Discord JSON error."""
+
+    def __init__(self, status: int, code: int, message: str, kind: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.kind = kind
+
+
+def _unknown(what: str, code: int) -> APIError:
+    return APIError(404, code, f"Unknown {what}", f"unknown_{what.lower()}")
+
+
+def _json(body: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # discord.py only decodes bodies whose Content-Type is exactly application/json
+    # (no charset), as Discord sends them
+    return web.Response(
+        body=json.dumps(body).encode(), status=status,
+        headers=dict(headers or {}, **{"Content-Type": "application/json"}),
+    )
+
+
+class Bucket:
+    """A fixed-window limit: `limit` requests, then wait until the window resets."""
+
+    __slots__ = ("name", "hash", "limit", "window", "remaining", "reset_at")
+
+    def __init__(self, name: str, limit: int, window: float):
+        self.name = name
+        self.hash = hashlib.sha1(name.encode()).hexdigest()[:16]
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float) -> float:
+        """Use one request. Returns 0 if allowed, else seconds until the reset."""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining <= 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return 0.0
+
+    def headers(self, now: float) -> Dict[str, str]:
+        reset_after = max(0.0, self.reset_at - now)
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": self.hash,
+        }
+
+
+class FakeDiscordAPI:
+    def __init__(
+        self,
+        *,
+        latency: float = 0.04,
+        jitter: float = 0.3,
+        buckets: Optional[Dict[str, Tuple[int, float]]] = None,
+        global_limit: int = DEFAULT_GLOBAL_LIMIT,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.limits = dict(DEFAULT_BUCKETS, **(buckets or {}))
+        self.global_limit = global_limit
+        self.guilds: Dict[int, SimulatedGuild] = {}
+        self.closed_dm_user_ids: Set[int] = set()
+        self.calls: Counter = Counter()  # "METHOD /route/{template}" -> count
+        self.errors: Counter = Counter()
+        self.rate_limited: Counter = Counter()  # route (or "global") -> 429s sent
+        self.base_url: Optional[str] = None
+        self._random = random.Random(seed)
+        self._ids = itertools.count(300000000000000000)
+        self._dm_channels: Dict[int, int] = {}  # DM channel id -> recipient user id
+        self._buckets: Dict[Tuple[str, str], Bucket] = {}
+        self._global = Bucket("global", global_limit, 1.0) if global_limit > 0 else None
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self._add_routes()
+
+    # --- lifecycle and counters ----------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening (port 0 picks a free one). Returns the API base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{bound_host}:{bound_port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def add_guild(self, sim_guild: SimulatedGuild) -> None:
+        self.guilds[sim_guild.id] = sim_guild
+
+    def rest_calls(self) -> int:
+        """Requests to the REST API (interaction callbacks and followups excluded)."""
+        return sum(n for route, n in self.calls.items() if not route.startswith(INTERACTION_ROUTE_PREFIXES))
+
+    def interaction_calls(self) -> int:
+        return sum(n for route, n in self.calls.items() if route.startswith(INTERACTION_ROUTE_PREFIXES))
+
+    async def record(self, method: str, route: str) -> None:
+        """Count a request that does not go over HTTP (the fake interactions' webhooks)."""
+        self.calls[f"{method} {route}"] += 1
+        await self._delay(1.0)
+
+    async def _delay(self, share: float) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(share * self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    # --- request handling -----------------------------------------------------
+
+    def _add_routes(self) -> None:
+        routes = (
+            ("GET", "/users/@me", "users", self._get_me),
+            ("GET", "/users/{user_id}", "users", self._get_user),
+            ("GET", "/oauth2/applications/@me", "application", self._get_application),
+            ("POST", "/users/@me/channels", "dm_channels", self._open_dm),
+            ("GET", "/guilds/{guild_id}/members/{user_id}", "members", self._get_member),
+            ("PATCH", "/guilds/{guild_id}/members/{user_id}", "members", self._edit_member),
+            ("PUT", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", "member_roles", self._add_role),
+            ("DELETE", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", "member_roles", self._remove_role),
+            ("PATCH", "/channels/{channel_id}", "channels", self._edit_channel),
+            ("DELETE", "/channels/{channel_id}", "channels", self._delete_channel),
+            ("PUT", "/channels/{channel_id}/permissions/{overwrite_id}", "channel_permissions", self._set_overwrite),
+            ("DELETE", "/channels/{channel_id}/permissions/{overwrite_id}", "channel_permissions", self._delete_overwrite),
+            ("POST", "/channels/{channel_id}/messages", "messages", self._send_message),
+            ("GET", "/channels/{channel_id}/messages/{message_id}", "messages", self._get_message),
+            ("PATCH", "/channels/{channel_id}/messages/{message_id}", "messages", self._edit_message),
+            ("PUT", "/applications/{application_id}/commands", "commands", self._sync_commands),
+            ("PUT", "/applications/{application_id}/guilds/{guild_id}/commands", "commands", self._sync_commands),
+        )
+        for method, path, bucket, handler in routes:
+            self.app.router.add_route(method, API_PREFIX + path, self._endpoint(method, path, bucket, handler))
+
+    def _endpoint(self, method: str, path: str, bucket_name: str, handler: Handler) -> Callable[[web.Request], Awaitable[web.Response]]:
+        route = f"{method} {path}"
+
+        async def endpoint(request: web.Request) -> web.Response:
+            self.calls[route] += 1
+            # Half the round trip before the limit is checked, half after: the client
+            # learns the reset time a little late, as it does over a real network
+            await self._delay(0.5)
+            response = self._check_limits(request, route, bucket_name)
+            if response is None:
+                response = await self._respond(request, handler)
+                response.headers.update(self._bucket(bucket_name, request).headers(asyncio.get_running_loop().time()))
+            await self._delay(0.5)
+            return response
+
+        return endpoint
+
+    def _bucket(self, name: str, request: web.Request) -> Bucket:
+        major = next((request.match_info[p] for p in MAJOR_PARAMETERS if p in request.match_info), "")
+        bucket = self._buckets.get((name, major))
+        if bucket is None:
+            limit, window = self.limits[name]
+            bucket = self._buckets[(name, major)] = Bucket(name, limit, window)
+        return bucket
+
+    def _check_limits(self, request: web.Request, route: str, bucket_name: str) -> Optional[web.Response]:
+        now = asyncio.get_running_loop().time()
+        if self._global is not None:
+            retry_after = self._global.take(now)
+            if retry_after:
+                self.rate_limited["global"] += 1
+                return self._too_many(retry_after, {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"}, is_global=True)
+        bucket = self._bucket(bucket_name, request)
+        retry_after = bucket.take(now)
+        if retry_after:
+            self.rate_limited[route] += 1
+            return self._too_many(retry_after, dict(bucket.headers(now), **{"X-RateLimit-Scope": "user"}), is_global=False)
+        return None
+
+    @staticmethod
+    def _too_many(retry_after: float, headers: Dict[str, str], is_global: bool) -> web.Response:
+        # discord.py treats a 429 without Via as a Cloudflare ban
+        headers = dict(headers, **{"Retry-After": str(max(1, round(retry_after))), "Via": "1.1 google"})
+        body = {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": is_global}
+        return _json(body, 429, headers)
+
+    async def _respond(self, request: web.Request, handler: Handler) -> web.Response:
+        try:
+            status, body = await handler(request)
+        except APIError as e:
+            self.errors[e.kind] += 1
+            return _json({"code": e.code, "message": e.message}, e.status)
+        if body is None:
+            return web.Response(status=status)
+        return _json(body, status)
+
+    @staticmethod
+    async def _json_body(request: web.Request) -> Dict[str, Any]:
+        """JSON body, or payload_json of a multipart upload."""
+        if request.content_type == "multipart/form-data":
+            form = await request.post()
+            raw = form.get("payload_json")
+            return json.loads(raw) if isinstance(raw, str) else {}
+        if not request.can_read_body:
+            return {}
+        return await request.json()
+
+    # --- lookups --------------------------------------------------------------
+
+    def _guild(self, request: web.Request) -> SimulatedGuild:
+        sim_guild = self.guilds.get(int(request.match_info["guild_id"]))
+        if sim_guild is None:
+            raise _unknown("Guild", 10004)
+        return sim_guild
+
+    def _member(self, request: web.Request) -> Tuple[SimulatedGuild, int, Dict[str, Any]]:
+        sim_guild = self._guild(request)
+        user_id = int(request.match_info["user_id"])
+        data = sim_guild.members.get(user_id)
+        if data is None:
+            raise _unknown("Member", 10007)
+        return sim_guild, user_id, data
+
+    def _channel(self, request: web.Request) -> Tuple[SimulatedGuild, discord.abc.GuildChannel]:
+        channel_id = int(request.match_info["channel_id"])
+        for sim_guild in self.guilds.values():
+            channel = sim_guild.guild.get_channel(channel_id)
+            if channel is not None:
+                return sim_guild, channel
+        raise _unknown("Channel", 10003)
+
+    @staticmethod
+    def _channel_payload(channel: discord.abc.GuildChannel) -> Dict[str, Any]:
+        category_id = getattr(channel, "category_id", None)
+        return {
+            "id": str(channel.id),
+            "type": channel.type.value,
+            "guild_id": str(channel.guild.id),
+            "name": channel.name,
+            "position": channel.position,
+            "parent_id": str(category_id) if category_id else None,
+            "permission_overwrites": [
+                dict(o._asdict(), id=str(o.id)) for o in channel._overwrites
+            ],
+        }
+
+    def _apply_channel(self, sim_guild: SimulatedGuild, payload: Dict[str, Any]) -> None:
+        """What the gateway's CHANNEL_UPDATE would do to the client's cache."""
+        sim_guild.state.parse_channel_update(payload)
+
+    def _message(self, channel_id: Any, payload: Dict[str, Any], message_id: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "id": str(message_id or next(self._ids)),
+            "channel_id": str(channel_id),
+            "author": user_payload(BOT_USER_ID, bot=True),
+            "content": payload.get("content") or "",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": payload.get("embeds") or [],
+            "pinned": False,
+            "type": 0,
+        }
+
+    # --- endpoints ------------------------------------------------------------
+
+    async def _get_me(self, request: web.Request) -> Tuple[int, Any]:
+        return 200, user_payload(BOT_USER_ID, bot=True)
+
+    async def _get_user(self, request: web.Request) -> Tuple[int, Any]:
+        return 200, user_payload(int(request.match_info["user_id"]))
+
+    async def _get_application(self, request: web.Request) -> Tuple[int, Any]:
+        return 200, {
+            "id": str(APPLICATION_ID),
+            "name": "Simulation Bot",
+            "description": "",
+            "icon": None,
+            "bot_public": False,
+            "bot_require_code_grant": False,
+            "owner": user_payload(OWNER_USER_ID),
+            "team": None,
+            "verify_key": "0" * 64,
+            "flags": 0,
+        }
+
+    async def _open_dm(self, request: web.Request) -> Tuple[int, Any]:
+        user_id = int((await self._json_body(request))["recipient_id"])
+        channel_id = next(self._ids)
+        self._dm_channels[channel_id] = user_id
+        return 200, {"id": str(channel_id), "type": 1, "last_message_id": None, "recipients": [user_payload(user_id)]}
+
+    async def _get_member(self, request: web.Request) -> Tuple[int, Any]:
+        _, _, data = self._member(request)
+        return 200, dict(data, roles=list(data["roles"]))
+
+    async def _edit_member(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, user_id, data = self._member(request)
+        body = await self._json_body(request)
+        if "roles" in body:
+            wanted = {int(r) for r in body["roles"]}
+            for role_id in {int(r) for r in data["roles"]} | wanted:
+                sim_guild.set_role(user_id, role_id, role_id in wanted)
+        if "nick" in body:
+            data["nick"] = body["nick"]
+        return 200, dict(data, roles=list(data["roles"]))
+
+    async def _add_role(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, user_id, _ = self._member(request)
+        sim_guild.set_role(user_id, int(request.match_info["role_id"]), True)
+        return 204, None
+
+    async def _remove_role(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, user_id, _ = self._member(request)
+        sim_guild.set_role(user_id, int(request.match_info["role_id"]), False)
+        return 204, None
+
+    async def _edit_channel(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, channel = self._channel(request)
+        body = await self._json_body(request)
+        payload = self._channel_payload(channel)
+        for key in ("name", "position", "parent_id", "topic", "nsfw", "rate_limit_per_user"):
+            if key in body:
+                payload[key] = body[key]
+        if "permission_overwrites" in body:
+            payload["permission_overwrites"] = [dict(o, id=str(o["id"])) for o in body["permission_overwrites"]]
+        self._apply_channel(sim_guild, payload)
+        return 200, payload
+
+    async def _delete_channel(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, channel = self._channel(request)
+        payload = self._channel_payload(channel)
+        sim_guild.guild._remove_channel(channel)
+        return 200, payload
+
+    async def _set_overwrite(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, channel = self._channel(request)
+        body = await self._json_body(request)
+        target = request.match_info["overwrite_id"]
+        payload = self._channel_payload(channel)
+        overwrites = [o for o in payload["permission_overwrites"] if o["id"] != target]
+        overwrites.append({"id": target, "type": body.get("type", 0), "allow": str(body.get("allow", "0")), "deny": str(body.get("deny", "0"))})
+        payload["permission_overwrites"] = overwrites
+        self._apply_channel(sim_guild, payload)
+        return 204, None
+
+    async def _delete_overwrite(self, request: web.Request) -> Tuple[int, Any]:
+        sim_guild, channel = self._channel(request)
+        target = request.match_info["overwrite_id"]
+        payload = self._channel_payload(channel)
+        payload["permission_overwrites"] = [o for o in payload["permission_overwrites"] if o["id"] != target]
+        self._apply_channel(sim_guild, payload)
+        return 204, None
+
+    async def _send_message(self, request: web.Request) -> Tuple[int, Any]:
+        channel_id = int(request.match_info["channel_id"])
+        recipient = self._dm_channels.get(channel_id)
+        if recipient is None:
+            self._channel(request)
+        elif recipient in self.closed_dm_user_ids:
+            raise APIError(403, DM_CLOSED_ERROR_CODE, "Cannot send messages to this user", "dm_closed")
+        return 200, self._message(channel_id, await self._json_body(request))
+
+    async def _get_message(self, request: web.Request) -> Tuple[int, Any]:
+        return 200, self._message(request.match_info["channel_id"], {}, int(request.match_info["message_id"]))
+
+    async def _edit_message(self, request: web.Request) -> Tuple[int, Any]:
+        body = await self._json_body(request)
+        return 200, self._message(request.match_info["channel_id"], body, int(request.match_info["message_id"]))
+
+    async def _sync_commands(self, request: web.Request) -> Tuple[int, Any]:
+        guild_id = request.match_info.get("guild_id")
+        synced = []
+        for command in await self._json_body(request):
+            data = dict(command, id=str(next(self._ids)), application_id=str(APPLICATION_ID), version="1")
+            if guild_id:
+                data["guild_id"] = guild_id
+            synced.append(data)
+        return 200, synced